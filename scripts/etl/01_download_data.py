@@ -6,7 +6,22 @@ import requests
 from pathlib import Path
 from tqdm import tqdm
 import logging
-from config import DATA_SOURCES, RAW_DATA_DIR, HOSPITAL_MRF_URLS
+import sys
+import argparse
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from config import (
+    DATA_SOURCES, RAW_DATA_DIR, HOSPITAL_MRF_URLS, DOWNLOAD_CONCURRENCY,
+    DOWNLOAD_RETRIES, DOWNLOAD_BACKOFF, DOWNLOAD_TIMEOUT, DOWNLOAD_CHUNK_BYTES,
+    DOWNLOAD_MANIFEST, DOWNLOAD_RETRY_STATUS
+)
+from fingerprint import file_fingerprint, same_content
+from mrf_stream import is_placeholder_url
 
 # Setup logging
 logging.basicConfig(
@@ -15,98 +30,436 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# One session per download thread, reused for every file that thread fetches
+_thread_state = threading.local()
+
+
+class IncompleteDownload(Exception):
+    """Raised when a response ends before the whole file has been received"""
 
-def download_file(url: str, destination: Path, description: str = "") -> bool:
+
+def get_session() -> requests.Session:
     """
-    Download a file with progress bar and resume capability
+    Get the calling thread's HTTP session
+    
+    A session keeps connections to a host open between requests, so retries
+    and later files from the same host skip the TCP/TLS handshake. Sessions
+    are not shared between threads.
+    
+    Returns:
+        requests.Session for the current thread
+    """
+    session = getattr(_thread_state, "session", None)
+    if session is None:
+        session = requests.Session()
+        # Byte offsets for Range requests must refer to the stored bytes
+        session.headers["Accept-Encoding"] = "identity"
+        _thread_state.session = session
+    return session
+
+
+def part_path(destination: Path) -> Path:
+    """
+    Path of the partial file a download is written to until it completes
     
     Args:
-        url: URL to download from
-        destination: Local file path to save to
-        description: Description for progress bar
-        
+        destination: Final file path
+    
+    Returns:
+        destination with a .part suffix appended
+    """
+    return destination.with_name(destination.name + ".part")
+
+
+def validator_path(part_file: Path) -> Path:
+    """
+    Path of the sidecar recording which version of a file a .part file holds
+    
+    Args:
+        part_file: Partial file path
+    
     Returns:
-        True if successful, False otherwise
+        part_file with a .json suffix appended
     """
+    return part_file.with_name(part_file.name + ".json")
+
+
+def _load_part_validator(part_file: Path, url: str) -> Optional[str]:
+    """ETag or Last-Modified the .part file's bytes were served with, if recorded for this URL"""
     try:
-        # Check if file already exists
-        if destination.exists():
-            logger.info(f"File already exists: {destination.name}")
-            response = input(f"Re-download {destination.name}? (y/n): ")
-            if response.lower() != 'y':
-                return True
+        meta = json.loads(validator_path(part_file).read_text())
+    except (OSError, ValueError):
+        return None
+    return meta.get("validator") if meta.get("url") == url else None
+
+
+def _save_part_validator(part_file: Path, url: str, validator: Optional[str]):
+    """Record the validator of the response being written to part_file (none: drop the sidecar)"""
+    sidecar = validator_path(part_file)
+    if validator:
+        sidecar.write_text(json.dumps({"url": url, "validator": validator}))
+    else:
+        sidecar.unlink(missing_ok=True)
+
+
+def _discard_part(part_file: Path):
+    """Delete a partial file and its validator sidecar"""
+    part_file.unlink(missing_ok=True)
+    validator_path(part_file).unlink(missing_ok=True)
+
+
+def _content_range(header: Optional[str]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """Parse a Content-Range header into (start, total); either may be None"""
+    match = re.fullmatch(r"bytes (?:(\d+)-\d+|\*)/(\d+|\*)", (header or "").strip())
+    if not match:
+        return None
+    start, total = match.groups()
+    return (
+        int(start) if start is not None else None,
+        int(total) if total != "*" else None
+    )
+
+
+def _source_filename(response: requests.Response) -> Optional[str]:
+    """
+    File name the server gave a response: its Content-Disposition
+    filename, else the last segment of the final (redirected) URL
+    
+    Downloads are saved under fixed names, so this is the only record of
+    the release a file came from (e.g. MUP_OHP_R24_P04_V10_D22_Prov_Svc.csv).
+    """
+    match = re.search(
+        r"filename\*?=(?:[\w-]+'[\w-]*')?\"?([^\";]+)", response.headers.get("Content-Disposition", "")
+    )
+    if match:
+        return unquote(match.group(1)).strip()
+    return Path(urlparse(response.url).path).name or None
+
+
+def _fetch_to_part(session: requests.Session, url: str, part_file: Path, pbar: tqdm, state: Dict):
+    """
+    Make one download attempt, resuming from the bytes already in part_file
+    
+    Args:
+        session: HTTP session
+        url: URL to download from
+        part_file: Partial file to append to
+        pbar: Progress bar to update
+        state: Per-download state kept across attempts (validators from the
+            manifest, resume validator, response headers)
+    
+    The validator of the response a .part file holds is kept in a sidecar
+    (validator_path), so a later run resumes with If-Range too. A .part
+    file with no known validator cannot be resumed safely and is restarted
+    from byte 0.
+    
+    Raises:
+        IncompleteDownload: If the body ends early or the resume point is rejected
+        requests.exceptions.RequestException: On HTTP or connection errors
+    """
+    offset = part_file.stat().st_size if part_file.exists() else 0
+    
+    if offset and not state.get("validator"):
+        # A .part file left by an earlier run: its validator is in the sidecar
+        state["validator"] = _load_part_validator(part_file, url)
+        if not state["validator"]:
+            logger.warning(f"⚠️  {part_file.name}: version of the partial file unknown, restarting from byte 0")
+            _discard_part(part_file)
+            offset = 0
+    
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        # Only resume if the file has not changed since the bytes were received
+        headers["If-Range"] = state["validator"]
+    else:
+        # Ask the server to skip the body if the local copy is still current
+        headers.update(state.get("conditional", {}))
+    
+    with session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT, headers=headers) as response:
+        if response.status_code == 304:
+            state["not_modified"] = True
+            return
         
-        logger.info(f"Downloading: {description or url}")
+        if response.status_code == 416:
+            content_range = _content_range(response.headers.get("Content-Range"))
+            if content_range and content_range[1] == offset:
+                # The partial file already holds the whole body
+                return
+            _discard_part(part_file)
+            raise IncompleteDownload("server rejected the resume offset, restarting from byte 0")
         
-        # Stream download with progress bar
-        response = requests.get(url, stream=True, timeout=30)
         response.raise_for_status()
         
-        total_size = int(response.headers.get('content-length', 0))
+        state["etag"] = response.headers.get("ETag")
+        state["last_modified"] = response.headers.get("Last-Modified")
+        state["validator"] = state["etag"] or state["last_modified"]
+        state["source_filename"] = _source_filename(response)
+        
+        if offset and response.status_code == 206:
+            content_range = _content_range(response.headers.get("Content-Range"))
+            if not content_range or content_range[0] != offset:
+                _discard_part(part_file)
+                raise IncompleteDownload("server resumed at the wrong offset, restarting from byte 0")
+            mode = "ab"
+        else:
+            # Full body (no Range sent, Range ignored, or the file changed)
+            offset = 0
+            mode = "wb"
+            _save_part_validator(part_file, url, state["validator"])
+        
+        length = response.headers.get("content-length")
+        expected = int(length) if length is not None else None
+        state["content_length"] = offset + expected if expected is not None else None
         
-        with open(destination, 'wb') as f, tqdm(
+        pbar.reset(total=offset + expected if expected is not None else None)
+        pbar.update(offset)
+        
+        received = 0
+        with open(part_file, mode) as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                size = f.write(chunk)
+                received += size
+                pbar.update(size)
+    
+    if expected is not None and received < expected:
+        raise IncompleteDownload(f"connection closed after {offset + received} of {offset + expected} bytes")
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether a failed attempt is worth retrying"""
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code in DOWNLOAD_RETRY_STATUS
+    return True
+
+
+def download_file(
+    url: str,
+    destination: Path,
+    description: str = "",
+    retries: int = DOWNLOAD_RETRIES,
+    backoff: float = DOWNLOAD_BACKOFF,
+    position: int = 0,
+    previous: Optional[Dict] = None
+) -> Optional[Dict]:
+    """
+    Download a file with progress bar and resume capability
+    
+    Bytes are written to a .part file next to the destination, which is
+    renamed into place only once complete. Each attempt resumes the .part
+    file with an HTTP Range request (If-Range guards against the file
+    changing between attempts), so a dropped connection costs only the
+    bytes in flight. Connection errors, truncated bodies and 408/429/5xx
+    responses are retried with exponential backoff; a .part file left by a
+    failed run is resumed by the next run, with the validator recorded next
+    to it.
+    
+    When a previous manifest entry is given, the request is conditional
+    (If-None-Match / If-Modified-Since) and a 304 response leaves the local
+    file untouched.
+    
+    Args:
+        url: URL to download from
+        destination: Local file path to save to
+        description: Description for progress bar
+        retries: Attempts after the first before giving up
+        backoff: Seconds before the first retry, doubled on each further retry
+        position: Progress bar line (for concurrent downloads)
+        previous: Manifest entry of the current local copy, if it is intact
+    
+    Returns:
+        Manifest entry for the file, or None if the download failed
+    """
+    part_file = part_path(destination)
+    state: Dict = {"conditional": _conditional_headers(previous)}
+    
+    logger.info(f"Downloading: {description or url}")
+    
+    try:
+        with tqdm(
             desc=destination.name,
-            total=total_size,
             unit='iB',
             unit_scale=True,
             unit_divisor=1024,
+            position=position,
         ) as pbar:
-            for chunk in response.iter_content(chunk_size=8192):
-                size = f.write(chunk)
-                pbar.update(size)
+            for attempt in range(retries + 1):
+                try:
+                    _fetch_to_part(get_session(), url, part_file, pbar, state)
+                    break
+                except (requests.exceptions.RequestException, IncompleteDownload) as e:
+                    if attempt == retries or not _is_retryable(e):
+                        raise
+                    delay = backoff * 2 ** attempt
+                    logger.warning(
+                        f"⚠️  {destination.name}: {e} - retrying in {delay:.1f}s "
+                        f"({attempt + 1}/{retries})"
+                    )
+                    time.sleep(delay)
         
-        logger.info(f"✓ Downloaded: {destination.name}")
-        return True
+        if state.get("not_modified"):
+            logger.info(f"✓ Unchanged: {destination.name}")
+            return previous
         
-    except requests.exceptions.RequestException as e:
+        part_file.replace(destination)
+        validator_path(part_file).unlink(missing_ok=True)
+        
+        logger.info(f"✓ Downloaded: {destination.name}")
+        return {
+            "url": url,
+            "etag": state.get("etag"),
+            "last_modified": state.get("last_modified"),
+            "content_length": state.get("content_length"),
+            "source_filename": state.get("source_filename"),
+            **file_fingerprint(destination)
+        }
+    
+    except (requests.exceptions.RequestException, IncompleteDownload) as e:
         logger.error(f"✗ Failed to download {url}: {e}")
-        return False
+        return None
     except Exception as e:
         logger.error(f"✗ Unexpected error downloading {url}: {e}")
-        return False
+        return None
 
 
-def download_cms_datasets():
-    """Download all CMS benchmark datasets"""
-    logger.info("=" * 60)
-    logger.info("DOWNLOADING CMS BENCHMARK DATASETS")
-    logger.info("=" * 60)
+def _conditional_headers(entry: Optional[Dict]) -> Dict:
+    """Conditional request headers from a manifest entry"""
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def load_download_manifest() -> Dict:
+    """
+    Load the download manifest
     
-    success_count = 0
+    Returns:
+        Dict of filename -> url, validators and checksum of the local copy
+    """
+    if not DOWNLOAD_MANIFEST.exists():
+        return {}
     
-    for source_key, source_info in DATA_SOURCES.items():
-        destination = RAW_DATA_DIR / source_info["filename"]
-        
-        if download_file(
-            url=source_info["url"],
-            destination=destination,
-            description=source_info["description"]
-        ):
-            success_count += 1
+    try:
+        return json.loads(DOWNLOAD_MANIFEST.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable manifest {DOWNLOAD_MANIFEST.name}: {e}")
+        return {}
+
+
+def save_download_manifest(manifest: Dict):
+    """
+    Save the download manifest
     
-    logger.info(f"\nCMS Downloads: {success_count}/{len(DATA_SOURCES)} successful")
-    return success_count == len(DATA_SOURCES)
+    Args:
+        manifest: Dict of filename -> url, validators and checksum of the local copy
+    """
+    DOWNLOAD_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    DOWNLOAD_MANIFEST.write_text(json.dumps(manifest, indent=2, sort_keys=True))
 
 
-def download_hospital_mrf():
-    """Download hospital Machine-Readable Files (MRF)"""
-    logger.info("\n" + "=" * 60)
-    logger.info("DOWNLOADING HOSPITAL PRICE TRANSPARENCY FILES")
-    logger.info("=" * 60)
+def _intact_entry(entry: Optional[Dict], url: str, destination: Path) -> Optional[Dict]:
+    """
+    Manifest entry if it still describes the local file, else None
+    
+    The local file must exist with the recorded size and checksum (only
+    re-hashed when its mtime changed), and come from the same URL.
+    Otherwise the file is downloaded unconditionally.
+    """
+    if not entry or entry.get("url") != url or not destination.exists():
+        return None
+    
+    if not same_content(entry, file_fingerprint(destination, entry)):
+        logger.warning(f"⚠️  {destination.name} changed on disk since it was downloaded")
+        return None
+    
+    return entry
+
+
+def download_all(
+    jobs: List[Dict],
+    concurrency: int = DOWNLOAD_CONCURRENCY,
+    retries: int = DOWNLOAD_RETRIES,
+    force: bool = False
+) -> Dict[Path, bool]:
+    """
+    Download several files concurrently, skipping files that have not changed
+    
+    Files with an intact DOWNLOAD_MANIFEST entry are requested
+    conditionally, so an unchanged source costs one 304 response instead of
+    a full transfer. Jobs run in a thread pool of at most `concurrency`
+    downloads and the manifest is saved once all of them finish.
+    
+    Args:
+        jobs: Dicts with url, destination and description
+        concurrency: Maximum simultaneous downloads
+        retries: Attempts per file after the first
+        force: Ignore the manifest and download every file in full
+    
+    Returns:
+        Dict of destination -> success
+    """
+    if not jobs:
+        return {}
+    
+    manifest = load_download_manifest()
+    
+    logger.info(f"Checking {len(jobs)} file(s), up to {concurrency} at a time")
     
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {}
+        for position, job in enumerate(jobs):
+            name = job["destination"].name
+            previous = None if force else _intact_entry(manifest.get(name), job["url"], job["destination"])
+            futures[job["destination"]] = pool.submit(
+                download_file,
+                url=job["url"],
+                destination=job["destination"],
+                description=job["description"],
+                retries=retries,
+                position=position,
+                previous=previous
+            )
+        
+        results = {}
+        for destination, future in futures.items():
+            entry = future.result()
+            if entry is not None:
+                manifest[destination.name] = entry
+            results[destination] = entry is not None
+    
+    save_download_manifest(manifest)
+    
+    return results
+
+
+def cms_download_jobs() -> List[Dict]:
+    """CMS benchmark datasets to download"""
+    return [
+        {
+            "url": source_info["url"],
+            "destination": RAW_DATA_DIR / source_info["filename"],
+            "description": source_info["description"]
+        }
+        for source_info in DATA_SOURCES.values()
+    ]
+
+
+def hospital_mrf_jobs() -> List[Dict]:
+    """Hospital Machine-Readable Files (MRF) to download"""
     logger.warning(
         "\n⚠️  NOTE: Hospital MRF files can be very large (100MB - 2GB)."
         "\n   This may take several minutes."
     )
     
-    success_count = 0
+    jobs = []
     
     for hospital_key, hospital_info in HOSPITAL_MRF_URLS.items():
-        logger.info(f"\n📋 {hospital_info['hospital_name']}")
-        
         # Note: Actual MRF URLs need to be found on hospital websites
         # This is a placeholder that will need manual update
-        if "placeholder" in hospital_info["url"].lower() or "price-transparency" in hospital_info["url"]:
+        if is_placeholder_url(hospital_info["url"]):
             logger.warning(
                 f"⚠️  MRF URL for {hospital_info['hospital_name']} needs to be updated."
                 f"\n   Please visit: {hospital_info['url']}"
@@ -116,36 +469,70 @@ def download_hospital_mrf():
             continue
         
         # Determine filename from hospital key
-        destination = RAW_DATA_DIR / f"{hospital_key}_mrf.json"
-        
-        if download_file(
-            url=hospital_info["url"],
-            destination=destination,
-            description=f"{hospital_info['hospital_name']} MRF"
-        ):
-            success_count += 1
+        jobs.append({
+            "url": hospital_info["url"],
+            "destination": RAW_DATA_DIR / f"{hospital_key}_mrf.json",
+            "description": f"{hospital_info['hospital_name']} MRF"
+        })
     
-    logger.info(f"\nHospital MRF Downloads: {success_count}/{len(HOSPITAL_MRF_URLS)} successful")
-    return success_count > 0
+    return jobs
+
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Download CMS datasets and hospital MRF files")
+    parser.add_argument(
+        "--concurrency", type=int, default=DOWNLOAD_CONCURRENCY,
+        help="Maximum number of files downloaded at the same time"
+    )
+    parser.add_argument(
+        "--retries", type=int, default=DOWNLOAD_RETRIES,
+        help="Retries per file after the first attempt (each resumes the partial file)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Download every file in full, even if the server reports it unchanged"
+    )
+    return parser.parse_args(argv)
 
-def main():
-    """Main download orchestrator"""
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Main download orchestrator
+    
+    Returns:
+        Exit status: 0, or 1 if a download failed with no earlier copy to fall back on
+    """
+    args = parse_args(argv)
+    
     logger.info("🚀 Starting data download process...\n")
     
     # Create raw data directory if it doesn't exist
     RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Download CMS datasets
-    cms_success = download_cms_datasets()
+    logger.info("=" * 60)
+    logger.info("DOWNLOADING CMS BENCHMARKS AND HOSPITAL PRICE TRANSPARENCY FILES")
+    logger.info("=" * 60)
+    
+    cms_jobs = cms_download_jobs()
+    mrf_jobs = hospital_mrf_jobs()
+    
+    # CMS datasets and hospital MRFs share one pool
+    results = download_all(
+        cms_jobs + mrf_jobs, concurrency=args.concurrency, retries=args.retries, force=args.force
+    )
     
-    # Download hospital MRF files
-    mrf_success = download_hospital_mrf()
+    cms_count = sum(results[job["destination"]] for job in cms_jobs)
+    mrf_count = sum(results[job["destination"]] for job in mrf_jobs)
+    cms_success = cms_count == len(DATA_SOURCES)
+    mrf_success = mrf_count > 0
     
     # Summary
     logger.info("\n" + "=" * 60)
     logger.info("DOWNLOAD SUMMARY")
     logger.info("=" * 60)
+    logger.info(f"CMS Downloads: {cms_count}/{len(DATA_SOURCES)} successful")
+    logger.info(f"Hospital MRF Downloads: {mrf_count}/{len(HOSPITAL_MRF_URLS)} successful")
     logger.info(f"CMS Datasets: {'✓ Success' if cms_success else '✗ Failed'}")
     logger.info(f"Hospital MRFs: {'✓ Success' if mrf_success else '⚠️  Needs manual URL update'}")
     
@@ -156,8 +543,19 @@ def main():
         logger.info("3. Update URLs in scripts/etl/config.py")
         logger.info("4. Re-run this script")
     
+    # A failed re-download leaves the previous copy in place, which later stages can still use
+    failed = [destination for destination, success in results.items() if not success]
+    kept = [destination.name for destination in failed if destination.exists()]
+    missing = [destination.name for destination in failed if not destination.exists()]
+    if kept:
+        logger.warning(f"\n⚠️  {len(kept)} download(s) failed, keeping the previous copy: {', '.join(kept)}")
+    if missing:
+        logger.error(f"\n✗ {len(missing)} download(s) failed: {', '.join(missing)}")
+        return 1
+    
     logger.info("\n✅ Download process complete!")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,13 +1,41 @@
 """
-Process Inova Hospital CSV MRF Files
-Specialized parser for Inova's CSV-format price transparency files
+Process Inova Hospital MRF Files
+Specialized parsers for Inova's CSV-format price transparency files and
+CMS standard-charges JSON files
 """
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 from pathlib import Path
 import logging
-from typing import List, Dict
-from config import RAW_DATA_DIR, PROCESSED_DATA_DIR, TOP_ER_SERVICES
+import sys
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+from config import (
+    RAW_DATA_DIR, PROCESSED_DATA_DIR, MRF_CHUNK_ROWS, MRF_WORKERS,
+    MRF_SPLIT_BYTES, CSV_ENGINE, JSON_READ_SIZE, MRF_MANIFEST, MRF_CACHE_DIR,
+    MRF_COLUMNAR_DIR, MRF_COLUMNAR_ROW_GROUP_ROWS, HOSPITAL_MRF_URLS, MRF_ARCHIVE_DIR,
+    RATE_SKETCH_ACCURACY, RATE_SKETCHES_FILE
+)
+from fingerprint import file_fingerprint, same_content
+from mrf_layout import (
+    CCN_LABELS, METADATA_ROWS, default_ccn, default_hospital_name, get_mrf_layout,
+    layout_text_columns, layout_usecols, read_preamble_stream
+)
+from mrf_stream import is_placeholder_url, open_mrf_stream
+from quantile_sketch import ACCURACY_KEY, build_sketches, merge_sketches, sketch_counts
+from service_catalog import CODE_FORMAT, catalog_codes, normalize_code, normalize_codes
 
 # Setup logging
 logging.basicConfig(
@@ -16,8 +44,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Negotiated rates are stored as an Arrow list column (offsets + values)
+NEGOTIATED_RATES_DTYPE = pd.ArrowDtype(pa.list_(pa.float64()))
 
-def parse_inova_csv_mrf(file_path: Path) -> pd.DataFrame:
+
+def parse_inova_csv_mrf(
+    file_path: Path,
+    chunk_rows: Optional[int] = None,
+    codes: Optional[Set[str]] = None,
+    workers: int = 1,
+    engine: str = "pandas",
+    memory_map: bool = False
+) -> pd.DataFrame:
     """
     Parse Inova's CSV MRF format
     
@@ -28,181 +66,1259 @@ def parse_inova_csv_mrf(file_path: Path) -> pd.DataFrame:
     - Columns: description, revenue_code, setting, code, code_type, ...
     - Multiple payer-specific rate columns
     
+    Which columns hold codes, charges and rates is resolved from the
+    header row (see mrf_layout), and only those columns are read.
+    
+    When chunk_rows is set the file is streamed in chunks of that many rows,
+    so peak memory is bounded by the chunk size rather than the file size.
+    When codes is set, rows whose code is not in the set are dropped before
+    any rate parsing.
+    
+    With workers > 1 the data rows are split into newline-aligned byte
+    ranges that are parsed in separate processes and merged back in file
+    order, giving the same result as the serial parse.
+    
+    With engine="arrow" the file is read by Arrow's multithreaded CSV
+    reader with every needed column typed as string. Code filtering and
+    numeric conversion happen on Arrow arrays, and only the surviving rows
+    are converted to pandas.
+    
     Args:
         file_path: Path to Inova CSV MRF
+        chunk_rows: Rows per chunk (None reads the whole file at once)
+        codes: Optional set of codes to keep
+        workers: Number of processes to split the file across
+        engine: CSV reader, "pandas" or "arrow"
+        memory_map: Memory-map the file (arrow engine only)
         
     Returns:
         DataFrame with extracted pricing data
     """
     logger.info(f"Parsing Inova CSV MRF: {file_path.name}")
     
-    # Read file, skipping metadata rows
-    # Use latin-1 encoding to handle special characters
-    df = pd.read_csv(file_path, skiprows=3, low_memory=False, encoding='latin-1')
+    layout = get_mrf_layout(file_path)
     
-    logger.info(f"Loaded {len(df)} rows from {file_path.name}")
+    if workers > 1:
+        ranges = _split_byte_ranges(file_path, _find_data_offset(file_path), workers)
+        logger.info(f"Splitting {file_path.name} into {len(ranges)} byte ranges")
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_process_pool_context()) as pool:
+            futures = [
+                pool.submit(_parse_byte_range, file_path, range_start, range_end, layout, chunk_rows, codes, engine)
+                for range_start, range_end in ranges
+            ]
+            # Collect in range order so rows keep their original file order
+            results = [future.result() for future in futures]
+        
+        parts = [part for range_parts, _ in results for part in range_parts]
+        total_rows = sum(range_rows for _, range_rows in results)
+    elif engine == "arrow":
+        source = pa.memory_map(str(file_path)) if memory_map else pa.OSFile(str(file_path))
+        with source:
+            parts, total_rows = _read_charge_chunks_arrow(
+                source, layout, chunk_rows, codes, skip_rows=METADATA_ROWS + 1
+            )
+    else:
+        # Read file, skipping metadata and header rows
+        parts, total_rows = _read_charge_chunks(
+            file_path, layout, chunk_rows, codes, skiprows=METADATA_ROWS + 1
+        )
     
-    # The structure appears to be:
-    # Col 0: Description
-    # Col 1: Revenue Code
-    # Col 2: Setting (RC = Revenue Code)
-    # Col 3: Code (CPT/HCPCS)
-    # Col 4: Code Type
-    # Col 5: Setting Type
-    # Then various price columns
+    logger.info(f"Loaded {total_rows} rows from {file_path.name}")
     
-    # Get column names (first row after metadata)
-    col_names = df.columns.tolist()
+    result_df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
     
-    # Extract key columns
-    # Based on the sample, columns are positional
-    records = []
+    logger.info(f"✓ Extracted {len(result_df)} charge records")
     
-    for idx, row in df.iterrows():
-        try:
-            # Extract basic info from first few columns
-            description = str(row.iloc[0]) if pd.notna(row.iloc[0]) else ""
-            revenue_code = str(row.iloc[1]) if pd.notna(row.iloc[1]) else ""
-            code = str(row.iloc[3]) if pd.notna(row.iloc[3]) else ""
-            code_type = str(row.iloc[4]) if pd.notna(row.iloc[4]) else ""
-            
-            # Skip if no code
-            if not code or code == "nan":
+    return result_df
+
+
+def parse_csv_mrf_stream(
+    stream: BinaryIO,
+    file_path: Path,
+    chunk_rows: int = MRF_CHUNK_ROWS,
+    codes: Optional[Set[str]] = None,
+    engine: str = "pandas"
+) -> pd.DataFrame:
+    """
+    Parse a CSV MRF from a binary stream (e.g. an HTTP response body)
+    
+    The layout is resolved from the metadata and header rows at the head
+    of the stream, then data rows are read in chunks of chunk_rows and
+    filtered to codes, so memory holds one chunk plus the kept records.
+    
+    Args:
+        stream: Binary stream positioned at the start of the CSV
+        file_path: Name the MRF would have on disk (layout cache key and
+            hospital name fallback; never read)
+        chunk_rows: Rows per chunk
+        codes: Optional set of codes to keep
+        engine: CSV reader, "pandas" or "arrow"
+        
+    Returns:
+        DataFrame with extracted pricing data
+    """
+    logger.info(f"Parsing streamed CSV MRF: {file_path.name}")
+    
+    layout = get_mrf_layout(file_path, read_preamble_stream(stream))
+    
+    if engine == "arrow":
+        parts, total_rows = _read_charge_chunks_arrow(stream, layout, chunk_rows, codes)
+    else:
+        parts, total_rows = _read_charge_chunks(stream, layout, chunk_rows, codes)
+    
+    logger.info(f"Streamed {total_rows} rows of {file_path.name}")
+    
+    result_df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    
+    logger.info(f"✓ Extracted {len(result_df)} charge records")
+    
+    return result_df
+
+
+def _read_charge_chunks(
+    source,
+    layout: Dict,
+    chunk_rows: Optional[int],
+    codes: Optional[Set[str]],
+    **read_kwargs
+) -> Tuple[List[pd.DataFrame], int]:
+    """
+    Read CSV data rows and extract charge records chunk by chunk
+    
+    Args:
+        source: File path or buffer positioned at CSV rows
+        layout: MRF column layout
+        chunk_rows: Rows per chunk (None reads everything at once)
+        codes: Optional set of codes to keep
+        **read_kwargs: Extra pd.read_csv arguments (skiprows, ...)
+        
+    Returns:
+        Tuple of (list of non-empty record DataFrames, rows read)
+    """
+    # Read identifier columns as text so every chunk renders them the same way
+    text_dtypes = {name: str for name in layout_text_columns(layout)}
+    
+    read_kwargs.update(
+        header=None,
+        names=layout["columns"],
+        usecols=layout_usecols(layout),
+        dtype=text_dtypes,
+        encoding='latin-1'  # Use latin-1 encoding to handle special characters
+    )
+    
+    if chunk_rows:
+        chunks = pd.read_csv(source, chunksize=chunk_rows, **read_kwargs)
+    else:
+        chunks = [pd.read_csv(source, low_memory=False, **read_kwargs)]
+    
+    code_columns = [code_col for code_col, _ in layout["codes"]]
+    parts = []
+    total_rows = 0
+    
+    for chunk in chunks:
+        total_rows += len(chunk)
+        
+        if codes is not None:
+            matches = np.zeros(len(chunk), dtype=bool)
+            for code_col in code_columns:
+                matches |= normalize_codes(chunk[code_col])["code"].isin(codes).to_numpy()
+            chunk = chunk[matches]
+        
+        records = _extract_charge_records(chunk, layout)
+        
+        if not records.empty:
+            parts.append(records)
+    
+    return parts, total_rows
+
+
+# Plain decimal numbers, optionally signed and with an exponent
+_NUMERIC_PATTERN = r"^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$"
+
+
+def _arrow_to_float(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """
+    Convert a string column to float64, null where missing or non-numeric
+    
+    Args:
+        column: Arrow string column
+        
+    Returns:
+        Arrow float64 column
+    """
+    trimmed = pc.utf8_trim_whitespace(column)
+    numeric = pc.match_substring_regex(trimmed, _NUMERIC_PATTERN)
+    return pc.cast(pc.if_else(numeric, trimmed, pa.scalar(None, pa.string())), pa.float64())
+
+
+def _arrow_charge_records(table: pa.Table, layout: Dict, codes: Optional[Set[str]]) -> pd.DataFrame:
+    """
+    Filter and type an Arrow table of raw MRF rows, then extract charge records
+    
+    Args:
+        table: Raw MRF rows with every column as string
+        layout: MRF column layout
+        codes: Optional set of codes to keep
+        
+    Returns:
+        DataFrame of charge records
+    """
+    if codes is not None:
+        matches = np.zeros(table.num_rows, dtype=bool)
+        for code_col, _ in layout["codes"]:
+            matches |= normalize_codes(table[code_col])["code"].isin(codes).to_numpy()
+        table = table.filter(pa.array(matches))
+    
+    for name in [layout["gross_charge"], layout["cash_price"], *layout["rates"]]:
+        if name is not None:
+            table = table.set_column(table.schema.get_field_index(name), name, _arrow_to_float(table[name]))
+    
+    return _extract_charge_records(table.to_pandas(), layout)
+
+
+def _read_charge_chunks_arrow(
+    source,
+    layout: Dict,
+    chunk_rows: Optional[int],
+    codes: Optional[Set[str]],
+    skip_rows: int = 0
+) -> Tuple[List[pd.DataFrame], int]:
+    """
+    Read CSV data rows with Arrow and extract charge records
+    
+    Without chunk_rows the whole input is read at once with Arrow's
+    multithreaded reader. With chunk_rows the input is streamed and record
+    batches are processed in groups of about that many rows.
+    
+    Args:
+        source: Arrow input stream positioned at the start of the CSV
+        layout: MRF column layout
+        chunk_rows: Rows per chunk (None reads everything at once)
+        codes: Optional set of codes to keep
+        skip_rows: Leading rows to skip (metadata and header)
+        
+    Returns:
+        Tuple of (list of non-empty record DataFrames, rows read)
+    """
+    usecols = layout_usecols(layout)
+    read_options = pacsv.ReadOptions(
+        skip_rows=skip_rows, column_names=layout["columns"], encoding="latin1"
+    )
+    # Quoted fields may contain newlines (e.g. multi-line descriptions)
+    parse_options = pacsv.ParseOptions(newlines_in_values=True)
+    convert_options = pacsv.ConvertOptions(
+        include_columns=usecols,
+        column_types={name: pa.string() for name in usecols},
+        strings_can_be_null=True
+    )
+    
+    if chunk_rows:
+        reader = pacsv.open_csv(
+            source, read_options=read_options,
+            parse_options=parse_options, convert_options=convert_options
+        )
+        
+        def tables() -> Iterator[pa.Table]:
+            pending = []
+            pending_rows = 0
+            for batch in reader:
+                pending.append(batch)
+                pending_rows += batch.num_rows
+                if pending_rows >= chunk_rows:
+                    yield pa.Table.from_batches(pending)
+                    pending, pending_rows = [], 0
+            if pending:
+                yield pa.Table.from_batches(pending)
+        
+        chunks = tables()
+    else:
+        chunks = [pacsv.read_csv(
+            source, read_options=read_options,
+            parse_options=parse_options, convert_options=convert_options
+        )]
+    
+    parts = []
+    total_rows = 0
+    
+    for table in chunks:
+        total_rows += table.num_rows
+        records = _arrow_charge_records(table, layout, codes)
+        
+        if not records.empty:
+            parts.append(records)
+    
+    return parts, total_rows
+
+
+def _parse_byte_range(
+    file_path: Path,
+    start: int,
+    end: int,
+    layout: Dict,
+    chunk_rows: Optional[int],
+    codes: Optional[Set[str]],
+    engine: str = "pandas"
+) -> Tuple[List[pd.DataFrame], int]:
+    """
+    Parse the CSV rows in one byte range of an MRF (worker entry point)
+    
+    Args:
+        file_path: Path to Inova CSV MRF
+        start: Offset of the first byte of the range (a row start)
+        end: Offset just past the last row of the range
+        layout: MRF column layout
+        chunk_rows: Rows per chunk (None reads the range at once)
+        codes: Optional set of codes to keep
+        engine: CSV reader, "pandas" or "arrow"
+        
+    Returns:
+        Tuple of (list of record DataFrames, rows read)
+    """
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    
+    if not data.strip():
+        return [], 0
+    
+    if engine == "arrow":
+        return _read_charge_chunks_arrow(pa.BufferReader(data), layout, chunk_rows, codes)
+    
+    return _read_charge_chunks(io.BytesIO(data), layout, chunk_rows, codes)
+
+
+_CSV_ROW_BREAK = re.compile(rb'["\n]')
+
+
+def _next_row_start(f: BinaryIO, offset: int, in_quotes: bool, block_size: int = 1 << 16) -> Tuple[int, int]:
+    """
+    Find the start of the next CSV row at or after offset
+    
+    A newline only ends a row when it is outside a quoted field. Escaped
+    quotes ("") toggle the state twice, so counting quotes is enough.
+    
+    Args:
+        f: File opened in binary mode
+        offset: Byte offset to scan from
+        in_quotes: Whether offset lies inside a quoted field
+        block_size: Bytes to read per step
+        
+    Returns:
+        Tuple of (row start offset, quote characters passed while scanning)
+    """
+    f.seek(offset)
+    quotes = 0
+    
+    while True:
+        block = f.read(block_size)
+        if not block:
+            return offset, quotes
+        
+        for match in _CSV_ROW_BREAK.finditer(block):
+            if match.group() == b'"':
+                in_quotes = not in_quotes
+                quotes += 1
+            elif not in_quotes:
+                return offset + match.end(), quotes
+        
+        offset += len(block)
+
+
+def _find_data_offset(file_path: Path, header_rows: int = METADATA_ROWS + 1) -> int:
+    """
+    Byte offset of the first data row, after the metadata and header rows
+    
+    Args:
+        file_path: Path to Inova CSV MRF
+        header_rows: Metadata rows plus the column header row
+        
+    Returns:
+        Byte offset
+    """
+    offset = 0
+    with open(file_path, "rb") as f:
+        for _ in range(header_rows):
+            offset, _ = _next_row_start(f, offset, in_quotes=False)
+    return offset
+
+
+def _split_byte_ranges(file_path: Path, start: int, parts: int, block_size: int = 1 << 24) -> List[Tuple[int, int]]:
+    """
+    Split the data rows of a CSV into about equal, row-aligned byte ranges
+    
+    One sequential pass counts quote characters up to each split target,
+    which tells whether the target lies inside a quoted field (e.g. a
+    description with an embedded newline); the split is then moved to the
+    next row boundary.
+    
+    Args:
+        file_path: Path to CSV file
+        start: Byte offset of the first data row
+        parts: Desired number of ranges
+        block_size: Bytes to read per step while counting quotes
+        
+    Returns:
+        List of (start, end) byte offsets covering [start, file size)
+    """
+    size = file_path.stat().st_size
+    boundaries = [start]
+    
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        pos = start
+        quotes = 0
+        
+        for i in range(1, parts):
+            target = start + (size - start) * i // parts
+            if target <= boundaries[-1]:
                 continue
             
-            # Extract pricing columns (positions may vary, but typically:)
-            # Col 9: Gross Charge
-            # Col 10: De-identified Min
-            # Col 11: De-identified Max / Cash Price
+            while pos < target:
+                block = f.read(min(block_size, target - pos))
+                quotes += block.count(b'"')
+                pos += len(block)
             
-            gross_charge = None
-            cash_price = None
+            boundary, passed = _next_row_start(f, pos, in_quotes=quotes % 2 == 1)
+            quotes += passed
+            pos = boundary
+            f.seek(pos)
             
-            try:
-                if pd.notna(row.iloc[9]):
-                    gross_charge = float(row.iloc[9])
-            except (ValueError, IndexError):
-                pass
+            if boundary < size:
+                boundaries.append(boundary)
+    
+    boundaries.append(size)
+    
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def get_target_codes() -> Set[str]:
+    """
+    Get the set of service codes the pipeline keeps
+    
+    Returns:
+        Set of normalized CPT/HCPCS codes from SERVICE_CATALOG_FILE
+    """
+    return set(catalog_codes())
+
+
+def _text_column(df: pd.DataFrame, name: Optional[str]) -> pd.Series:
+    """
+    Render a column as text, with missing values as ""
+    
+    Args:
+        df: Raw MRF DataFrame
+        name: Column name (None gives all "")
+        
+    Returns:
+        Series of strings
+    """
+    if name is None:
+        return pd.Series("", index=df.index, dtype=object)
+    
+    col = df[name]
+    return col.astype(object).where(col.notna(), "").astype(str)
+
+
+def _numeric_column(df: pd.DataFrame, name: Optional[str]) -> pd.Series:
+    """
+    Coerce a column to float, NaN where missing or non-numeric
+    
+    String columns (any non-numeric cell makes read_csv keep the whole
+    column as text) are converted with the same Arrow kernels as the arrow
+    engine, which is several times faster than pd.to_numeric on strings.
+    
+    Args:
+        df: Raw MRF DataFrame
+        name: Column name (None gives all NaN)
+        
+    Returns:
+        float64 Series
+    """
+    if name is None:
+        return pd.Series(np.nan, index=df.index, dtype="float64")
+    
+    col = df[name]
+    if not isinstance(col.dtype, pd.StringDtype):
+        # Numeric columns, and object columns mixing parsed numbers with text
+        return pd.to_numeric(col, errors="coerce").astype("float64")
+    
+    values = _arrow_to_float(pa.array(col, type=pa.string(), from_pandas=True))
+    return pd.Series(values.to_numpy(zero_copy_only=False), index=df.index, dtype="float64")
+
+
+def _extract_charge_records(df: pd.DataFrame, layout: Dict) -> pd.DataFrame:
+    """
+    Extract charge records from a raw MRF DataFrame using column operations
+    
+    The layout names the description, revenue code, code/code-type pairs,
+    gross charge, cash price and payer rate columns. When a file has several
+    code columns (code|1, code|2, ...) the first code not typed "RC" is the
+    billing code and the first "RC" code is the revenue code. CPT/HCPCS
+    billing codes are normalized (padding, case, modifier suffixes split
+    into the modifier column); other codes are kept as written.
+    
+    Args:
+        df: Raw MRF DataFrame (metadata rows already skipped)
+        layout: MRF column layout
+        
+    Returns:
+        DataFrame with one row per charge that has a code
+    """
+    if not layout["codes"]:
+        return pd.DataFrame()
+    
+    if layout["revenue_code"] or (len(layout["codes"]) == 1 and layout["codes"][0][1] is None):
+        code_col, type_col = layout["codes"][0]
+        code = _text_column(df, code_col)
+        code_type = _text_column(df, type_col)
+        revenue_code = _text_column(df, layout["revenue_code"])
+    else:
+        code = pd.Series("", index=df.index, dtype=object)
+        code_type = pd.Series("", index=df.index, dtype=object)
+        revenue_code = pd.Series("", index=df.index, dtype=object)
+        for code_col, type_col in layout["codes"]:
+            pair_code = _text_column(df, code_col)
+            pair_type = _text_column(df, type_col)
+            present = pair_code.str.strip() != ""
+            is_revenue = pair_type.str.strip().str.upper() == "RC"
             
-            try:
-                if pd.notna(row.iloc[11]):
-                    cash_price = float(row.iloc[11])
-            except (ValueError, IndexError):
-                pass
+            fill_code = (code == "") & present & ~is_revenue
+            code = code.where(~fill_code, pair_code)
+            code_type = code_type.where(~fill_code, pair_type)
+            revenue_code = revenue_code.where(~((revenue_code == "") & present & is_revenue), pair_code)
+    
+    # Skip rows with no code
+    keep = ((code != "") & (code != "nan")).to_numpy()
+    df = df[keep]
+    code = code[keep]
+    
+    if df.empty:
+        return pd.DataFrame()
+    
+    # Scan payer rate columns for numeric values that look like rates
+    if layout["rates"]:
+        rates = np.column_stack([
+            _numeric_column(df, name).to_numpy() for name in layout["rates"]
+        ])
+    else:
+        rates = np.empty((len(df), 0))
+    
+    with np.errstate(invalid="ignore"):
+        valid = (rates > 0) & (rates < 100000)  # Sanity check
+    
+    # Row-major nonzero keeps each row's rates in column order
+    row_idx, col_idx = np.nonzero(valid)
+    counts = np.bincount(row_idx, minlength=len(df))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+    negotiated_rates = pa.ListArray.from_arrays(offsets, rates[row_idx, col_idx])
+    
+    normalized = normalize_codes(code)
+    
+    return pd.DataFrame({
+        "code": normalized["code"].fillna(code.str.strip()).to_numpy(),
+        "modifier": normalized["modifier"].fillna("").to_numpy(),
+        "description": _text_column(df, layout["description"]).str.strip().to_numpy(),
+        "revenue_code": revenue_code[keep].to_numpy(),
+        "code_type": code_type[keep].to_numpy(),
+        "gross_charge": _numeric_column(df, layout["gross_charge"]).to_numpy(),
+        "cash_price": _numeric_column(df, layout["cash_price"]).to_numpy(),
+        "negotiated_rates": pd.arrays.ArrowExtensionArray(negotiated_rates),
+        "hospital_name": layout["hospital_name"],
+        "ccn": layout["ccn"]
+    })
+
+
+def iter_json_mrf_records(
+    file_path: Path,
+    codes: Optional[Set[str]] = None,
+    read_size: int = JSON_READ_SIZE,
+    stream: Optional[TextIO] = None
+) -> Iterator[Dict]:
+    """
+    Stream charge records out of a CMS standard-charges JSON MRF
+    
+    The file is read in fixed-size text blocks and each element of the
+    standard_charge_information array is decoded on its own, so memory
+    stays bounded by one item rather than the whole file.
+    
+    Each (code, standard_charges entry) pair becomes one record with the
+    same fields as the CSV parser. Revenue codes ("RC") are attached to
+    the record rather than emitted as codes.
+    
+    Args:
+        file_path: Path to JSON MRF (only named, not opened, when stream is set)
+        codes: Optional set of codes to keep
+        read_size: Characters to read per block
+        stream: Text stream to read instead of opening file_path
+        
+    Yields:
+        Dict with code, description, revenue_code, code_type, gross_charge,
+        cash_price, negotiated_rates, hospital_name and ccn
+    """
+    decoder = json.JSONDecoder()
+    
+    with nullcontext(stream) if stream is not None else open(file_path, "r", encoding="utf-8") as f:
+        buffer, prefix = _seek_json_array(f, "standard_charge_information", read_size)
+        hospital_name = _json_metadata_value(prefix, ["hospital_name"]) or default_hospital_name(file_path)
+        ccn = _json_metadata_value(prefix, CCN_LABELS) or default_ccn(file_path)
+        
+        pos = 0
+        eof = False
+        
+        while True:
+            # Skip separators between array items
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
             
-            # Extract negotiated rates from remaining columns
-            # Payer-specific rates appear in groups of 3: rate, percentage, method
-            negotiated_rates = []
+            if pos >= len(buffer):
+                if eof:
+                    raise ValueError(f"Unterminated standard_charge_information array in {file_path.name}")
+                buffer = buffer[pos:] + f.read(read_size)
+                pos = 0
+                eof = len(buffer) == 0
+                continue
             
-            # Scan columns for numeric values that look like rates
-            for col_idx in range(12, min(len(row), 100), 3):  # Check every 3rd column
-                try:
-                    if pd.notna(row.iloc[col_idx]):
-                        rate = float(row.iloc[col_idx])
-                        if rate > 0 and rate < 100000:  # Sanity check
-                            negotiated_rates.append(rate)
-                except (ValueError, IndexError):
-                    continue
+            if buffer[pos] == "]":
+                return
             
-            records.append({
-                "code": code.strip(),
-                "description": description.strip(),
-                "revenue_code": revenue_code,
-                "code_type": code_type,
-                "gross_charge": gross_charge,
-                "cash_price": cash_price,
-                "negotiated_rates": negotiated_rates,
-                "hospital_name": "Inova Alexandria Hospital"
-            })
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Item straddles the block boundary - read more and retry
+                block = f.read(read_size)
+                if not block:
+                    raise
+                buffer = buffer[pos:] + block
+                pos = 0
+                continue
             
-        except Exception as e:
-            logger.debug(f"Skipping row {idx}: {e}")
+            pos = end
+            if pos > read_size:
+                buffer = buffer[pos:]
+                pos = 0
+            
+            yield from _json_item_records(item, hospital_name, ccn, codes)
+
+
+def _seek_json_array(f: TextIO, key: str, read_size: int) -> Tuple[str, str]:
+    """
+    Advance a JSON text stream to just inside the array stored under key
+    
+    Args:
+        f: Open text file
+        key: Top-level key holding the array
+        read_size: Characters to read per block
+        
+    Returns:
+        Tuple of (buffer starting after the opening bracket, text before the key)
+    """
+    pattern = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+    buffer = ""
+    prefix = ""
+    
+    while True:
+        block = f.read(read_size)
+        if not block:
+            raise ValueError(f"No '{key}' array found")
+        
+        buffer += block
+        match = pattern.search(buffer)
+        if match:
+            return buffer[match.end():], prefix + buffer[:match.start()]
+        
+        # Keep enough of the tail to match a key split across blocks, and
+        # at most one block of leading metadata
+        keep = len(key) + 64
+        if len(prefix) < read_size:
+            prefix += buffer[:-keep]
+        buffer = buffer[-keep:]
+
+
+def _json_metadata_value(prefix: str, keys: List[str]) -> Optional[str]:
+    """
+    Extract a value from the metadata that precedes the charges array
+    
+    Args:
+        prefix: JSON text before standard_charge_information
+        keys: Keys to try in order (e.g. CCN_LABELS); string and number values are read
+        
+    Returns:
+        The value as text, or None if no key is present
+    """
+    for key in keys:
+        match = re.search(r'"' + re.escape(key) + r'"\s*:\s*("(?:[^"\\]|\\.)*"|\d+)', prefix)
+        if match:
+            value = str(json.loads(match.group(1))).strip()
+            if value:
+                return value
+    
+    return None
+
+
+def _to_float(value) -> Optional[float]:
+    """Convert a JSON scalar to float, None if missing or non-numeric"""
+    if value is None:
+        return None
+    
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_item_records(
+    item: Dict,
+    hospital_name: str,
+    ccn: Optional[str],
+    codes: Optional[Set[str]]
+) -> Iterator[Dict]:
+    """
+    Convert one standard_charge_information item into charge records
+    
+    Args:
+        item: Decoded array item
+        hospital_name: Hospital name from the file metadata
+        ccn: Hospital CCN from the file metadata or HOSPITAL_MRF_URLS
+        codes: Optional set of codes to keep
+        
+    Yields:
+        Charge record dicts
+    """
+    code_info = item.get("code_information") or []
+    
+    revenue_code = ""
+    billing_codes = []
+    for info in code_info:
+        code = str(info.get("code") or "").strip()
+        code_type = str(info.get("type") or "")
+        if not code:
             continue
+        if code_type.upper() == "RC":
+            revenue_code = revenue_code or code
+        else:
+            normalized, modifier = normalize_code(code)
+            billing_codes.append((normalized or code, modifier or "", code_type))
     
-    result_df = pd.DataFrame(records)
+    if codes is not None:
+        billing_codes = [billing for billing in billing_codes if billing[0] in codes]
     
-    logger.info(f"✓ Extracted {len(result_df)} charge records")
+    if not billing_codes:
+        return
     
-    return result_df
+    description = str(item.get("description") or "").strip()
+    
+    for charge in item.get("standard_charges") or []:
+        negotiated_rates = []
+        for payer in charge.get("payers_information") or []:
+            rate = _to_float(payer.get("standard_charge_dollar", payer.get("negotiated_dollar")))
+            if rate is not None and 0 < rate < 100000:  # Sanity check
+                negotiated_rates.append(rate)
+        
+        for code, modifier, code_type in billing_codes:
+            yield {
+                "code": code,
+                "modifier": modifier,
+                "description": description,
+                "revenue_code": revenue_code,
+                "code_type": code_type,
+                "gross_charge": _to_float(charge.get("gross_charge")),
+                "cash_price": _to_float(charge.get("discounted_cash")),
+                "negotiated_rates": list(negotiated_rates),
+                "hospital_name": hospital_name,
+                "ccn": ccn
+            }
 
 
-def filter_to_er_services(df: pd.DataFrame) -> pd.DataFrame:
+def parse_json_mrf(
+    file_path: Path,
+    codes: Optional[Set[str]] = None,
+    stream: Optional[TextIO] = None
+) -> pd.DataFrame:
     """
-    Filter to only ER-relevant services from TOP_ER_SERVICES
+    Parse a CMS standard-charges JSON MRF
     
     Args:
-        df: DataFrame with all charges
+        file_path: Path to JSON MRF (only named, not opened, when stream is set)
+        codes: Optional set of codes to keep
+        stream: Text stream to read instead of opening file_path
         
     Returns:
-        Filtered DataFrame
+        DataFrame with extracted pricing data
     """
-    target_codes = [service["code"] for service in TOP_ER_SERVICES]
+    logger.info(f"Parsing JSON MRF: {file_path.name}")
     
-    filtered = df[df["code"].isin(target_codes)].copy()
+    result_df = pd.DataFrame(list(iter_json_mrf_records(file_path, codes=codes, stream=stream)))
     
-    logger.info(f"Filtered to {len(filtered)} ER-relevant services (from {len(df)} total)")
-    logger.info(f"Found codes: {sorted(filtered['code'].unique())}")
+    if not result_df.empty:
+        result_df["negotiated_rates"] = result_df["negotiated_rates"].astype(NEGOTIATED_RATES_DTYPE)
     
-    return filtered
+    logger.info(f"✓ Extracted {len(result_df)} charge records")
+    
+    return result_df
 
 
-def calculate_negotiated_stats(negotiated_rates: List[float]) -> Dict:
+def filter_to_catalog_services(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Calculate min, median, max from negotiated rates
+    Filter to the services in SERVICE_CATALOG_FILE
     
     Args:
-        negotiated_rates: List of rates
+        df: DataFrame with all charges
         
     Returns:
-        Dict with min, median, max, payer_count
-    """
-    if not negotiated_rates or len(negotiated_rates) == 0:
-        return {
-            "negotiated_min": None,
-            "negotiated_median": None,
-            "negotiated_max": None,
-            "payer_count": 0
-        }
+        Filtered DataFrame
+    """
+    filtered = df[df["code"].isin(get_target_codes())].copy()
     
-    rates = [r for r in negotiated_rates if r > 0]
+    codes = filtered["code"].unique()
+    logger.info(f"Filtered to {len(filtered)} catalog services (from {len(df)} total)")
+    logger.info(f"Found {len(codes)} codes: {', '.join(sorted(codes)[:20])}{' ...' if len(codes) > 20 else ''}")
     
-    if not rates:
-        return {
-            "negotiated_min": None,
-            "negotiated_median": None,
-            "negotiated_max": None,
-            "payer_count": 0
-        }
-    
-    return {
-        "negotiated_min": min(rates),
-        "negotiated_median": pd.Series(rates).median(),
-        "negotiated_max": max(rates),
-        "payer_count": len(rates)
-    }
+    return filtered
 
 
 def expand_negotiated_rates(df: pd.DataFrame) -> pd.DataFrame:
     """
     Expand negotiated_rates column into min/median/max columns
     
+    The rates are an Arrow list column, i.e. one flat values array plus
+    row offsets. Statistics are computed as grouped reductions over the
+    flat values: sort by (row, rate) once, then read min, max and the
+    middle element(s) of each row's run. Each row also gets a quantile
+    sketch of its rates (negotiated_sketch), which save_processed_data
+    merges per code and hospital.
+    
     Args:
         df: DataFrame with negotiated_rates column
         
     Returns:
         DataFrame with expanded columns
     """
-    stats = df["negotiated_rates"].apply(calculate_negotiated_stats)
-    stats_df = pd.DataFrame(stats.tolist())
+    rates = pa.chunked_array(pa.array(df["negotiated_rates"], type=NEGOTIATED_RATES_DTYPE.pyarrow_dtype))
+    
+    values = pc.list_flatten(rates).to_numpy(zero_copy_only=False)
+    rows = pc.list_parent_indices(rates).to_numpy(zero_copy_only=False)
+    
+    with np.errstate(invalid="ignore"):
+        positive = values > 0
+    values = values[positive]
+    rows = rows[positive]
+    
+    order = np.lexsort((values, rows))
+    values = values[order]
+    rows = rows[order]
+    
+    counts = np.bincount(rows, minlength=len(df))
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    has_rates = counts > 0
+    
+    negotiated_min = np.full(len(df), np.nan)
+    negotiated_median = np.full(len(df), np.nan)
+    negotiated_max = np.full(len(df), np.nan)
+    
+    first = starts[has_rates]
+    n = counts[has_rates]
+    negotiated_min[has_rates] = values[first]
+    negotiated_max[has_rates] = values[first + n - 1]
+    negotiated_median[has_rates] = (values[first + (n - 1) // 2] + values[first + n // 2]) / 2
     
-    result = pd.concat([df.drop("negotiated_rates", axis=1), stats_df], axis=1)
+    result = df.drop("negotiated_rates", axis=1).reset_index(drop=True)
+    result["negotiated_min"] = negotiated_min
+    result["negotiated_median"] = negotiated_median
+    result["negotiated_max"] = negotiated_max
+    result["payer_count"] = counts
+    result["negotiated_sketch"] = pd.arrays.ArrowExtensionArray(
+        build_sketches(values, rows, len(df), RATE_SKETCH_ACCURACY)
+    )
     
     return result
 
 
-def process_inova_mrf_files() -> pd.DataFrame:
+def columnar_path(mrf_file: Path) -> Path:
+    """
+    Location of the columnar (Parquet) copy of a raw MRF
+    
+    Args:
+        mrf_file: Path to CSV or JSON MRF
+        
+    Returns:
+        Path in MRF_COLUMNAR_DIR
+    """
+    return MRF_COLUMNAR_DIR / f"{mrf_file.stem}.parquet"
+
+
+def _columnar_source(path: Path) -> Optional[Dict]:
+    """Fingerprint of the raw file a columnar copy was built from (None if missing or unreadable)"""
+    if not path.exists():
+        return None
+    
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        # A copy with codes normalized another way is rebuilt
+        if metadata.get(b"code_format") != CODE_FORMAT.encode():
+            return None
+        return json.loads(metadata[b"mrf_source"])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+
+def convert_mrf_to_columnar(
+    mrf_file: Path,
+    chunk_rows: Optional[int] = None,
+    workers: int = 1,
+    engine: str = "pandas",
+    memory_map: bool = False
+) -> Path:
+    """
+    Convert a raw MRF to a Parquet copy sorted by code, once per file version
+    
+    Every charge record is kept (no code filter), sorted by code and
+    written zstd-compressed in row groups of MRF_COLUMNAR_ROW_GROUP_ROWS
+    with min/max statistics. Because rows are sorted, each row group covers
+    a narrow code range and a filter on any code set only reads the row
+    groups that can contain those codes. The raw file's fingerprint is
+    stored in the Parquet metadata; the copy is rebuilt only when the raw
+    content changes.
+    
+    Args:
+        mrf_file: Path to CSV or JSON MRF
+        chunk_rows: Rows per chunk for CSV files (None reads the whole file)
+        workers: Processes to split a CSV file across
+        engine: CSV reader, "pandas" or "arrow"
+        memory_map: Memory-map CSV files (arrow engine only)
+        
+    Returns:
+        Path to the columnar copy
+    """
+    output_file = columnar_path(mrf_file)
+    previous = _columnar_source(output_file)
+    fingerprint = file_fingerprint(mrf_file, previous)
+    
+    if previous and same_content(previous, fingerprint):
+        return output_file
+    
+    logger.info(f"Converting {mrf_file.name} to columnar format (one-time)")
+    
+    if mrf_file.suffix == ".json":
+        df = parse_json_mrf(mrf_file)
+    else:
+        df = parse_inova_csv_mrf(
+            mrf_file, chunk_rows=chunk_rows, workers=workers, engine=engine, memory_map=memory_map
+        )
+    
+    if df.empty:
+        # Keep the schema so lookups on an empty file still work
+        df = pd.DataFrame({
+            "code": pd.Series(dtype=str),
+            "modifier": pd.Series(dtype=str),
+            "description": pd.Series(dtype=str),
+            "revenue_code": pd.Series(dtype=str),
+            "code_type": pd.Series(dtype=str),
+            "gross_charge": pd.Series(dtype=float),
+            "cash_price": pd.Series(dtype=float),
+            "negotiated_rates": pd.Series(dtype=NEGOTIATED_RATES_DTYPE),
+            "hospital_name": pd.Series(dtype=str),
+            "ccn": pd.Series(dtype=str)
+        })
+    
+    # pandas metadata is dropped: it cannot describe the Arrow list dtype on read
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    del df
+    table = table.sort_by("code")
+    table = table.replace_schema_metadata({
+        b"mrf_source": json.dumps(fingerprint).encode("utf-8"),
+        b"code_format": CODE_FORMAT.encode()
+    })
+    
+    # Write to a temporary name so an interrupted run never leaves a partial copy
+    MRF_COLUMNAR_DIR.mkdir(parents=True, exist_ok=True)
+    temp_file = output_file.with_suffix(".parquet.tmp")
+    pq.write_table(
+        table,
+        temp_file,
+        row_group_size=MRF_COLUMNAR_ROW_GROUP_ROWS,
+        compression="zstd",
+        write_statistics=True
+    )
+    temp_file.replace(output_file)
+    
+    logger.info(
+        f"✓ Wrote {output_file.name}: {table.num_rows} records, "
+        f"{output_file.stat().st_size / 1024 / 1024:.2f} MB"
+    )
+    
+    return output_file
+
+
+def read_columnar_mrf(path: Path, codes: Optional[Set[str]] = None) -> pd.DataFrame:
+    """
+    Read charge records for a code set from a columnar MRF copy
+    
+    The code filter is pushed down to the Parquet reader, so row groups
+    whose code statistics exclude every requested code are skipped.
+    
+    Args:
+        path: Columnar copy from convert_mrf_to_columnar
+        codes: Codes to read (None reads every record)
+        
+    Returns:
+        DataFrame with extracted pricing data, sorted by code
+    """
+    filters = [("code", "in", sorted(codes))] if codes is not None else None
+    table = pq.read_table(path, filters=filters)
+    
+    return table.to_pandas(
+        types_mapper=lambda arrow_type: NEGOTIATED_RATES_DTYPE if pa.types.is_list(arrow_type) else None
+    )
+
+
+def process_mrf_file(
+    mrf_file: Path,
+    chunk_rows: Optional[int] = None,
+    workers: int = 1,
+    engine: str = "pandas",
+    memory_map: bool = False,
+    columnar: bool = False
+) -> pd.DataFrame:
+    """
+    Parse one MRF file and filter it to ER services
+    
+    Module-level so it can be handed to a worker process.
+    
+    Args:
+        mrf_file: Path to CSV or JSON MRF
+        chunk_rows: Rows per chunk for CSV files (None reads the whole file)
+        workers: Processes to split a CSV file across
+        engine: CSV reader, "pandas" or "arrow"
+        memory_map: Memory-map CSV files (arrow engine only)
+        columnar: Read through the file's columnar copy, converting it first if needed
+        
+    Returns:
+        Filtered DataFrame (empty if nothing matched)
+    """
+    if columnar:
+        df = read_columnar_mrf(
+            convert_mrf_to_columnar(mrf_file, chunk_rows, workers, engine, memory_map),
+            codes=get_target_codes()
+        )
+    # JSON files are always streamed item by item
+    elif mrf_file.suffix == ".json":
+        df = parse_json_mrf(mrf_file, codes=get_target_codes())
+    # Parse Inova CSV
+    elif chunk_rows:
+        df = parse_inova_csv_mrf(
+            mrf_file, chunk_rows=chunk_rows, codes=get_target_codes(),
+            workers=workers, engine=engine, memory_map=memory_map
+        )
+    else:
+        df = parse_inova_csv_mrf(mrf_file, workers=workers, engine=engine, memory_map=memory_map)
+    
+    if df.empty:
+        logger.warning(f"No charges extracted from {mrf_file.name}")
+        return df
+    
+    # Filter to ER services
+    df_filtered = filter_to_catalog_services(df)
+    
+    if df_filtered.empty:
+        logger.warning(f"No ER services found in {mrf_file.name}")
+    
+    return df_filtered
+
+
+def _process_pool_context():
+    """
+    Multiprocessing context for parse workers
+    
+    The stage scripts are not importable by module name (numeric prefix),
+    so workers are forked where the platform allows it and inherit the
+    already-loaded module instead of re-importing it.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def _parse_files(
+    mrf_files: List[Path],
+    chunk_rows: Optional[int],
+    workers: int,
+    engine: str = "pandas",
+    memory_map: bool = False,
+    columnar: bool = False
+) -> Tuple[Dict[Path, pd.DataFrame], List[Path]]:
+    """
+    Parse and filter a list of MRF files, serially or in a process pool
+    
+    Args:
+        mrf_files: Files to parse
+        chunk_rows: Rows per chunk (None reads each file whole)
+        workers: Number of worker processes
+        engine: CSV reader, "pandas" or "arrow"
+        memory_map: Memory-map CSV files (arrow engine only)
+        columnar: Read through columnar copies of the raw files
+        
+    Returns:
+        Tuple of (filtered frame per file, files that failed)
+    """
+    results: Dict[Path, pd.DataFrame] = {}
+    failed = []
+    
+    if workers > 1:
+        large_files = [
+            mrf_file for mrf_file in mrf_files
+            if mrf_file.suffix == ".csv" and mrf_file.stat().st_size >= MRF_SPLIT_BYTES
+        ]
+        small_files = [mrf_file for mrf_file in mrf_files if mrf_file not in large_files]
+        
+        for mrf_file in large_files:
+            try:
+                results[mrf_file] = process_mrf_file(mrf_file, chunk_rows, workers, engine, memory_map, columnar)
+            except Exception as e:
+                logger.error(f"✗ Failed to process {mrf_file.name}: {e}")
+                failed.append(mrf_file)
+        
+        logger.info(f"Parsing {len(small_files)} files with {workers} workers")
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_process_pool_context()) as pool:
+            futures = {
+                pool.submit(process_mrf_file, mrf_file, chunk_rows, 1, engine, memory_map, columnar): mrf_file
+                for mrf_file in small_files
+            }
+            for future in as_completed(futures):
+                mrf_file = futures[future]
+                try:
+                    results[mrf_file] = future.result()
+                except Exception as e:
+                    logger.error(f"✗ Failed to process {mrf_file.name}: {e}")
+                    failed.append(mrf_file)
+    else:
+        for mrf_file in mrf_files:
+            try:
+                results[mrf_file] = process_mrf_file(mrf_file, chunk_rows, 1, engine, memory_map, columnar)
+            except Exception as e:
+                logger.error(f"✗ Failed to process {mrf_file.name}: {e}")
+                failed.append(mrf_file)
+    
+    return results, failed
+
+
+def load_manifest() -> Dict:
+    """
+    Load the MRF processing manifest
+    
+    Returns:
+        Dict of filename -> fingerprint and cached output info
+    """
+    if not MRF_MANIFEST.exists():
+        return {}
+    
+    try:
+        return json.loads(MRF_MANIFEST.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable manifest {MRF_MANIFEST.name}: {e}")
+        return {}
+
+
+def save_manifest(manifest: Dict):
+    """
+    Save the MRF processing manifest
+    
+    Args:
+        manifest: Dict of filename -> fingerprint and cached output info
+    """
+    MRF_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    MRF_MANIFEST.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def _write_cache(df: pd.DataFrame, path: Path):
+    """Save a file's processed output, without pandas metadata (it cannot describe the sketch column)"""
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None), path)
+
+
+def _read_cache(path: Path) -> pd.DataFrame:
+    """Load a file's processed output saved by _write_cache, with the sketch column as an Arrow list"""
+    return pq.read_table(path).to_pandas(
+        types_mapper=lambda arrow_type: pd.ArrowDtype(arrow_type) if pa.types.is_list(arrow_type) else None
+    )
+
+
+def _codes_key() -> str:
+    """Hash of the target code set and code normalization, so a change to either invalidates cached outputs"""
+    return hashlib.sha256(f"{CODE_FORMAT}:{','.join(sorted(get_target_codes()))}".encode()).hexdigest()[:16]
+
+
+def _is_current(entry: Optional[Dict], fingerprint: Dict, codes_key: str) -> bool:
     """
-    Process all Inova CSV MRF files in raw data directory
+    Whether a manifest entry still describes a file's cached output
+    
+    Args:
+        entry: Manifest entry (None if the file is new)
+        fingerprint: Fresh fingerprint of the raw file
+        codes_key: Hash of the current target code set
+        
+    Returns:
+        True if the cached output can be reused
+    """
+    if not entry or entry.get("codes") != codes_key:
+        return False
+    
+    # Sketches built with another accuracy cannot be merged with new ones
+    if entry.get("sketch_accuracy") != RATE_SKETCH_ACCURACY:
+        return False
+    
+    if not same_content(entry, fingerprint):
+        return False
+    
+    return _cached_output_exists(entry)
+
+
+def _cached_output_exists(entry: Dict) -> bool:
+    """Whether a manifest entry's cached output is on disk (an entry without rows has none to lose)"""
+    return entry.get("output") is None or (MRF_CACHE_DIR / entry["output"]).exists()
+
+
+def process_inova_mrf_files(
+    chunk_rows: Optional[int] = None,
+    workers: int = 1,
+    incremental: bool = True,
+    engine: str = "pandas",
+    memory_map: bool = False,
+    columnar: bool = False
+) -> pd.DataFrame:
+    """
+    Process all Inova CSV and JSON MRF files in raw data directory
+    
+    In streaming mode (chunk_rows set) each file is read in bounded chunks
+    and non-target codes are dropped before parsing, so only the filtered
+    records of each file are ever held in memory.
+    
+    With workers > 1 each file is parsed and filtered in a process pool.
+    Results are combined in file order regardless of completion order, and
+    a file that fails is logged and skipped without aborting the batch.
+    CSV files of at least MRF_SPLIT_BYTES are instead split into byte
+    ranges and parsed across all workers one at a time, so a single huge
+    file does not serialize the run.
+    
+    Each file's filtered output is cached as Parquet in MRF_CACHE_DIR and
+    recorded in MRF_MANIFEST with the file's fingerprint (size, mtime,
+    content hash). In incremental mode only new or changed files are
+    parsed; unchanged files reuse their cached output, and a changed file
+    that fails to parse keeps its last good output.
+    
+    In columnar mode each raw file is first converted once to a Parquet
+    copy sorted by code (see convert_mrf_to_columnar), and parsing reads
+    only the target codes from that copy. A new code list then costs a
+    Parquet lookup instead of a full re-parse of the raw file.
+    
+    Args:
+        chunk_rows: Rows per chunk (None reads each file whole)
+        workers: Number of worker processes
+        incremental: Reuse cached outputs of unchanged files
+        engine: CSV reader, "pandas" or "arrow"
+        memory_map: Memory-map CSV files (arrow engine only)
+        columnar: Read through columnar copies of the raw files
     
     Returns:
         Combined DataFrame of all hospital prices
@@ -211,44 +1327,204 @@ def process_inova_mrf_files() -> pd.DataFrame:
     logger.info("PROCESSING INOVA CSV MRF FILES")
     logger.info("=" * 60)
     
-    all_data = []
-    
-    # Find all Inova MRF files (CSV format)
-    mrf_files = list(RAW_DATA_DIR.glob("inova*_mrf.csv"))
+    # Find every hospital's MRF file (CSV and JSON format); each is matched to
+    # the provider registry by its CCN, so any hospital in the registry can be added
+    mrf_files = sorted(RAW_DATA_DIR.glob("*_mrf.csv")) + sorted(RAW_DATA_DIR.glob("*_mrf.json"))
     
     if not mrf_files:
-        logger.warning("⚠️  No Inova MRF files found in data/raw/")
-        logger.info("Expected filename pattern: inova*_mrf.csv")
+        logger.warning("⚠️  No MRF files found in data/raw/")
+        logger.info("Expected filename pattern: <hospital>_mrf.csv or <hospital>_mrf.json")
         return pd.DataFrame()
     
-    for mrf_file in mrf_files:
-        # Parse Inova CSV
-        df = parse_inova_csv_mrf(mrf_file)
+    manifest = load_manifest()
+    codes_key = _codes_key()
+    fingerprints = {
+        mrf_file: file_fingerprint(mrf_file, manifest.get(mrf_file.name))
+        for mrf_file in mrf_files
+    }
+    
+    to_parse = [
+        mrf_file for mrf_file in mrf_files
+        if not incremental or not _is_current(manifest.get(mrf_file.name), fingerprints[mrf_file], codes_key)
+    ]
+    
+    logger.info(f"{len(mrf_files) - len(to_parse)} unchanged, {len(to_parse)} new or changed MRF file(s)")
+    
+    results, failed = _parse_files(to_parse, chunk_rows, workers, engine, memory_map, columnar)
+    
+    # Expand negotiated rates per file and refresh the cache
+    for mrf_file, df in results.items():
+        output = None
+        if not df.empty:
+            df = expand_negotiated_rates(df)
+            results[mrf_file] = df
+            
+            output = f"{mrf_file.stem}.parquet"
+            MRF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            _write_cache(df, MRF_CACHE_DIR / output)
         
-        if df.empty:
-            logger.warning(f"No charges extracted from {mrf_file.name}")
+        manifest[mrf_file.name] = {
+            **fingerprints[mrf_file],
+            "codes": codes_key,
+            "sketch_accuracy": RATE_SKETCH_ACCURACY,
+            "output": output,
+            "rows": len(df)
+        }
+    
+    for mrf_file in mrf_files:
+        if mrf_file in results:
             continue
+        entry = manifest.get(mrf_file.name)
+        if mrf_file in failed:
+            # A file that fails to re-parse keeps its last good output (and its old
+            # manifest entry, so the next run tries it again)
+            if not incremental or not entry or not _cached_output_exists(entry):
+                continue
+            logger.warning(f"⚠️  Keeping the last good output of {mrf_file.name}")
+        output = entry["output"]
+        results[mrf_file] = _read_cache(MRF_CACHE_DIR / output) if output else pd.DataFrame()
+    
+    # Forget files that are no longer in the raw directory
+    current = {mrf_file.name for mrf_file in mrf_files}
+    for name in [name for name in manifest if name not in current]:
+        output = manifest.pop(name).get("output")
+        if output:
+            (MRF_CACHE_DIR / output).unlink(missing_ok=True)
+    save_manifest(manifest)
+    
+    # Combine in file order so output does not depend on completion order
+    all_data = [
+        results[mrf_file] for mrf_file in mrf_files
+        if mrf_file in results and not results[mrf_file].empty
+    ]
+    
+    if failed:
+        logger.warning(f"⚠️  {len(failed)} MRF file(s) failed: {', '.join(f.name for f in failed)}")
+    
+    if not all_data:
+        logger.error("✗ No data extracted from any MRF files")
+        return pd.DataFrame()
+    
+    # Combine all hospitals
+    combined = pd.concat(all_data, ignore_index=True)
+    
+    logger.info(f"\n✓ Processed {len(mrf_files) - len(failed)}/{len(mrf_files)} MRF files")
+    logger.info(f"✓ Total records: {len(combined)}")
+    logger.info(f"✓ Unique services: {combined['code'].nunique()}")
+    logger.info(f"✓ Hospitals: {combined['hospital_name'].nunique()}")
+    
+    return combined
+
+
+def process_mrf_url(
+    hospital_key: str,
+    url: str,
+    chunk_rows: int = MRF_CHUNK_ROWS,
+    engine: str = "pandas",
+    archive: bool = False
+) -> pd.DataFrame:
+    """
+    Download, parse and filter one MRF in a single streaming pass
+    
+    The response body (gunzipped or unzipped on the fly) is fed straight
+    into the CSV or JSON parser with the target code filter, so the raw
+    file never lands in RAW_DATA_DIR. Dropped connections are resumed with
+    Range requests underneath the parser.
+    
+    Args:
+        hospital_key: Key in HOSPITAL_MRF_URLS
+        url: MRF URL
+        chunk_rows: Rows per chunk for CSV files
+        engine: CSV reader, "pandas" or "arrow"
+        archive: Also keep a compressed copy in MRF_ARCHIVE_DIR
         
-        # Filter to ER services
-        df_filtered = filter_to_er_services(df)
+    Returns:
+        Filtered DataFrame (empty if nothing matched)
+    """
+    archive_path = MRF_ARCHIVE_DIR / f"{hospital_key}_mrf" if archive else None
+    
+    with open_mrf_stream(url, archive=archive_path) as (stream, mrf_format):
+        # Name the file would have on disk, for layout caching and the hospital name
+        file_path = RAW_DATA_DIR / f"{hospital_key}_mrf.{mrf_format}"
         
-        if df_filtered.empty:
-            logger.warning(f"No ER services found in {mrf_file.name}")
+        if mrf_format == "json":
+            text = io.TextIOWrapper(stream, encoding="utf-8")
+            df = parse_json_mrf(file_path, codes=get_target_codes(), stream=text)
+            text.detach()
+        else:
+            df = parse_csv_mrf_stream(
+                stream, file_path, chunk_rows=chunk_rows, codes=get_target_codes(), engine=engine
+            )
+    
+    if df.empty:
+        logger.warning(f"No charges extracted from {url}")
+        return df
+    
+    df_filtered = filter_to_catalog_services(df)
+    
+    if df_filtered.empty:
+        logger.warning(f"No ER services found in {url}")
+    
+    return df_filtered
+
+
+def process_streamed_mrf_files(
+    chunk_rows: int = MRF_CHUNK_ROWS,
+    engine: str = "pandas",
+    archive: bool = False
+) -> pd.DataFrame:
+    """
+    Stream every configured hospital MRF URL through the parser
+    
+    Hospitals whose URL is still a placeholder are skipped. A hospital
+    that fails is logged and skipped without aborting the batch.
+    
+    Args:
+        chunk_rows: Rows per chunk for CSV files
+        engine: CSV reader, "pandas" or "arrow"
+        archive: Also keep a compressed copy of each MRF in MRF_ARCHIVE_DIR
+    
+    Returns:
+        Combined DataFrame of all hospital prices
+    """
+    logger.info("=" * 60)
+    logger.info("STREAMING HOSPITAL MRF FILES")
+    logger.info("=" * 60)
+    
+    hospitals = {
+        hospital_key: hospital_info["url"]
+        for hospital_key, hospital_info in HOSPITAL_MRF_URLS.items()
+        if not is_placeholder_url(hospital_info["url"])
+    }
+    
+    if not hospitals:
+        logger.warning("⚠️  No MRF URLs configured in HOSPITAL_MRF_URLS (only placeholders)")
+        return pd.DataFrame()
+    
+    all_data = []
+    failed = []
+    
+    for hospital_key, url in hospitals.items():
+        try:
+            df = process_mrf_url(hospital_key, url, chunk_rows, engine, archive)
+        except Exception as e:
+            logger.error(f"✗ Failed to stream {hospital_key} MRF: {e}")
+            failed.append(hospital_key)
             continue
         
-        all_data.append(df_filtered)
+        if not df.empty:
+            all_data.append(expand_negotiated_rates(df))
+    
+    if failed:
+        logger.warning(f"⚠️  {len(failed)} MRF stream(s) failed: {', '.join(failed)}")
     
     if not all_data:
-        logger.error("✗ No data extracted from any MRF files")
+        logger.error("✗ No data extracted from any MRF stream")
         return pd.DataFrame()
     
-    # Combine all hospitals
     combined = pd.concat(all_data, ignore_index=True)
     
-    # Expand negotiated rates
-    combined = expand_negotiated_rates(combined)
-    
-    logger.info(f"\n✓ Processed {len(mrf_files)} MRF files")
+    logger.info(f"\n✓ Streamed {len(hospitals) - len(failed)}/{len(hospitals)} MRF files")
     logger.info(f"✓ Total records: {len(combined)}")
     logger.info(f"✓ Unique services: {combined['code'].nunique()}")
     logger.info(f"✓ Hospitals: {combined['hospital_name'].nunique()}")
@@ -256,34 +1532,134 @@ def process_inova_mrf_files() -> pd.DataFrame:
     return combined
 
 
+def save_rate_sketches(df: pd.DataFrame, output_file: Path = RATE_SKETCHES_FILE):
+    """
+    Merge the negotiated-rate sketches of the rows into one per code and hospital (CCN and name)
+    
+    The sketch accuracy is kept in the file's schema metadata, so readers
+    interpret the buckets with the accuracy they were built with.
+    
+    Args:
+        df: Processed DataFrame with a negotiated_sketch column
+        output_file: Parquet file to write
+    """
+    keys = df[["code", "ccn", "hospital_name"]].astype("string").fillna("")
+    grouped = keys.groupby(["code", "ccn", "hospital_name"], sort=True)
+    labels = grouped.size().reset_index()[["code", "ccn", "hospital_name"]]
+    
+    sketches = merge_sketches(
+        pa.array(df["negotiated_sketch"]), grouped.ngroup().to_numpy(), len(labels)
+    )
+    
+    table = pa.table({
+        "code": pa.array(labels["code"], pa.string()),
+        "ccn": pa.array(labels["ccn"], pa.string()),
+        "hospital_name": pa.array(labels["hospital_name"], pa.string()),
+        "rate_count": pa.array(sketch_counts(sketches), pa.int64()),
+        "negotiated_sketch": sketches
+    })
+    table = table.replace_schema_metadata({ACCURACY_KEY: str(RATE_SKETCH_ACCURACY).encode()})
+    
+    temp_file = output_file.with_suffix(".parquet.tmp")
+    pq.write_table(table, temp_file, compression="zstd")
+    temp_file.replace(output_file)
+    
+    logger.info(f"✓ Saved {len(labels)} negotiated-rate sketches to: {output_file}")
+
+
 def save_processed_data(df: pd.DataFrame):
     """
     Save processed MRF data to parquet
     
+    The per-row negotiated-rate sketches go to RATE_SKETCHES_FILE, merged
+    per code and hospital, rather than into hospital_prices.parquet.
+    
     Args:
         df: Processed DataFrame
     """
     output_file = PROCESSED_DATA_DIR / "hospital_prices.parquet"
     
-    df.to_parquet(output_file, index=False)
+    df.drop(columns="negotiated_sketch", errors="ignore").to_parquet(output_file, index=False)
     
     logger.info(f"\n✓ Saved to: {output_file}")
+    
+    if "negotiated_sketch" in df.columns:
+        save_rate_sketches(df)
     logger.info(f"  File size: {output_file.stat().st_size / 1024 / 1024:.2f} MB")
 
 
-def main():
-    """Main processing orchestrator"""
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Process hospital MRF files")
+    parser.add_argument(
+        "--chunk-rows", type=int, default=MRF_CHUNK_ROWS,
+        help="Stream each MRF in chunks of this many rows (0 reads whole files)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=MRF_WORKERS,
+        help="Number of processes used to parse MRF files in parallel"
+    )
+    parser.add_argument(
+        "--engine", choices=["pandas", "arrow"], default=CSV_ENGINE,
+        help="CSV reader used for MRF files"
+    )
+    parser.add_argument(
+        "--memory-map", action="store_true",
+        help="Memory-map MRF files when reading them with the arrow engine"
+    )
+    parser.add_argument(
+        "--full-refresh", action="store_true",
+        help="Re-parse every MRF file instead of reusing cached outputs of unchanged files"
+    )
+    parser.add_argument(
+        "--columnar-cache", action="store_true",
+        help="Convert each raw MRF once to Parquet sorted by code and read target codes from it"
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Download and parse HOSPITAL_MRF_URLS in one pass instead of reading data/raw/"
+    )
+    parser.add_argument(
+        "--archive", action="store_true",
+        help="With --stream, also keep a compressed copy of each MRF in data/raw/archive/"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Main processing orchestrator
+    
+    Returns:
+        Exit status: 0, or 1 if no MRF data was found
+    """
+    args = parse_args(argv)
+    
     logger.info("🚀 Starting Inova MRF processing...\n")
     
     # Create processed directory if needed
     PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
     
     # Process all MRF files
-    df = process_inova_mrf_files()
+    if args.stream:
+        df = process_streamed_mrf_files(
+            chunk_rows=args.chunk_rows or MRF_CHUNK_ROWS,
+            engine=args.engine,
+            archive=args.archive
+        )
+    else:
+        df = process_inova_mrf_files(
+            chunk_rows=args.chunk_rows or None,
+            workers=args.workers,
+            incremental=not args.full_refresh,
+            engine=args.engine,
+            memory_map=args.memory_map,
+            columnar=args.columnar_cache
+        )
     
     if df.empty:
         logger.error("\n✗ No data to save. Please check MRF files.")
-        return
+        return 1
     
     # Save processed data
     save_processed_data(df)
@@ -306,7 +1682,8 @@ def main():
     print(summary)
     
     logger.info("\n✅ Inova MRF processing complete!")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
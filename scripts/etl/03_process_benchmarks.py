@@ -3,11 +3,31 @@ Process CMS Benchmark Data
 Normalizes Medicare payment benchmarks from PFS, CLFS, and OPPS
 """
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 from pathlib import Path
+import argparse
+import csv
+import io
+import json
 import logging
-from typing import Optional
-from config import RAW_DATA_DIR, BENCHMARKS_DIR, TOP_ER_SERVICES
+import sys
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from config import (
+    RAW_DATA_DIR, BENCHMARKS_DIR, BENCHMARK_STORE_DIR, CSV_ENGINE, DATA_SOURCES,
+    PFS_CONVERSION_FACTOR, TARGET_STATES, CMS_CHUNK_ROWS, DOWNLOAD_MANIFEST,
+    BENCHMARK_SOURCES, DATA_QUALITY_THRESHOLDS, DATA_QUALITY_REPORT_DIR
+)
+from benchmark_store import write_benchmarks, list_partitions, read_benchmarks
+from data_quality import check_tables, enforce, log_report, write_report
+from provider_registry import extend_registry
+from service_catalog import extend_catalog, load_catalog
 
 # Setup logging
 logging.basicConfig(
@@ -16,13 +36,78 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Columns read from the CMS Outpatient file, with their Arrow types
+OPPS_COLUMNS = {
+    "APC": pa.string(),
+    "APC_Desc": pa.string(),
+    "Avg_Mdcr_Pymt_Amt": pa.float64()
+}
+
+# Provider state and service count, read when present
+OPPS_STATE_COLUMN = "Rndrng_Prvdr_State_Abrvtn"
+OPPS_SERVICES_COLUMN = "CAPC_Srvcs"
+OPPS_OPTIONAL_COLUMNS = {
+    OPPS_STATE_COLUMN: pa.string(),
+    OPPS_SERVICES_COLUMN: pa.float64()
+}
+
+# CMS Outpatient provider columns -> provider registry columns (--import-providers)
+OPPS_CCN_COLUMN = "Rndrng_Prvdr_CCN"
+OPPS_PROVIDER_COLUMNS = {
+    OPPS_CCN_COLUMN: "ccn",
+    "Rndrng_Prvdr_Org_Name": "hospital_name",
+    "Rndrng_Prvdr_City": "city",
+    OPPS_STATE_COLUMN: "state",
+    "Rndrng_Prvdr_Zip5": "zip_code"
+}
+
+# PFS status codes that are paid under the fee schedule
+PFS_PAYABLE_STATUS = {"A", "R", "T"}
+
+# Rows scanned for the column header in CMS zip members (title rows come first)
+HEADER_SCAN_ROWS = 30
+
+# Data quality rules for the combined benchmarks, before invalid rates are dropped;
+# coverage is only warned about here and enforced by the star schema build
+BENCHMARK_RULES = {
+    "benchmarks": [
+        {"check": "not_null", "column": "code"},
+        {"check": "accepted_values", "column": "source", "values": BENCHMARK_SOURCES},
+        {"check": "positive", "column": "medicare_rate", "severity": "warn"},
+        {"check": "min_coverage", "column": "code", "table": "target_services", "key": "code",
+         "threshold": DATA_QUALITY_THRESHOLDS["min_benchmark_coverage"], "severity": "warn"}
+    ]
+}
+
 
-def process_cms_outpatient() -> pd.DataFrame:
+def process_cms_outpatient(
+    engine: str = "pandas",
+    chunk_rows: int = CMS_CHUNK_ROWS,
+    states: Optional[List[str]] = TARGET_STATES,
+    year: Optional[int] = None
+) -> pd.DataFrame:
     """
     Process CMS Outpatient Hospitals dataset
     
+    The provider-by-service file is streamed in chunks and only the APC
+    code, description, payment, provider state and service count columns
+    are read. Each chunk is filtered to the target states and folded into
+    running per (code, state) sums, so memory stays bounded by one chunk
+    plus the aggregate regardless of file size. The benchmark is the
+    service-weighted mean Medicare payment per code and state.
+    
+    With engine="arrow" the file is streamed by Arrow's CSV reader with
+    explicit column types and the state filter is applied on Arrow arrays.
+    
+    Args:
+        engine: CSV reader, "pandas" or "arrow"
+        chunk_rows: Rows per chunk
+        states: Provider states to keep (None keeps every state)
+        year: Year of the data (None: see _outpatient_year)
+    
     Returns:
-        DataFrame with service benchmarks from OPPS
+        DataFrame with service benchmarks from OPPS, or sample benchmarks if
+        the file is missing, has unexpected columns or its year is unknown
     """
     logger.info("Processing CMS Outpatient Hospitals dataset...")
     
@@ -35,28 +120,67 @@ def process_cms_outpatient() -> pd.DataFrame:
         return create_sample_benchmarks()
     
     try:
-        # Load CMS data
-        df = pd.read_csv(cms_file, low_memory=False)
-        
-        logger.info(f"Loaded {len(df)} records from CMS Outpatient dataset")
-        
         # Filter to relevant columns
         # Note: Actual column names may vary - adjust based on real file
-        if "APC" in df.columns and "Avg_Mdcr_Pymt_Amt" in df.columns:
-            df_filtered = df[["APC", "APC_Desc", "Avg_Mdcr_Pymt_Amt"]].copy()
-            df_filtered.columns = ["code", "description", "medicare_rate"]
-        else:
+        with open(cms_file, "r", newline="") as f:
+            header = next(csv.reader(f), [])
+        
+        if not all(col in header for col in OPPS_COLUMNS):
             logger.warning("Expected columns not found, using sample data")
             return create_sample_benchmarks()
         
-        # Remove nulls
-        df_filtered = df_filtered.dropna(subset=["medicare_rate"])
+        # Never stamp a release with a guessed year: the store would file it
+        # under the wrong partition, or skip it as already ingested
+        try:
+            year = _outpatient_year(cms_file, year)
+        except ValueError as e:
+            logger.error(f"✗ {e}")
+            logger.warning("⚠️  Using sample data instead of the CMS Outpatient file")
+            return create_sample_benchmarks()
+        
+        columns = dict(OPPS_COLUMNS)
+        for col in [OPPS_STATE_COLUMN, OPPS_SERVICES_COLUMN]:
+            if col in header:
+                columns[col] = OPPS_OPTIONAL_COLUMNS[col]
+        
+        if states is not None and OPPS_STATE_COLUMN not in columns:
+            logger.warning(f"⚠️  No {OPPS_STATE_COLUMN} column, benchmarks cover every state")
+            states = None
+        
+        # Load CMS data chunk by chunk
+        if engine == "arrow":
+            chunks = _read_opps_chunks_arrow(cms_file, columns, chunk_rows, states)
+        else:
+            chunks = _read_opps_chunks(cms_file, columns, chunk_rows, states)
+        
+        totals = None
+        total_rows = 0
+        kept_rows = 0
+        for chunk, rows_read in chunks:
+            total_rows += rows_read
+            kept_rows += len(chunk)
+            totals = _fold_opps_totals(totals, _opps_chunk_totals(chunk))
+        
+        logger.info(f"Loaded {total_rows} records from CMS Outpatient dataset")
+        if states is not None:
+            logger.info(f"Kept {kept_rows} records in {', '.join(states)}")
+        
+        if totals is None or totals.empty:
+            logger.warning("No OPPS payments for the target states, using sample data")
+            return create_sample_benchmarks()
+        
+        totals = totals.reset_index()
         
-        # Add metadata
-        df_filtered["source"] = "OPPS"
-        df_filtered["year"] = 2024
+        df_filtered = pd.DataFrame({
+            "code": totals["code"],
+            "description": totals["description"],
+            "medicare_rate": (totals["payment_total"] / totals["services"]).round(2),
+            "source": "OPPS",
+            "year": year,
+            "state": totals["state"].where(totals["state"] != "")
+        })
         
-        logger.info(f"✓ Extracted {len(df_filtered)} OPPS benchmarks")
+        logger.info(f"✓ Extracted {len(df_filtered)} OPPS benchmarks (code × state)")
         
         return df_filtered
         
@@ -65,6 +189,542 @@ def process_cms_outpatient() -> pd.DataFrame:
         return create_sample_benchmarks()
 
 
+def read_cms_providers(chunk_rows: int = CMS_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Distinct hospitals of the CMS Outpatient dataset, for the provider registry
+    
+    Only the provider columns are streamed, and each chunk is reduced to
+    one row per CCN as it is read.
+    
+    Args:
+        chunk_rows: Rows per chunk
+    
+    Returns:
+        DataFrame with ccn, hospital_name and the city, state and zip_code
+        columns present, empty if the file or its CCN column is missing
+    """
+    cms_file = RAW_DATA_DIR / "cms_outpatient_hospitals.csv"
+    
+    if not cms_file.exists():
+        logger.warning(f"⚠️  CMS Outpatient file not found: {cms_file}")
+        return pd.DataFrame()
+    
+    with open(cms_file, "r", newline="") as f:
+        header = next(csv.reader(f), [])
+    
+    columns = [col for col in OPPS_PROVIDER_COLUMNS if col in header]
+    if OPPS_CCN_COLUMN not in columns or "Rndrng_Prvdr_Org_Name" not in columns:
+        logger.warning(f"⚠️  No provider CCN/name columns in {cms_file.name}")
+        return pd.DataFrame()
+    
+    chunks = pd.read_csv(cms_file, usecols=columns, dtype=str, chunksize=chunk_rows)
+    providers = pd.concat([chunk.drop_duplicates(OPPS_CCN_COLUMN) for chunk in chunks], ignore_index=True)
+    
+    return providers.drop_duplicates(OPPS_CCN_COLUMN).rename(columns=OPPS_PROVIDER_COLUMNS)
+
+
+def _read_opps_chunks(
+    cms_file: Path,
+    columns: Dict[str, pa.DataType],
+    chunk_rows: int,
+    states: Optional[List[str]]
+) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """
+    Stream the needed CMS Outpatient columns with pandas, filtered to states
+    
+    Args:
+        cms_file: CMS Outpatient CSV
+        columns: Columns to read with their Arrow types
+        chunk_rows: Rows per chunk
+        states: Provider states to keep (None keeps every state)
+    
+    Yields:
+        Tuple of (filtered chunk, rows read)
+    """
+    text_columns = {name: str for name, dtype in columns.items() if pa.types.is_string(dtype)}
+    
+    for chunk in pd.read_csv(cms_file, usecols=list(columns), dtype=text_columns, chunksize=chunk_rows):
+        rows_read = len(chunk)
+        
+        # Remove nulls
+        chunk = chunk.dropna(subset=["Avg_Mdcr_Pymt_Amt"])
+        if states is not None:
+            chunk = chunk[chunk[OPPS_STATE_COLUMN].str.strip().isin(states)]
+        
+        yield chunk, rows_read
+
+
+def _read_opps_chunks_arrow(
+    cms_file: Path,
+    columns: Dict[str, pa.DataType],
+    chunk_rows: int,
+    states: Optional[List[str]]
+) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """
+    Stream the needed CMS Outpatient columns with Arrow, filtered to states
+    
+    Args:
+        cms_file: CMS Outpatient CSV
+        columns: Columns to read with their Arrow types
+        chunk_rows: Rows per chunk (record batches are grouped to about this size)
+        states: Provider states to keep (None keeps every state)
+    
+    Yields:
+        Tuple of (filtered chunk, rows read)
+    """
+    reader = pacsv.open_csv(
+        cms_file,
+        convert_options=pacsv.ConvertOptions(
+            include_columns=list(columns),
+            column_types=columns
+        )
+    )
+    
+    def filtered(batches: List[pa.RecordBatch]) -> Tuple[pd.DataFrame, int]:
+        table = pa.Table.from_batches(batches)
+        rows_read = table.num_rows
+        
+        # Remove nulls
+        table = table.filter(pc.is_valid(table["Avg_Mdcr_Pymt_Amt"]))
+        if states is not None:
+            value_set = pa.array(states, type=pa.string())
+            table = table.filter(
+                pc.fill_null(pc.is_in(pc.utf8_trim_whitespace(table[OPPS_STATE_COLUMN]), value_set=value_set), False)
+            )
+        
+        return table.to_pandas(), rows_read
+    
+    pending = []
+    pending_rows = 0
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= chunk_rows:
+            yield filtered(pending)
+            pending, pending_rows = [], 0
+    
+    if pending:
+        yield filtered(pending)
+
+
+def _opps_chunk_totals(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per (code, state) payment and service totals of one chunk
+    
+    Rows are weighted by their service count when the file has one, so
+    the final rate is the service-weighted mean payment.
+    
+    Args:
+        chunk: Filtered CMS Outpatient rows
+    
+    Returns:
+        DataFrame indexed by (code, state) with payment_total, services and description
+    """
+    if OPPS_SERVICES_COLUMN in chunk.columns:
+        services = pd.to_numeric(chunk[OPPS_SERVICES_COLUMN], errors="coerce").fillna(0).clip(lower=0)
+    else:
+        services = pd.Series(1.0, index=chunk.index)
+    
+    state = chunk[OPPS_STATE_COLUMN].str.strip() if OPPS_STATE_COLUMN in chunk.columns else ""
+    
+    parts = pd.DataFrame({
+        "code": chunk["APC"].str.strip(),
+        "state": state,
+        "description": chunk["APC_Desc"],
+        "payment_total": chunk["Avg_Mdcr_Pymt_Amt"] * services,
+        "services": services
+    })
+    
+    return parts.groupby(["code", "state"]).agg(
+        description=("description", "first"),
+        payment_total=("payment_total", "sum"),
+        services=("services", "sum")
+    )
+
+
+def _fold_opps_totals(totals: Optional[pd.DataFrame], chunk_totals: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add one chunk's totals into the running totals
+    
+    Args:
+        totals: Running totals (None before the first chunk)
+        chunk_totals: Totals from _opps_chunk_totals
+    
+    Returns:
+        Combined totals indexed by (code, state)
+    """
+    if totals is None:
+        return chunk_totals
+    
+    combined = pd.concat([totals, chunk_totals])
+    
+    return combined.groupby(level=["code", "state"]).agg(
+        description=("description", "first"),
+        payment_total=("payment_total", "sum"),
+        services=("services", "sum")
+    )
+
+
+def _header_tokens(name: str) -> Set[str]:
+    """Lower-case words of a header cell (punctuation splits words)"""
+    return set(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def _find_column(columns: List[str], *candidates: Set[str], exclude: Set[str] = frozenset()) -> Optional[str]:
+    """
+    Find the first column whose header contains all words of a candidate set
+    
+    Args:
+        columns: Header names
+        *candidates: Word sets to try in order
+        exclude: Words that disqualify a column
+    
+    Returns:
+        Column name, or None if no candidate matches
+    """
+    for words in candidates:
+        for name in columns:
+            tokens = _header_tokens(name)
+            if words <= tokens and not exclude & tokens:
+                return name
+    return None
+
+
+def _zip_member(archive: zipfile.ZipFile, pattern: str) -> Optional[str]:
+    """
+    Name of the first CSV member matching a pattern
+    
+    Args:
+        archive: Open zip archive
+        pattern: Regex matched (case-insensitive) against the member's file name
+    
+    Returns:
+        Member name, or None if there is no match
+    """
+    for name in sorted(archive.namelist()):
+        base = name.rsplit("/", 1)[-1]
+        if base.lower().endswith(".csv") and re.search(pattern, base, re.IGNORECASE):
+            return name
+    return None
+
+
+def _read_zip_csv(archive: zipfile.ZipFile, member: str, header_words: Set[str]) -> pd.DataFrame:
+    """
+    Read a CMS CSV straight out of a zip archive
+    
+    CMS files open with title and copyright rows, and some split the
+    column header over several rows (e.g. "WORK" above "RVU"). The header
+    starts at the first row containing all header_words; following rows
+    with a blank first cell continue it and are joined column by column.
+    The member is streamed from the archive, never extracted to disk.
+    
+    Args:
+        archive: Open zip archive
+        member: Member name
+        header_words: Words that identify the header row
+    
+    Returns:
+        DataFrame of data rows with every column as string
+    """
+    with archive.open(member) as raw:
+        rows = []
+        for row in csv.reader(io.TextIOWrapper(raw, encoding="latin-1", newline="")):
+            rows.append(row)
+            if len(rows) == HEADER_SCAN_ROWS:
+                break
+    
+    start = next(
+        (idx for idx, row in enumerate(rows) if header_words <= _header_tokens(" ".join(row))),
+        None
+    )
+    if start is None:
+        raise ValueError(f"No header row with {sorted(header_words)} in {member}")
+    
+    end = start + 1
+    while end < len(rows) and rows[end] and not rows[end][0].strip() and any(cell.strip() for cell in rows[end]):
+        end += 1
+    
+    width = max(len(row) for row in rows[start:end])
+    columns = [
+        " ".join(
+            row[idx].strip() for row in rows[start:end] if idx < len(row) and row[idx].strip()
+        ) or f"column_{idx}"
+        for idx in range(width)
+    ]
+    
+    with archive.open(member) as raw:
+        df = pd.read_csv(
+            raw,
+            skiprows=end,
+            header=None,
+            names=columns,
+            usecols=range(width),
+            dtype=str,
+            keep_default_na=False,
+            encoding="latin-1"
+        )
+    
+    return df
+
+
+def _file_year(file_path: Path) -> Optional[int]:
+    """Data year from a CMS file name (e.g. MUP_OHP_R24_P04_V10_D22_Prov_Svc.csv, opps_2023.csv)"""
+    match = re.search(r"(20\d{2})", file_path.name)
+    if match:
+        return int(match.group(1))
+    
+    match = re.search(r"_DY?(\d{2})_", file_path.name, re.IGNORECASE)
+    return 2000 + int(match.group(1)) if match else None
+
+
+def _outpatient_year(cms_file: Path, year: Optional[int] = None) -> int:
+    """
+    Data year of the CMS Outpatient file
+    
+    The downloader saves the file under a fixed name, so the year comes from
+    the name the server sent it with, recorded in DOWNLOAD_MANIFEST, unless
+    given explicitly or carried by the local file name.
+    
+    Args:
+        cms_file: CMS Outpatient CSV
+        year: Year given on the command line, if any
+    
+    Returns:
+        Data year
+    
+    Raises:
+        ValueError: If no year is given and neither name carries one
+    """
+    if year:
+        return year
+    
+    names = [cms_file.name]
+    try:
+        entry = json.loads(DOWNLOAD_MANIFEST.read_text()).get(cms_file.name, {})
+        names += [entry.get("source_filename") or "", Path(urlparse(entry.get("url") or "").path).name]
+    except (OSError, ValueError):
+        pass
+    
+    for name in names:
+        if name and _file_year(Path(name)):
+            return _file_year(Path(name))
+    
+    raise ValueError(
+        f"Cannot tell the data year of {cms_file.name} from its name or its download manifest entry; "
+        f"pass it with --year"
+    )
+
+
+def _zip_year(zip_path: Path, member: str) -> Optional[int]:
+    """Fee schedule year from the archive or member name (e.g. pfs_rvu_2023.zip, PPRRVU23_JAN.csv)"""
+    match = re.search(r"(20\d{2})", zip_path.name) or re.search(r"(20\d{2})", member)
+    if match:
+        return int(match.group(1))
+    
+    match = re.search(r"RVU(\d{2})", member, re.IGNORECASE)
+    return 2000 + int(match.group(1)) if match else None
+
+
+def _to_number(series: pd.Series) -> np.ndarray:
+    """Parse a text column to float (blank or non-numeric -> NaN)"""
+    return pd.to_numeric(series.str.replace(",", "").str.strip(), errors="coerce").to_numpy(dtype=float)
+
+
+def process_pfs_rvu(zip_path: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Compute locality-adjusted Physician Fee Schedule payments from the RVU zip
+    
+    The PPRRVU (RVUs per code) and GPCI (geographic indices per locality)
+    members are read straight from the zip. Payments follow the CMS formula
+    
+        (Work RVU × Work GPCI + PE RVU × PE GPCI + MP RVU × MP GPCI) × CF
+    
+    evaluated for every payable code and every locality at once as a
+    (codes × localities) array. Facility PE RVUs are used, since ER
+    services are furnished in a facility setting. Only global rows (no
+    modifier) with a payable status are kept.
+    
+    Args:
+        zip_path: RVU zip (defaults to the cms_pfs download)
+    
+    Returns:
+        DataFrame with one PFS benchmark per code and locality (empty if
+        the zip is missing or unreadable)
+    """
+    zip_path = zip_path or RAW_DATA_DIR / DATA_SOURCES["cms_pfs"]["filename"]
+    
+    if not zip_path.exists():
+        logger.warning(f"⚠️  PFS RVU file not found: {zip_path}")
+        return pd.DataFrame()
+    
+    logger.info(f"Processing PFS RVU archive: {zip_path.name}")
+    
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            rvu_member = _zip_member(archive, r"^PPRRVU")
+            gpci_member = _zip_member(archive, r"GPCI")
+            if not rvu_member or not gpci_member:
+                logger.warning(f"⚠️  {zip_path.name} has no PPRRVU and GPCI CSV members")
+                return pd.DataFrame()
+            
+            rvu = _read_zip_csv(archive, rvu_member, {"hcpcs", "description"})
+            gpci = _read_zip_csv(archive, gpci_member, {"locality", "gpci"})
+    except (zipfile.BadZipFile, ValueError) as e:
+        logger.error(f"Error reading {zip_path.name}: {e}")
+        return pd.DataFrame()
+    
+    rvu_columns = list(rvu.columns)
+    code_col = _find_column(rvu_columns, {"hcpcs"})
+    mod_col = _find_column(rvu_columns, {"mod"})
+    desc_col = _find_column(rvu_columns, {"description"})
+    status_col = _find_column(rvu_columns, {"status"})
+    work_col = _find_column(rvu_columns, {"work", "rvu"})
+    pe_col = _find_column(rvu_columns, {"facility", "pe", "rvu"}, exclude={"non", "opps"})
+    mp_col = _find_column(rvu_columns, {"mp", "rvu"}, exclude={"opps"})
+    cf_col = _find_column(rvu_columns, {"conv", "factor"}, {"conversion", "factor"})
+    
+    gpci_columns = list(gpci.columns)
+    state_col = _find_column(gpci_columns, {"state"})
+    mac_col = _find_column(gpci_columns, {"contractor"}, {"mac"}, {"carrier"})
+    locality_col = _find_column(gpci_columns, {"locality", "number"}, {"locality"}, exclude={"name"})
+    locality_name_col = _find_column(gpci_columns, {"locality", "name"})
+    pw_gpci_col = _find_column(gpci_columns, {"pw", "gpci"}, {"work", "gpci"})
+    pe_gpci_col = _find_column(gpci_columns, {"pe", "gpci"})
+    mp_gpci_col = _find_column(gpci_columns, {"mp", "gpci"})
+    
+    missing = [
+        name for name, col in [
+            ("HCPCS", code_col), ("work RVU", work_col), ("facility PE RVU", pe_col), ("MP RVU", mp_col),
+            ("locality", locality_col), ("work GPCI", pw_gpci_col), ("PE GPCI", pe_gpci_col),
+            ("MP GPCI", mp_gpci_col)
+        ] if col is None
+    ]
+    if missing:
+        logger.warning(f"⚠️  Expected PFS columns not found: {', '.join(missing)}")
+        return pd.DataFrame()
+    
+    # Global, payable rows only
+    keep = rvu[code_col].str.strip() != ""
+    if mod_col:
+        keep &= rvu[mod_col].str.strip() == ""
+    if status_col:
+        keep &= rvu[status_col].str.strip().str.upper().isin(PFS_PAYABLE_STATUS)
+    rvu = rvu[keep]
+    
+    work = _to_number(rvu[work_col])
+    pe = _to_number(rvu[pe_col])
+    mp = _to_number(rvu[mp_col])
+    cf = _to_number(rvu[cf_col]) if cf_col else np.full(len(rvu), np.nan)
+    cf = np.where(np.isnan(cf) | (cf <= 0), PFS_CONVERSION_FACTOR, cf)
+    
+    gpci = gpci[gpci[locality_col].str.strip() != ""]
+    pw_gpci = _to_number(gpci[pw_gpci_col])
+    pe_gpci = _to_number(gpci[pe_gpci_col])
+    mp_gpci = _to_number(gpci[mp_gpci_col])
+    
+    # (codes × localities) payments in one broadcast
+    rates = (
+        np.nan_to_num(work)[:, None] * pw_gpci[None, :]
+        + np.nan_to_num(pe)[:, None] * pe_gpci[None, :]
+        + np.nan_to_num(mp)[:, None] * mp_gpci[None, :]
+    ) * cf[:, None]
+    
+    locality = gpci[locality_col].str.strip().str.zfill(2)
+    if mac_col:
+        locality = gpci[mac_col].str.strip() + "-" + locality
+    
+    n_codes, n_localities = rates.shape
+    year = _zip_year(zip_path, rvu_member)
+    
+    df = pd.DataFrame({
+        "code": np.repeat(rvu[code_col].str.strip().to_numpy(), n_localities),
+        "description": np.repeat(rvu[desc_col].str.strip().to_numpy(), n_localities) if desc_col else "",
+        "medicare_rate": rates.ravel().round(2),
+        "source": "PFS",
+        "year": year,
+        "state": np.tile(gpci[state_col].str.strip().to_numpy(), n_codes) if state_col else None,
+        "locality": np.tile(locality.to_numpy(), n_codes),
+        "locality_name": np.tile(gpci[locality_name_col].str.strip().to_numpy(), n_codes) if locality_name_col else None
+    })
+    
+    # Codes without RVUs or localities without indices have no payment
+    df = df[np.isfinite(df["medicare_rate"]) & (df["medicare_rate"] > 0)].reset_index(drop=True)
+    
+    logger.info(
+        f"✓ Computed {len(df)} PFS benchmarks ({n_codes} codes × {n_localities} localities, {year})"
+    )
+    
+    return df
+
+
+def process_clfs(zip_path: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Read national Clinical Laboratory Fee Schedule rates from the CLFS zip
+    
+    The CLFS CSV member is read straight from the zip; the national
+    limitation amount (RATE) of each unmodified HCPCS code is the benchmark.
+    
+    Args:
+        zip_path: CLFS zip (defaults to the cms_clfs download)
+    
+    Returns:
+        DataFrame with CLFS benchmarks (empty if the zip is missing or unreadable)
+    """
+    zip_path = zip_path or RAW_DATA_DIR / DATA_SOURCES["cms_clfs"]["filename"]
+    
+    if not zip_path.exists():
+        logger.warning(f"⚠️  CLFS file not found: {zip_path}")
+        return pd.DataFrame()
+    
+    logger.info(f"Processing CLFS archive: {zip_path.name}")
+    
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            member = _zip_member(archive, r"CLAB|CLFS") or _zip_member(archive, r"")
+            if not member:
+                logger.warning(f"⚠️  {zip_path.name} has no CSV member")
+                return pd.DataFrame()
+            
+            clfs = _read_zip_csv(archive, member, {"hcpcs", "rate"})
+    except (zipfile.BadZipFile, ValueError) as e:
+        logger.error(f"Error reading {zip_path.name}: {e}")
+        return pd.DataFrame()
+    
+    columns = list(clfs.columns)
+    code_col = _find_column(columns, {"hcpcs"})
+    mod_col = _find_column(columns, {"mod"})
+    rate_col = _find_column(columns, {"rate"}, {"national", "limit"})
+    desc_col = _find_column(columns, {"shortdesc"}, {"short", "description"}, {"description"}, {"longdesc"})
+    year_col = _find_column(columns, {"year"})
+    
+    if not code_col or not rate_col:
+        logger.warning("⚠️  Expected CLFS columns not found")
+        return pd.DataFrame()
+    
+    keep = clfs[code_col].str.strip() != ""
+    if mod_col:
+        keep &= clfs[mod_col].str.strip() == ""
+    clfs = clfs[keep]
+    
+    year = _zip_year(zip_path, member)
+    if year_col:
+        years = pd.to_numeric(clfs[year_col], errors="coerce")
+        year = int(years.max()) if years.notna().any() else year
+    
+    df = pd.DataFrame({
+        "code": clfs[code_col].str.strip().to_numpy(),
+        "description": clfs[desc_col].str.strip().to_numpy() if desc_col else "",
+        "medicare_rate": _to_number(clfs[rate_col]),
+        "source": "CLFS",
+        "year": year
+    })
+    df = df[df["medicare_rate"] > 0].reset_index(drop=True)
+    
+    logger.info(f"✓ Extracted {len(df)} CLFS benchmarks ({year})")
+    
+    return df
+
+
 def create_sample_benchmarks() -> pd.DataFrame:
     """
     Create sample benchmark data based on typical Medicare rates
@@ -110,6 +770,8 @@ def create_sample_benchmarks() -> pd.DataFrame:
     
     df = pd.DataFrame(sample_data)
     df["year"] = 2024
+    # Real data for the same source and year replaces sample partitions in the store
+    df["is_sample"] = True
     
     logger.info(f"✓ Created {len(df)} sample benchmarks")
     logger.warning("⚠️  Using sample data - download actual CMS files for real benchmarks")
@@ -121,54 +783,109 @@ def validate_benchmarks(df: pd.DataFrame) -> pd.DataFrame:
     """
     Validate benchmark data quality
     
+    BENCHMARK_RULES are checked in one pass and reported to
+    DATA_QUALITY_REPORT_DIR; non-positive rates and duplicates are then
+    dropped.
+    
     Args:
         df: Benchmark DataFrame
         
     Returns:
         Validated DataFrame
+    
+    Raises:
+        DataQualityError: If a code is missing or a source is unknown
     """
     logger.info("Validating benchmark data...")
     
+    catalog = load_catalog()
+    tables = {
+        "benchmarks": df,
+        "target_services": catalog.loc[catalog["core"], ["code"]]
+    }
+    report = check_tables(tables, BENCHMARK_RULES)
+    log_report(report)
+    write_report(report, DATA_QUALITY_REPORT_DIR / "benchmarks.json")
+    enforce(report)
+    
     initial_count = len(df)
     
     # Remove negative or zero rates
     df = df[df["medicare_rate"] > 0].copy()
     
-    # Remove duplicates (keep first)
-    df = df.drop_duplicates(subset=["code", "source"], keep="first")
-    
-    # Check coverage of target services
-    target_codes = [service["code"] for service in TOP_ER_SERVICES]
-    covered_codes = df[df["code"].isin(target_codes)]["code"].unique()
-    coverage = len(covered_codes) / len(target_codes)
+    # Remove duplicates (keep first); OPPS rates are per state, PFS rates per locality
+    key_columns = [col for col in ["code", "source", "year", "state", "locality"] if col in df.columns]
+    df = df.drop_duplicates(subset=key_columns, keep="first")
     
     logger.info(f"✓ Validation complete:")
     logger.info(f"  - Removed {initial_count - len(df)} invalid records")
-    logger.info(f"  - Coverage: {coverage:.1%} of target ER services")
-    
-    if coverage < 0.8:
-        logger.warning(f"⚠️  Low coverage ({coverage:.1%}) - consider adding more benchmarks")
     
     return df
 
 
-def save_benchmarks(df: pd.DataFrame):
+def save_benchmarks(df: pd.DataFrame, replace: bool = False):
     """
-    Save benchmark data to parquet
+    Append benchmark data to the partitioned benchmark store
     
     Args:
         df: Benchmark DataFrame
+        replace: Rewrite (source, year) partitions that are already stored, even if unchanged
     """
-    output_file = BENCHMARKS_DIR / "cms_benchmarks.parquet"
+    logger.info(f"\nSaving to benchmark store: {BENCHMARK_STORE_DIR}")
     
-    df.to_parquet(output_file, index=False)
+    counts = write_benchmarks(df, replace=replace)
+    partitions = list_partitions()
     
-    logger.info(f"\n✓ Saved to: {output_file}")
-    logger.info(f"  File size: {output_file.stat().st_size / 1024:.2f} KB")
+    logger.info(f"✓ {counts['written']} partition(s) written, {counts['skipped']} skipped")
+    logger.info(f"  Store holds {len(partitions)} partition(s):")
+    for partition in partitions:
+        sample = " (sample)" if partition["sample"] else ""
+        logger.info(f"    {partition['source']} {partition['year']}: {partition['rows']:,} rows{sample}")
+
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Process CMS benchmark files")
+    parser.add_argument(
+        "--engine", choices=["pandas", "arrow"], default=CSV_ENGINE,
+        help="CSV reader used for the CMS Outpatient file"
+    )
+    parser.add_argument(
+        "--chunk-rows", type=int, default=CMS_CHUNK_ROWS,
+        help="Stream the CMS Outpatient file in chunks of this many rows"
+    )
+    parser.add_argument(
+        "--all-states", action="store_true",
+        help="Keep every provider state instead of TARGET_STATES"
+    )
+    parser.add_argument(
+        "--year", type=int,
+        help="Year of the CMS Outpatient file (default: from its file name or the name it was downloaded as)"
+    )
+    parser.add_argument(
+        "--replace", action="store_true",
+        help="Rewrite (source, year) partitions already in the benchmark store, even if unchanged"
+    )
+    parser.add_argument(
+        "--extend-catalog", action="store_true",
+        help="Add every CPT/HCPCS code in the benchmark store to SERVICE_CATALOG_FILE"
+    )
+    parser.add_argument(
+        "--import-providers", action="store_true",
+        help="Add every hospital in the CMS Outpatient file to PROVIDER_REGISTRY_FILE"
+    )
+    return parser.parse_args(argv)
 
-def main():
-    """Main processing orchestrator"""
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Main processing orchestrator
+    
+    Returns:
+        Exit status: 0, or 1 if no benchmark data was available
+    """
+    args = parse_args(argv)
+    
     logger.info("🚀 Starting benchmark processing...\n")
     
     logger.info("=" * 60)
@@ -179,31 +896,54 @@ def main():
     BENCHMARKS_DIR.mkdir(parents=True, exist_ok=True)
     
     # Process CMS Outpatient (or create samples)
-    df = process_cms_outpatient()
+    df = process_cms_outpatient(
+        engine=args.engine,
+        chunk_rows=args.chunk_rows,
+        states=None if args.all_states else TARGET_STATES,
+        year=args.year
+    )
+    
+    # Fee schedules read from their zips replace the matching sample rows
+    for fee_schedule in [process_pfs_rvu(), process_clfs()]:
+        if not fee_schedule.empty:
+            df = df[df["source"] != fee_schedule["source"].iloc[0]]
+            df = pd.concat([df, fee_schedule], ignore_index=True)
     
     if df.empty:
         logger.error("✗ No benchmark data available")
-        return
+        return 1
     
     # Validate
     df = validate_benchmarks(df)
     
     # Save
-    save_benchmarks(df)
+    save_benchmarks(df, replace=args.replace)
+    
+    if args.extend_catalog:
+        added = extend_catalog(read_benchmarks(columns=["code", "description"]))
+        logger.info(f"✓ Added {added} code(s) to the service catalog")
+        logger.info("  Re-run 02_process_mrf.py to price them")
+    
+    if args.import_providers:
+        providers = read_cms_providers(args.chunk_rows)
+        if not providers.empty:
+            added = extend_registry(providers)
+            logger.info(f"✓ Added {added} hospital(s) to the provider registry")
     
     # Summary
     logger.info("\n" + "=" * 60)
     logger.info("SUMMARY STATISTICS")
     logger.info("=" * 60)
     
-    print("\nBenchmarks by source:")
-    print(df.groupby("source")["medicare_rate"].agg(["count", "min", "median", "max"]).round(2))
+    print("\nBenchmarks by source and year:")
+    print(df.groupby(["source", "year"])["medicare_rate"].agg(["count", "min", "median", "max"]).round(2))
     
     print("\nTop 10 highest Medicare rates:")
     print(df.nlargest(10, "medicare_rate")[["code", "description", "medicare_rate", "source"]])
     
     logger.info("\n✅ Benchmark processing complete!")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
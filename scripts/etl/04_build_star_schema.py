@@ -3,13 +3,30 @@ Build Star Schema for Power BI
 Combines hospital prices and benchmarks into analytics-ready tables
 """
 
+import duckdb
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from pathlib import Path
+import argparse
+import json
 import logging
+import sys
+import shutil
+import time
+from typing import Dict, List, Optional
 from config import (
-    PROCESSED_DATA_DIR, BENCHMARKS_DIR, TOP_ER_SERVICES, 
-    DEFAULT_SCENARIOS, HOSPITAL_MRF_URLS
+    PROCESSED_DATA_DIR, DEFAULT_SCENARIOS, DATA_QUALITY_THRESHOLDS,
+    DATA_QUALITY_REPORT_DIR, BENCHMARK_SOURCES, STAR_SCHEMA_DIR, STAR_SCHEMA_ENGINE, STAR_SCHEMA_PARTITIONS,
+    STAR_SCHEMA_SORT_COLUMNS, STAR_SCHEMA_ROW_GROUP_ROWS, STAR_SCHEMA_COMPRESSION, STAR_SCHEMA_DICTIONARY_COLUMNS
 )
+from benchmark_store import read_benchmarks, list_partitions
+from data_quality import Table, check_tables, enforce, log_report, write_report
+from duckdb_session import connect_duckdb, parquet_source, sql_string
+from provider_registry import build_provider_index, load_registry, resolve_providers
+from service_catalog import CATALOG_CATEGORIES, build_code_index, load_catalog, lookup_services
+from surrogate_keys import surrogate_key, surrogate_key_sql
 
 # Setup logging
 logging.basicConfig(
@@ -18,55 +35,106 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+FACT_PRICES_COLUMNS = [
+    "price_id", "service_id", "provider_id", "gross_charge", 
+    "cash_price", "negotiated_min", "negotiated_median", 
+    "negotiated_max", "payer_count"
+]
+
+# Natural key of a price: the provider plus the MRF line item it came from.
+# Identical line items of one provider are numbered in order of their prices
+# (then their order in the file), so reordering the file keeps every key.
+PRICE_LINE_COLUMNS = ["code", "code_type", "revenue_code", "description"]
+PRICE_LINE_ORDER = [
+    "gross_charge", "cash_price", "negotiated_min", "negotiated_median", "negotiated_max", "payer_count"
+]
+
+# Natural key of a benchmark (state and locality only exist for PFS)
+BENCHMARK_KEY_COLUMNS = ["source", "year", "code", "state", "locality"]
+
+# Schema metadata key recording the layout settings a file was written with
+LAYOUT_KEY = "star_schema_layout"
+
+# Directory name of a null partition value (as DuckDB writes it)
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Data quality rules, each table checked in a single pass (see data_quality.py)
+STAR_SCHEMA_RULES = {
+    "dim_service": [
+        {"check": "not_null", "column": "service_id"},
+        {"check": "unique", "column": "service_id"},
+        {"check": "not_null", "column": "cpt_hcpcs"},
+        {"check": "unique", "column": "cpt_hcpcs"},
+        {"check": "not_null", "column": "description"},
+        {"check": "accepted_values", "column": "category", "values": CATALOG_CATEGORIES}
+    ],
+    "dim_provider": [
+        {"check": "not_null", "column": "provider_id"},
+        {"check": "unique", "column": "provider_id"},
+        {"check": "not_null", "column": "ccn"},
+        {"check": "unique", "column": "ccn"},
+        {"check": "not_null", "column": "hospital_name"},
+        {"check": "not_null", "column": "state"}
+    ],
+    "fact_prices": [
+        {"check": "references", "column": "service_id", "table": "dim_service", "key": "service_id"},
+        {"check": "references", "column": "provider_id", "table": "dim_provider", "key": "provider_id"},
+        {"check": "max_null_fraction", "column": "gross_charge",
+         "threshold": DATA_QUALITY_THRESHOLDS["max_null_percentage"]},
+        {"check": "max_null_fraction", "column": "cash_price",
+         "threshold": DATA_QUALITY_THRESHOLDS["max_null_percentage"]},
+        {"check": "min_coverage", "column": "service_id", "table": "core_services", "key": "service_id",
+         "threshold": DATA_QUALITY_THRESHOLDS["min_services_coverage"]}
+    ],
+    "fact_benchmarks": [
+        {"check": "references", "column": "service_id", "table": "dim_service", "key": "service_id"},
+        {"check": "positive", "column": "medicare_rate"},
+        {"check": "accepted_values", "column": "source", "values": BENCHMARK_SOURCES},
+        {"check": "min_coverage", "column": "service_id", "table": "core_services", "key": "service_id",
+         "threshold": DATA_QUALITY_THRESHOLDS["min_benchmark_coverage"]}
+    ]
+}
+
 
 def build_dim_service() -> pd.DataFrame:
     """
-    Build service dimension table
+    Build service dimension table from SERVICE_CATALOG_FILE
+    
+    service_ids come from the catalog, so they stay the same as codes are
+    added to it.
     
     Returns:
         DataFrame with service catalog
     """
     logger.info("Building dim_service...")
     
-    # Start with reference data
-    services = []
-    for idx, service in enumerate(TOP_ER_SERVICES, start=1):
-        services.append({
-            "service_id": idx,
-            "cpt_hcpcs": service["code"],
-            "description": service["description"],
-            "category": service["category"],
-            "modality": service.get("modality", service["category"])
-        })
+    catalog = load_catalog()
     
-    df = pd.DataFrame(services)
+    df = pd.DataFrame({
+        "service_id": catalog["service_id"],
+        "cpt_hcpcs": catalog["code"],
+        "code_type": catalog["code_type"],
+        "description": catalog["description"],
+        "category": catalog["category"],
+        "modality": catalog["category"],
+        "core": catalog["core"]
+    })
     
-    logger.info(f"✓ Created dim_service with {len(df)} services")
+    logger.info(f"✓ Created dim_service with {len(df)} services ({df['core'].sum()} core)")
     
     return df
 
 
 def build_dim_provider() -> pd.DataFrame:
     """
-    Build provider dimension table
+    Build provider dimension table from the provider registry (PROVIDER_REGISTRY_FILE)
     
     Returns:
         DataFrame with hospital directory
     """
     logger.info("Building dim_provider...")
     
-    providers = []
-    for idx, (key, info) in enumerate(HOSPITAL_MRF_URLS.items(), start=1):
-        providers.append({
-            "provider_id": idx,
-            "hospital_name": info["hospital_name"],
-            "ccn": info.get("ccn", ""),
-            "city": info["city"],
-            "state": info["state"],
-            "zip_code": ""  # Can be added later
-        })
-    
-    df = pd.DataFrame(providers)
+    df = load_registry()
     
     logger.info(f"✓ Created dim_provider with {len(df)} hospitals")
     
@@ -80,7 +148,7 @@ def build_fact_prices(dim_service: pd.DataFrame, dim_provider: pd.DataFrame) ->
     Args:
         dim_service: Service dimension for ID mapping
         dim_provider: Provider dimension for ID mapping
-        
+    
     Returns:
         DataFrame with hospital prices
     """
@@ -92,25 +160,35 @@ def build_fact_prices(dim_service: pd.DataFrame, dim_provider: pd.DataFrame) ->
     if not prices_file.exists():
         logger.warning("⚠️  No hospital prices file found")
         logger.info("Creating empty fact_prices table")
-        return pd.DataFrame(columns=[
-            "price_id", "service_id", "provider_id", "gross_charge", 
-            "cash_price", "negotiated_min", "negotiated_median", 
-            "negotiated_max", "payer_count"
-        ])
+        return pd.DataFrame(columns=FACT_PRICES_COLUMNS)
     
     df = pd.read_parquet(prices_file)
     
-    # Map to service IDs
-    service_map = dim_service.set_index("cpt_hcpcs")["service_id"].to_dict()
-    df["service_id"] = df["code"].map(service_map)
+    # Map to service IDs through the normalized code index
+    df["service_id"] = lookup_services(df["code"], build_code_index(dim_service))["service_id"]
     
-    # Map to provider IDs
-    provider_map = dim_provider.set_index("hospital_name")["provider_id"].to_dict()
-    df["provider_id"] = df["hospital_name"].map(provider_map)
+    # Map to provider IDs by CCN (by hospital name for rows without one)
+    df["provider_id"] = resolve_providers(df.get("ccn"), df["hospital_name"], build_provider_index(dim_provider))
+    _warn_unresolved_providers(df.loc[df["provider_id"].isna(), "hospital_name"])
     
     # Remove unmapped records
     df = df.dropna(subset=["service_id", "provider_id"])
     
+    # price_id hashed from the natural key, so it survives reloads of other hospitals
+    provider_key = dim_provider["ccn"].fillna("").where(
+        dim_provider["ccn"].fillna("") != "", dim_provider["hospital_name"]
+    )
+    line_item = pd.DataFrame({
+        "provider": df["provider_id"].map(dict(zip(dim_provider["provider_id"], provider_key))),
+        **{
+            col: df[col].astype("string").fillna("") if col in df.columns else ""
+            for col in PRICE_LINE_COLUMNS
+        }
+    }, index=df.index)
+    ordered = line_item.loc[df.sort_values(PRICE_LINE_ORDER, kind="stable").index]
+    line_item["line"] = ordered.groupby(list(ordered.columns), sort=False).cumcount()
+    price_id = surrogate_key([line_item[col] for col in line_item.columns])
+    
     # Select and rename columns
     df = df[[
         "service_id", "provider_id", "gross_charge", "cash_price",
@@ -118,39 +196,52 @@ def build_fact_prices(dim_service: pd.DataFrame, dim_provider: pd.DataFrame) ->
     ]].copy()
     
     # Add price_id
-    df.insert(0, "price_id", range(1, len(df) + 1))
+    df.insert(0, "price_id", price_id)
     
     # Convert IDs to integers
     df["service_id"] = df["service_id"].astype(int)
     df["provider_id"] = df["provider_id"].astype(int)
     
+    df = _sort_fact(df)
+    
     logger.info(f"✓ Created fact_prices with {len(df)} records")
     
     return df
 
 
+def _warn_unresolved_providers(hospital_names: pd.Series):
+    """Log the hospitals whose prices are dropped because they are not in the provider registry"""
+    names = sorted(hospital_names.fillna("").astype(str).unique())
+    if names:
+        logger.warning(
+            f"⚠️  Prices of {len(names)} hospital(s) not in the provider registry are dropped: "
+            f"{', '.join(names[:10])}{' ...' if len(names) > 10 else ''}"
+        )
+
+
 def build_fact_benchmarks(dim_service: pd.DataFrame) -> pd.DataFrame:
     """
     Build benchmarks fact table from CMS data
     
     Args:
         dim_service: Service dimension for ID mapping
-        
+    
     Returns:
         DataFrame with Medicare benchmarks
     """
     logger.info("Building fact_benchmarks...")
     
-    # Load benchmarks
-    benchmarks_file = BENCHMARKS_DIR / "cms_benchmarks.parquet"
+    # Load every stored year of the catalog's codes only
+    df = read_benchmarks(
+        codes=dim_service["cpt_hcpcs"].tolist(),
+        columns=["code", "medicare_rate", "source", "year", "state", "locality"]
+    )
     
-    if not benchmarks_file.exists():
-        logger.error("✗ No benchmarks file found")
+    if df.empty:
+        logger.error("✗ No benchmarks found in the benchmark store")
         logger.info("Please run 03_process_benchmarks.py first")
         return pd.DataFrame()
     
-    df = pd.read_parquet(benchmarks_file)
-    
     # Map to service IDs
     service_map = dim_service.set_index("cpt_hcpcs")["service_id"].to_dict()
     df["service_id"] = df["code"].map(service_map)
@@ -158,20 +249,303 @@ def build_fact_benchmarks(dim_service: pd.DataFrame) -> pd.DataFrame:
     # Remove unmapped records
     df = df.dropna(subset=["service_id"])
     
-    # Select and rename columns
-    df = df[["service_id", "medicare_rate", "source", "year"]].copy()
+    # benchmark_id hashed from the natural key, so it survives new fee-schedule years
+    benchmark_id = surrogate_key([
+        df[col] if col in df.columns else pd.Series("", index=df.index) for col in BENCHMARK_KEY_COLUMNS
+    ])
+    
+    # Select and rename columns (PFS rates also carry their payment locality)
+    columns = ["service_id", "medicare_rate", "source", "year"]
+    columns += [col for col in ["state", "locality"] if col in df.columns]
+    df = df[columns].copy()
     
     # Add benchmark_id
-    df.insert(0, "benchmark_id", range(1, len(df) + 1))
+    df.insert(0, "benchmark_id", benchmark_id)
     
     # Convert IDs to integers
     df["service_id"] = df["service_id"].astype(int)
     
+    df = _sort_fact(df)
+    
     logger.info(f"✓ Created fact_benchmarks with {len(df)} records")
     
     return df
 
 
+def _sort_fact(df: pd.DataFrame) -> pd.DataFrame:
+    """Order fact rows by STAR_SCHEMA_SORT_COLUMNS, keeping input order among ties"""
+    columns = [col for col in STAR_SCHEMA_SORT_COLUMNS if col in df.columns]
+    return df.sort_values(columns, kind="stable", ignore_index=True) if columns else df
+
+
+def _layout() -> str:
+    """Layout settings as JSON, stored in every file so changing them rewrites unchanged data too"""
+    return json.dumps({
+        "sort_columns": STAR_SCHEMA_SORT_COLUMNS,
+        "row_group_rows": STAR_SCHEMA_ROW_GROUP_ROWS,
+        "compression": STAR_SCHEMA_COMPRESSION,
+        "dictionary_columns": STAR_SCHEMA_DICTIONARY_COLUMNS
+    }, sort_keys=True)
+
+
+def _table_path(directory: Path, table_name: str) -> Path:
+    """Where a table is written: a folder for partitioned fact tables, else one Parquet file"""
+    if STAR_SCHEMA_PARTITIONS.get(table_name):
+        return directory / table_name
+    return directory / f"{table_name}.parquet"
+
+
+def _partition_values(df: pd.DataFrame, partition_column: str, dim_provider: pd.DataFrame) -> pd.Series:
+    """Partition value of each fact row: its own column, or a dim_provider column looked up by provider_id"""
+    if partition_column in df.columns:
+        return df[partition_column]
+    if "provider_id" in df.columns and partition_column in dim_provider.columns:
+        return df["provider_id"].map(dim_provider.set_index("provider_id")[partition_column])
+    raise ValueError(f"Cannot partition by {partition_column!r}: not a column of the table or of dim_provider")
+
+
+def _copy_parquet(
+    con: duckdb.DuckDBPyConnection,
+    query: str,
+    order_by: List[str],
+    output: Path,
+    partition_column: Optional[str],
+    hidden: List[str]
+) -> int:
+    """
+    COPY a query to Parquet with the STAR_SCHEMA_* layout settings, returning the row count
+    
+    Without a partition column output is one file; otherwise it is a folder of
+    <column>=<value>/part-0.parquet files. A partitioned COPY does not keep
+    the row order within partitions, so the ordered rows are staged in a
+    temporary table (which spills to DUCKDB_TEMP_DIR) grouped by partition,
+    and each partition is copied on its own. DuckDB picks dictionary
+    encoding per column chunk itself, so STAR_SCHEMA_DICTIONARY_COLUMNS
+    only applies to files written from pandas.
+    
+    Args:
+        con: Connection from connect_duckdb
+        query: SELECT of the table's columns plus the hidden ones
+        order_by: Row order
+        output: Parquet file, or folder for a partitioned table
+        partition_column: Column to partition by, or None
+        hidden: Columns used for ordering or partitioning only, left out of the files
+    """
+    options = (
+        f"FORMAT PARQUET, COMPRESSION {STAR_SCHEMA_COMPRESSION}, ROW_GROUP_SIZE {int(STAR_SCHEMA_ROW_GROUP_ROWS)}, "
+        f"KV_METADATA {{{LAYOUT_KEY}: {sql_string(_layout())}}}"
+    )
+    columns = f"* EXCLUDE ({', '.join(hidden)})" if hidden else "*"
+    
+    if partition_column is None:
+        return con.execute(
+            f"COPY (SELECT {columns} FROM ({query}) ORDER BY {', '.join(order_by)}) TO {sql_string(output)} ({options})"
+        ).fetchone()[0]
+    
+    con.execute(
+        f"CREATE OR REPLACE TEMP TABLE fact_stage AS "
+        f"SELECT * FROM ({query}) ORDER BY {', '.join([partition_column] + order_by)}"
+    )
+    values = [row[0] for row in con.execute(f"SELECT DISTINCT {partition_column} FROM fact_stage ORDER BY 1").fetchall()]
+    output.mkdir(parents=True, exist_ok=True)
+    
+    if not values:
+        # No partitions at all: keep one empty file so the table still has a schema
+        con.execute(f"COPY (SELECT {columns} FROM fact_stage) TO {sql_string(output / 'part-0.parquet')} ({options})")
+    
+    rows = 0
+    for value in values:
+        partition_dir = output / f"{partition_column}={NULL_PARTITION if value is None else value}"
+        partition_dir.mkdir()
+        condition = f"{partition_column} IS NULL" if value is None else f"{partition_column} = {sql_string(value)}"
+        # Scans keep insertion order, so each partition comes out in order_by order
+        rows += con.execute(
+            f"COPY (SELECT {columns} FROM fact_stage WHERE {condition}) "
+            f"TO {sql_string(partition_dir / 'part-0.parquet')} ({options})"
+        ).fetchone()[0]
+    
+    con.execute("DROP TABLE fact_stage")
+    
+    return rows
+
+
+def build_fact_prices_duckdb(
+    con: duckdb.DuckDBPyConnection,
+    dim_service: pd.DataFrame,
+    dim_provider: pd.DataFrame,
+    output: Path
+) -> Table:
+    """
+    Build prices fact table with DuckDB, straight from hospital_prices.parquet
+    
+    Service and provider IDs are resolved by SQL hash joins against the
+    code and provider indexes (built over the distinct codes and hospitals
+    only), and the result is written to output (partitioned as set in
+    STAR_SCHEMA_PARTITIONS) without passing through pandas, so the prices
+    never have to fit in memory. Rows, IDs, columns and types match
+    build_fact_prices.
+    
+    Args:
+        con: Connection from connect_duckdb
+        dim_service: Service dimension for ID mapping
+        dim_provider: Provider dimension for ID mapping
+        output: Parquet file, or folder for a partitioned table
+    
+    Returns:
+        output, or an empty DataFrame if there are no hospital prices
+    """
+    logger.info("Building fact_prices (DuckDB)...")
+    
+    prices_file = PROCESSED_DATA_DIR / "hospital_prices.parquet"
+    
+    if not prices_file.exists():
+        logger.warning("⚠️  No hospital prices file found")
+        logger.info("Creating empty fact_prices table")
+        return pd.DataFrame(columns=FACT_PRICES_COLUMNS)
+    
+    source = f"read_parquet({sql_string(prices_file)}, file_row_number = true)"
+    
+    # Raw code -> service_id, resolved once per distinct code by the normalized code index
+    codes = con.execute(f"SELECT DISTINCT code FROM {source} WHERE code IS NOT NULL").df()["code"]
+    code_index = pd.DataFrame({
+        "code": codes,
+        "service_id": lookup_services(codes, build_code_index(dim_service))["service_id"]
+    }).dropna(subset=["service_id"])
+    con.register("code_index", code_index)
+    
+    stored = {row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()}
+    
+    # (CCN, hospital name) -> provider_id, resolved once per distinct pair by the provider index
+    ccn = "p.ccn" if "ccn" in stored else "CAST(NULL AS VARCHAR)"
+    provider_index = con.execute(f"SELECT DISTINCT {ccn} AS ccn, p.hospital_name FROM {source} p").df()
+    provider_index["provider_id"] = resolve_providers(
+        provider_index["ccn"], provider_index["hospital_name"], build_provider_index(dim_provider)
+    )
+    _warn_unresolved_providers(provider_index.loc[provider_index["provider_id"].isna(), "hospital_name"])
+    con.register("provider_index", provider_index.dropna(subset=["provider_id"]))
+    con.register("dim_provider", dim_provider)
+    
+    # A provider attribute (e.g. state) to partition by is carried along for the directory names only
+    partition_column = STAR_SCHEMA_PARTITIONS.get("fact_prices")
+    lookup = partition_column if partition_column and partition_column not in FACT_PRICES_COLUMNS else None
+    if lookup and lookup not in dim_provider.columns:
+        raise ValueError(f"Cannot partition by {lookup!r}: not a column of the table or of dim_provider")
+    
+    line_item = [
+        f"coalesce(CAST(p.{col} AS VARCHAR), '')" if col in stored else "''" for col in PRICE_LINE_COLUMNS
+    ]
+    
+    query = f"""
+        SELECT
+            {surrogate_key_sql(["p.provider_key"] + [f"p.key_{col}" for col in PRICE_LINE_COLUMNS] + ["p.line"])} AS price_id,
+            p.service_id,
+            p.provider_id,
+            p.gross_charge,
+            p.cash_price,
+            p.negotiated_min,
+            p.negotiated_median,
+            p.negotiated_max,
+            p.payer_count,
+            p.file_row_number{f", p.{lookup}" if lookup else ""}
+        FROM (
+            SELECT
+                p.*,
+                {", ".join(f"{expr} AS key_{col}" for expr, col in zip(line_item, PRICE_LINE_COLUMNS))},
+                row_number() OVER (
+                    PARTITION BY coalesce(nullif(d.ccn, ''), d.hospital_name), {", ".join(line_item)}
+                    ORDER BY {", ".join(f"p.{col}" for col in PRICE_LINE_ORDER)}, p.file_row_number
+                ) - 1 AS line,
+                coalesce(nullif(d.ccn, ''), d.hospital_name) AS provider_key,
+                s.service_id,
+                d.provider_id{f", d.{lookup}" if lookup else ""}
+            FROM {source} p
+            JOIN code_index s ON p.code = s.code
+            JOIN provider_index i ON {ccn} IS NOT DISTINCT FROM i.ccn AND p.hospital_name IS NOT DISTINCT FROM i.hospital_name
+            JOIN dim_provider d ON i.provider_id = d.provider_id
+        ) p
+    """
+    order_by = [col for col in STAR_SCHEMA_SORT_COLUMNS if col in FACT_PRICES_COLUMNS] + ["file_row_number"]
+    
+    start = time.perf_counter()
+    rows = _copy_parquet(
+        con, query, order_by, output, partition_column, ["file_row_number"] + ([lookup] if lookup else [])
+    )
+    
+    logger.info(f"✓ Created fact_prices with {rows} records ({time.perf_counter() - start:.1f}s)")
+    
+    return output
+
+
+def build_fact_benchmarks_duckdb(
+    con: duckdb.DuckDBPyConnection,
+    dim_service: pd.DataFrame,
+    output: Path
+) -> Table:
+    """
+    Build benchmarks fact table with DuckDB, straight from the benchmark store
+    
+    Codes are matched to services by a SQL join over every stored
+    partition, and the result is written to output (partitioned as set in
+    STAR_SCHEMA_PARTITIONS). Rows, IDs, columns and types match
+    build_fact_benchmarks.
+    
+    Args:
+        con: Connection from connect_duckdb
+        dim_service: Service dimension for ID mapping
+        output: Parquet file, or folder for a partitioned table
+    
+    Returns:
+        output, or an empty DataFrame if the store is empty
+    """
+    logger.info("Building fact_benchmarks (DuckDB)...")
+    
+    files = [str(partition["path"]) for partition in list_partitions()]
+    
+    if not files:
+        logger.error("✗ No benchmarks found in the benchmark store")
+        logger.info("Please run 03_process_benchmarks.py first")
+        return pd.DataFrame()
+    
+    con.register("dim_service", dim_service[["service_id", "cpt_hcpcs"]])
+    
+    source = (
+        f"read_parquet([{', '.join(sql_string(f) for f in files)}], "
+        f"hive_partitioning = true, union_by_name = true, file_row_number = true)"
+    )
+    stored = [row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+    # PFS rates also carry their payment locality
+    extra = [col for col in ["state", "locality"] if col in stored]
+    columns = ["benchmark_id", "service_id", "medicare_rate", "source", "year"] + extra
+    
+    partition_column = STAR_SCHEMA_PARTITIONS.get("fact_benchmarks")
+    if partition_column and partition_column not in columns:
+        raise ValueError(f"Cannot partition by {partition_column!r}: not a column of fact_benchmarks")
+    natural_key = [
+        "CAST(b.year AS BIGINT)" if col == "year" else (f"b.{col}" if col in stored else "''")
+        for col in BENCHMARK_KEY_COLUMNS
+    ]
+    
+    query = f"""
+        SELECT
+            {surrogate_key_sql(natural_key)} AS benchmark_id,
+            s.service_id,
+            b.medicare_rate,
+            b.source,
+            CAST(b.year AS BIGINT) AS year{"".join(f", b.{col}" for col in extra)},
+            b.file_row_number
+        FROM {source} b
+        JOIN dim_service s ON b.code = s.cpt_hcpcs
+    """
+    order_by = [col for col in STAR_SCHEMA_SORT_COLUMNS if col in columns] + ["source", "year", "file_row_number"]
+    
+    start = time.perf_counter()
+    rows = _copy_parquet(con, query, order_by, output, partition_column, ["file_row_number"])
+    
+    logger.info(f"✓ Created fact_benchmarks with {rows} records ({time.perf_counter() - start:.1f}s)")
+    
+    return output
+
+
 def build_fact_scenarios() -> pd.DataFrame:
     """
     Build scenarios fact table
@@ -202,97 +576,170 @@ def build_fact_scenarios() -> pd.DataFrame:
 def validate_star_schema(
     dim_service: pd.DataFrame,
     dim_provider: pd.DataFrame,
-    fact_prices: pd.DataFrame,
-    fact_benchmarks: pd.DataFrame,
+    fact_prices: Table,
+    fact_benchmarks: Table,
     fact_scenarios: pd.DataFrame
-) -> bool:
+) -> Dict:
     """
-    Validate star schema integrity
+    Validate star schema integrity against STAR_SCHEMA_RULES
+    
+    Checks key integrity, foreign keys, benchmark values and the
+    DATA_QUALITY_THRESHOLDS null and coverage limits. Fact tables built
+    by DuckDB are checked from their Parquet files.
     
     Returns:
-        True if all validations pass
+        Data quality report
     """
     logger.info("\n" + "=" * 60)
     logger.info("VALIDATING STAR SCHEMA")
     logger.info("=" * 60)
     
-    all_valid = True
-    
-    # Check 1: No null primary keys
-    if dim_service["service_id"].isnull().any():
-        logger.error("✗ Null values in dim_service.service_id")
-        all_valid = False
-    else:
-        logger.info("✓ dim_service.service_id has no nulls")
-    
-    if dim_provider["provider_id"].isnull().any():
-        logger.error("✗ Null values in dim_provider.provider_id")
-        all_valid = False
-    else:
-        logger.info("✓ dim_provider.provider_id has no nulls")
-    
-    # Check 2: Foreign key integrity
-    if not fact_prices.empty:
-        invalid_services = ~fact_prices["service_id"].isin(dim_service["service_id"])
-        if invalid_services.any():
-            logger.error(f"✗ {invalid_services.sum()} invalid service_id in fact_prices")
-            all_valid = False
-        else:
-            logger.info("✓ All fact_prices.service_id are valid")
-        
-        invalid_providers = ~fact_prices["provider_id"].isin(dim_provider["provider_id"])
-        if invalid_providers.any():
-            logger.error(f"✗ {invalid_providers.sum()} invalid provider_id in fact_prices")
-            all_valid = False
-        else:
-            logger.info("✓ All fact_prices.provider_id are valid")
-    
-    if not fact_benchmarks.empty:
-        invalid_services = ~fact_benchmarks["service_id"].isin(dim_service["service_id"])
-        if invalid_services.any():
-            logger.error(f"✗ {invalid_services.sum()} invalid service_id in fact_benchmarks")
-            all_valid = False
-        else:
-            logger.info("✓ All fact_benchmarks.service_id are valid")
-    
-    # Check 3: Data quality
-    if not fact_benchmarks.empty:
-        negative_rates = fact_benchmarks["medicare_rate"] <= 0
-        if negative_rates.any():
-            logger.error(f"✗ {negative_rates.sum()} non-positive medicare_rate values")
-            all_valid = False
-        else:
-            logger.info("✓ All medicare_rate values are positive")
+    tables = {
+        "dim_service": dim_service,
+        "core_services": dim_service[dim_service["core"]],
+        "dim_provider": dim_provider,
+        "fact_prices": fact_prices,
+        "fact_benchmarks": fact_benchmarks,
+        "fact_scenarios": fact_scenarios
+    }
     
-    # Check 4: Coverage
-    services_with_benchmarks = fact_benchmarks["service_id"].nunique()
-    total_services = len(dim_service)
-    coverage = services_with_benchmarks / total_services if total_services > 0 else 0
+    report = check_tables(tables, STAR_SCHEMA_RULES)
+    log_report(report)
     
-    logger.info(f"✓ Benchmark coverage: {coverage:.1%} ({services_with_benchmarks}/{total_services} services)")
+    return report
+
+
+def _write_parquet(df: pd.DataFrame, output_file: Path):
+    """Write a DataFrame with the STAR_SCHEMA_* row group, compression and dictionary settings"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), LAYOUT_KEY: _layout()})
+    
+    pq.write_table(
+        table,
+        output_file,
+        row_group_size=STAR_SCHEMA_ROW_GROUP_ROWS,
+        compression=STAR_SCHEMA_COMPRESSION,
+        use_dictionary=[col for col in table.column_names if col in STAR_SCHEMA_DICTIONARY_COLUMNS],
+        write_statistics=True
+    )
+
+
+def _stage_table(df: pd.DataFrame, output: Path, partition_column: Optional[str], dim_provider: pd.DataFrame) -> Path:
+    """Write a DataFrame as one Parquet file, or as <column>=<value>/part-0.parquet files per value"""
+    if partition_column is None:
+        _write_parquet(df, output)
+        return output
+    
+    output.mkdir(parents=True, exist_ok=True)
+    
+    if df.empty:
+        # No partitions at all: keep one empty file so the table still has a schema
+        _write_parquet(df, output / "part-0.parquet")
+        return output
+    
+    values = _partition_values(df, partition_column, dim_provider)
+    for value, group in df.groupby(values, sort=True, dropna=False):
+        partition_dir = output / f"{partition_column}={NULL_PARTITION if pd.isna(value) else value}"
+        partition_dir.mkdir()
+        _write_parquet(group, partition_dir / "part-0.parquet")
+    
+    return output
+
+
+def _same_data(published: Path, staged: Path) -> bool:
+    """Whether two Parquet files hold the same rows, columns and types, written with the same layout settings"""
+    published_metadata = pq.read_metadata(published)
+    staged_metadata = pq.read_metadata(staged)
+    if published_metadata.num_rows != staged_metadata.num_rows:
+        return False
+    
+    key = LAYOUT_KEY.encode("utf-8")
+    if (published_metadata.metadata or {}).get(key) != (staged_metadata.metadata or {}).get(key):
+        return False
+    
+    def read(file_path: Path) -> pa.Table:
+        table = pq.read_table(file_path)
+        # pandas writes large_string where DuckDB writes string; the values are what count
+        schema = pa.schema([
+            field.with_type(pa.string()) if pa.types.is_large_string(field.type) else field
+            for field in table.schema
+        ])
+        return table.cast(schema)
     
-    if coverage < 0.8:
-        logger.warning(f"⚠️  Low benchmark coverage ({coverage:.1%})")
+    return read(published).equals(read(staged))
+
+
+def _publish(staged: Path, target: Path, counts: Dict[str, int]):
+    """
+    Move a staged file or directory tree into place, file by file
     
-    return all_valid
+    A published file whose data equals the staged one is left untouched
+    (same bytes and modification time), files that differ are replaced and
+    published files with no staged counterpart are removed.
+    """
+    if staged.is_dir():
+        if target.is_file():
+            target.unlink()
+        target.mkdir(parents=True, exist_ok=True)
+        
+        names = set()
+        for child in sorted(staged.iterdir()):
+            names.add(child.name)
+            _publish(child, target / child.name, counts)
+        
+        for child in sorted(target.iterdir()):
+            if child.name not in names:
+                if child.is_dir():
+                    shutil.rmtree(child)
+                else:
+                    child.unlink()
+                counts["removed"] += 1
+        return
+    
+    if target.is_file() and _same_data(target, staged):
+        counts["unchanged"] += 1
+        return
+    
+    if target.is_dir():
+        shutil.rmtree(target)
+    staged.replace(target)
+    counts["written"] += 1
 
 
 def save_star_schema(
     dim_service: pd.DataFrame,
     dim_provider: pd.DataFrame,
-    fact_prices: pd.DataFrame,
-    fact_benchmarks: pd.DataFrame,
-    fact_scenarios: pd.DataFrame
-):
+    fact_prices: Table,
+    fact_benchmarks: Table,
+    fact_scenarios: pd.DataFrame,
+    staging_dir: Path
+) -> Dict[str, Table]:
     """
     Save all star schema tables to parquet files
+    
+    Facts are sorted by STAR_SCHEMA_SORT_COLUMNS and every file is written
+    with the STAR_SCHEMA_* row group, compression and dictionary settings
+    and column statistics, so filtered reads skip row groups. Fact tables
+    partitioned in STAR_SCHEMA_PARTITIONS are saved as folders (e.g.
+    fact_prices/provider_id=3/part-0.parquet). Every table is written to
+    staging_dir first (the DuckDB engine has already written its fact
+    tables there) and only files whose data changed replace the published
+    ones, so a run that reloads one hospital rewrites only that hospital's
+    partition and Power BI incremental refresh picks up just that.
+    
+    Args:
+        staging_dir: Scratch directory on the same filesystem as STAR_SCHEMA_DIR
+    
+    Returns:
+        Dict of table name -> saved table (DataFrame, or Parquet file/directory)
     """
     logger.info("\n" + "=" * 60)
     logger.info("SAVING STAR SCHEMA")
     logger.info("=" * 60)
     
-    output_dir = PROCESSED_DATA_DIR / "star_schema"
+    output_dir = STAR_SCHEMA_DIR
     output_dir.mkdir(parents=True, exist_ok=True)
+    staging_dir.mkdir(parents=True, exist_ok=True)
     
     tables = {
         "dim_service": dim_service,
@@ -302,24 +749,119 @@ def save_star_schema(
         "fact_scenarios": fact_scenarios
     }
     
-    for table_name, df in tables.items():
-        output_file = output_dir / f"{table_name}.parquet"
-        df.to_parquet(output_file, index=False)
+    saved = {}
+    layout = {}
+    for table_name, table in tables.items():
+        output = _table_path(output_dir, table_name)
+        
+        if isinstance(table, Path):
+            staged = table
+        else:
+            staged = _stage_table(
+                table, _table_path(staging_dir, table_name), STAR_SCHEMA_PARTITIONS.get(table_name), dim_provider
+            )
+        
+        # Copy in the other layout, from before partitioning was switched on or off
+        other = output_dir / f"{table_name}.parquet" if output.suffix != ".parquet" else output_dir / table_name
+        if other.is_dir():
+            shutil.rmtree(other)
+        elif other.exists():
+            other.unlink()
+        
+        counts = {"written": 0, "unchanged": 0, "removed": 0}
+        _publish(staged, output, counts)
+        saved[table_name] = output if isinstance(table, Path) else table
         
-        file_size = output_file.stat().st_size / 1024
-        logger.info(f"✓ Saved {table_name}: {len(df)} rows, {file_size:.2f} KB")
+        layout[table_name] = _file_layout(output)
+        logger.info(
+            f"✓ Saved {table_name}: {layout[table_name]['rows']} rows, "
+            f"{layout[table_name]['row_groups']} row group(s), {layout[table_name]['bytes'] / 1024:.2f} KB "
+            f"({counts['written']} file(s) written, {counts['unchanged']} unchanged, {counts['removed']} removed)"
+        )
+    
+    report_file = DATA_QUALITY_REPORT_DIR / "star_schema_layout.json"
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    report_file.write_text(json.dumps({"settings": json.loads(_layout()), "tables": layout}, indent=2))
     
     logger.info(f"\n✓ All tables saved to: {output_dir}")
+    logger.info(f"✓ Layout report saved to: {report_file}")
+    
+    return saved
+
+
+def _file_layout(output: Path) -> Dict:
+    """Files, rows, row groups, bytes and compression of a saved Parquet file or folder, from the footers"""
+    files = sorted(output.rglob("*.parquet")) if output.is_dir() else [output]
+    metadata = [pq.read_metadata(f) for f in files]
+    row_group_rows = [m.row_group(i).num_rows for m in metadata for i in range(m.num_row_groups)]
+    
+    return {
+        "path": str(output),
+        "files": len(files),
+        "rows": sum(m.num_rows for m in metadata),
+        "row_groups": len(row_group_rows),
+        "max_row_group_rows": max(row_group_rows, default=0),
+        "bytes": sum(f.stat().st_size for f in files),
+        "compression": sorted({
+            m.row_group(i).column(j).compression
+            for m in metadata for i in range(m.num_row_groups) for j in range(m.num_columns)
+        })
+    }
+
+
+def _row_count(table: Table) -> int:
+    """Rows in a DataFrame or Parquet file/directory"""
+    if isinstance(table, pd.DataFrame):
+        return len(table)
+    return ds.dataset(table, format="parquet").count_rows()
+
+
+def _describe(
+    table: Table,
+    columns: List[str],
+    by: Optional[str] = None,
+    con: Optional[duckdb.DuckDBPyConnection] = None
+) -> pd.DataFrame:
+    """pandas describe() of columns (of one column per group with by), run in DuckDB for Parquet files/directories"""
+    if isinstance(table, pd.DataFrame):
+        return table.groupby(by)[columns[0]].describe() if by else table[columns].describe()
+    
+    stats = {
+        "count": "count({col})",
+        "mean": "avg({col})",
+        "std": "stddev_samp({col})",
+        "min": "min({col})",
+        "25%": "quantile_cont({col}, 0.25)",
+        "50%": "quantile_cont({col}, 0.5)",
+        "75%": "quantile_cont({col}, 0.75)",
+        "max": "max({col})"
+    }
+    source = parquet_source(table)
+    
+    if by:
+        select = ", ".join(f'{expr.format(col=columns[0])} AS "{name}"' for name, expr in stats.items())
+        df = con.execute(f"SELECT {by}, {select} FROM {source} GROUP BY {by} ORDER BY {by}").df()
+        return df.set_index(by).astype(float)
+    
+    select = ", ".join(
+        f'{expr.format(col=col)} AS "{col}:{name}"' for col in columns for name, expr in stats.items()
+    )
+    values = con.execute(f"SELECT {select} FROM {source}").fetchone()
+    return pd.DataFrame(
+        [[values[i * len(stats) + j] for i in range(len(columns))] for j in range(len(stats))],
+        index=list(stats), columns=columns, dtype=float
+    )
 
 
 def print_summary(
     dim_service: pd.DataFrame,
     dim_provider: pd.DataFrame,
-    fact_prices: pd.DataFrame,
-    fact_benchmarks: pd.DataFrame,
-    fact_scenarios: pd.DataFrame
+    fact_prices: Table,
+    fact_benchmarks: Table,
+    fact_scenarios: pd.DataFrame,
+    con: Optional[duckdb.DuckDBPyConnection] = None
 ):
-    """Print summary statistics"""
+    """Print summary statistics (fact tables saved as Parquet are summarized by DuckDB)"""
     logger.info("\n" + "=" * 60)
     logger.info("STAR SCHEMA SUMMARY")
     logger.info("=" * 60)
@@ -327,21 +869,38 @@ def print_summary(
     print(f"\n📊 Table Sizes:")
     print(f"  dim_service:      {len(dim_service):,} rows")
     print(f"  dim_provider:     {len(dim_provider):,} rows")
-    print(f"  fact_prices:      {len(fact_prices):,} rows")
-    print(f"  fact_benchmarks:  {len(fact_benchmarks):,} rows")
+    print(f"  fact_prices:      {_row_count(fact_prices):,} rows")
+    print(f"  fact_benchmarks:  {_row_count(fact_benchmarks):,} rows")
     print(f"  fact_scenarios:   {len(fact_scenarios):,} rows")
     
-    if not fact_prices.empty:
+    if _row_count(fact_prices):
         print(f"\n💰 Price Statistics:")
-        print(fact_prices[["gross_charge", "cash_price", "negotiated_median"]].describe().round(2))
+        print(_describe(fact_prices, ["gross_charge", "cash_price", "negotiated_median"], con=con).round(2))
     
-    if not fact_benchmarks.empty:
+    if _row_count(fact_benchmarks):
         print(f"\n📈 Benchmark Statistics:")
-        print(fact_benchmarks.groupby("source")["medicare_rate"].describe().round(2))
+        print(_describe(fact_benchmarks, ["medicare_rate"], by="source", con=con).round(2))
 
 
-def main():
-    """Main orchestrator"""
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Build the star schema for Power BI")
+    parser.add_argument(
+        "--engine", choices=["pandas", "duckdb"], default=STAR_SCHEMA_ENGINE,
+        help="Build fact tables in pandas, or with DuckDB joins over Parquet that spill to disk"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Main orchestrator
+    
+    Returns:
+        Exit status: 0 (a failed build raises)
+    """
+    args = parse_args(argv)
+    
     logger.info("🚀 Starting star schema build...\n")
     
     logger.info("=" * 60)
@@ -352,39 +911,50 @@ def main():
     dim_service = build_dim_service()
     dim_provider = build_dim_provider()
     
-    # Build fact tables
-    fact_prices = build_fact_prices(dim_service, dim_provider)
-    fact_benchmarks = build_fact_benchmarks(dim_service)
+    # Build fact tables (DuckDB writes them to the staging directory right away)
+    con = None
+    staging_dir = STAR_SCHEMA_DIR / ".staging"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    if args.engine == "duckdb":
+        con = connect_duckdb()
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        fact_prices = build_fact_prices_duckdb(con, dim_service, dim_provider, _table_path(staging_dir, "fact_prices"))
+        fact_benchmarks = build_fact_benchmarks_duckdb(con, dim_service, _table_path(staging_dir, "fact_benchmarks"))
+    else:
+        fact_prices = build_fact_prices(dim_service, dim_provider)
+        fact_benchmarks = build_fact_benchmarks(dim_service)
     fact_scenarios = build_fact_scenarios()
     
-    # Validate
-    is_valid = validate_star_schema(
-        dim_service, dim_provider, fact_prices, 
-        fact_benchmarks, fact_scenarios
-    )
-    
-    if not is_valid:
-        logger.warning("⚠️  Validation warnings detected, but continuing...")
-    
-    # Save
-    save_star_schema(
-        dim_service, dim_provider, fact_prices,
-        fact_benchmarks, fact_scenarios
-    )
+    try:
+        # Validate
+        report = validate_star_schema(
+            dim_service, dim_provider, fact_prices, 
+            fact_benchmarks, fact_scenarios
+        )
+        write_report(report, DATA_QUALITY_REPORT_DIR / "star_schema.json")
+        
+        # Stop before saving, so a failing build never replaces the last good tables
+        enforce(report)
+        
+        # Save
+        tables = save_star_schema(
+            dim_service, dim_provider, fact_prices,
+            fact_benchmarks, fact_scenarios, staging_dir
+        )
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
     
     # Summary
-    print_summary(
-        dim_service, dim_provider, fact_prices,
-        fact_benchmarks, fact_scenarios
-    )
+    print_summary(**tables, con=con)
     
     logger.info("\n✅ Star schema build complete!")
     logger.info("\n📝 Next steps:")
     logger.info("1. Open Power BI Desktop")
     logger.info("2. Get Data → Parquet")
-    logger.info(f"3. Navigate to: {PROCESSED_DATA_DIR / 'star_schema'}")
-    logger.info("4. Select all 5 parquet files and load")
+    logger.info(f"3. Navigate to: {STAR_SCHEMA_DIR}")
+    logger.info("4. Load the dim_*/fact_scenarios parquet files and the fact_prices/fact_benchmarks folders")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,531 @@
+"""
+Build Analytics Marts
+Precomputes markup ratios, percentiles and severity buckets from the star
+schema, so dashboards and the API read aggregates instead of computing them
+"""
+
+import argparse
+import json
+import logging
+import sys
+import math
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+from config import (
+    STAR_SCHEMA_DIR, MARTS_DIR, BENCHMARK_SOURCES, MARKUP_SEVERITY_THRESHOLDS,
+    MARKUP_BUCKET_EDGES, MARKUP_PERCENTILES, MARTS_NATIONAL, WEBSITE_MARTS_FILE,
+    RATE_SKETCHES_FILE
+)
+from duckdb_session import connect_duckdb, parquet_source
+from provider_registry import build_provider_index, resolve_providers
+from quantile_sketch import ACCURACY_KEY, merge_sketches, sketch_counts, sketch_quantiles
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Columns a mart row can be grouped by, in GROUPING() argument order
+GROUP_COLUMNS = ["service_id", "category", "provider_id", "state"]
+
+# Mart -> grouping sets of its rows. Rows grouped without state are the
+# national rows, with state set to MARTS_NATIONAL.
+MARTS = {
+    "mart_service_markup": [["service_id", "category", "state"], ["service_id", "category"]],
+    "mart_category_markup": [["category", "state"], ["category"]],
+    "mart_state_markup": [["state"], []],
+    "mart_provider_service": [["service_id", "category", "provider_id", "state"]]
+}
+
+
+def _star_table(table_name: str) -> Optional[Path]:
+    """Saved star schema table: a partitioned folder or a single Parquet file, None if not built"""
+    for path in [STAR_SCHEMA_DIR / table_name, STAR_SCHEMA_DIR / f"{table_name}.parquet"]:
+        if path.exists():
+            return path
+    return None
+
+
+def _grouping_id(columns: List[str]) -> int:
+    """GROUPING(service_id, category, provider_id, state) of the rows grouped by columns"""
+    return sum(1 << (len(GROUP_COLUMNS) - 1 - i) for i, col in enumerate(GROUP_COLUMNS) if col not in columns)
+
+
+def _bucket_columns() -> List[tuple]:
+    """(column, lower, upper) of each markup distribution bucket, e.g. ("markup_3_5x", 3, 5)"""
+    edges = [None] + MARKUP_BUCKET_EDGES + [None]
+    buckets = []
+    for lower, upper in zip(edges[:-1], edges[1:]):
+        if upper is None:
+            buckets.append((f"markup_{lower}x_plus", lower, None))
+        else:
+            buckets.append((f"markup_{lower or 1}_{upper}x", lower, upper))
+    return buckets
+
+
+def severity(markup: float) -> Optional[str]:
+    """
+    Severity of a markup ratio under MARKUP_SEVERITY_THRESHOLDS
+    
+    Args:
+        markup: Gross charge ÷ Medicare rate
+    
+    Returns:
+        critical, high, moderate or fair, or None without a markup
+    """
+    if markup is None or pd.isna(markup):
+        return None
+    for level, threshold in sorted(MARKUP_SEVERITY_THRESHOLDS.items(), key=lambda item: -item[1]):
+        if markup >= threshold:
+            return level
+    return "fair"
+
+
+def select_benchmarks(fact_benchmarks: pd.DataFrame, states: List[str]) -> pd.DataFrame:
+    """
+    Medicare rate used as the markup denominator for each service and state
+    
+    Only the latest year of each source counts, and a service takes its
+    rate from the first of BENCHMARK_SOURCES that has one. Where the source
+    is priced by locality (PFS), a state uses the median of its localities;
+    a state without one, and the national rate, use the median of every
+    locality.
+    
+    Args:
+        fact_benchmarks: Benchmark fact table
+        states: Provider states to price
+    
+    Returns:
+        DataFrame with service_id, state, medicare_rate, benchmark_source and benchmark_year
+    """
+    columns = ["service_id", "state", "medicare_rate", "benchmark_source", "benchmark_year"]
+    if fact_benchmarks.empty:
+        return pd.DataFrame(columns=columns)
+    
+    df = fact_benchmarks.copy()
+    if "state" not in df.columns:
+        df["state"] = None
+    
+    df = df[df["year"] == df.groupby(["service_id", "source"])["year"].transform("max")]
+    preference = df["source"].map({source: rank for rank, source in enumerate(BENCHMARK_SOURCES)})
+    df = df[preference == preference.groupby(df["service_id"]).transform("min")]
+    
+    national = df[df["state"].isna()].groupby("service_id")["medicare_rate"].median()
+    national = national.combine_first(df.groupby("service_id")["medicare_rate"].median())
+    by_state = df.dropna(subset=["state"]).groupby(["service_id", "state"])["medicare_rate"].median()
+    source = df.groupby("service_id").agg(benchmark_source=("source", "first"), benchmark_year=("year", "first"))
+    
+    rows = []
+    for service_id, rate in national.items():
+        for state in states:
+            rows.append({
+                "service_id": service_id,
+                "state": state,
+                "medicare_rate": by_state.get((service_id, state), rate),
+                **source.loc[service_id].to_dict()
+            })
+    
+    return pd.DataFrame(rows, columns=columns)
+
+
+def aggregate_markups(
+    con: duckdb.DuckDBPyConnection,
+    fact_prices: Path,
+    dim_service: pd.DataFrame,
+    dim_provider: pd.DataFrame,
+    benchmarks: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Aggregate markup statistics for every mart in one pass over fact_prices
+    
+    Prices are joined to their service, provider state and Medicare rate,
+    and a single GROUPING SETS aggregate produces the rows of every level in
+    MARTS, so the fact table is scanned once however many marts there are.
+    DuckDB reads the Parquet files directly and spills to disk beyond its
+    memory limit.
+    
+    Args:
+        con: Connection from connect_duckdb
+        fact_prices: Saved fact_prices file or folder
+        dim_service: Service dimension
+        dim_provider: Provider dimension
+        benchmarks: Medicare rates from select_benchmarks
+    
+    Returns:
+        DataFrame of aggregates with a grouping_id column identifying the level
+    """
+    con.register("dim_service", dim_service[["service_id", "category"]])
+    con.register("dim_provider", dim_provider[["provider_id", "state"]])
+    con.register("benchmark", benchmarks[["service_id", "state", "medicare_rate"]])
+    
+    grouping_sets = sorted({tuple(columns) for sets in MARTS.values() for columns in sets})
+    quantiles = ", ".join(str(q) for q in MARKUP_PERCENTILES)
+    severity_counts = []
+    upper = None
+    for level, threshold in sorted(MARKUP_SEVERITY_THRESHOLDS.items(), key=lambda item: -item[1]):
+        below = f" AND markup < {upper}" if upper is not None else ""
+        severity_counts.append(f"count(*) FILTER (WHERE markup >= {threshold}{below}) AS {level}_count")
+        upper = threshold
+    severity_counts.append(f"count(*) FILTER (WHERE markup < {upper}) AS fair_count")
+    bucket_counts = [
+        "count(*) FILTER (WHERE " + " AND ".join(
+            ([f"markup >= {lower}"] if lower is not None else []) + ([f"markup < {upper}"] if upper is not None else [])
+        ) + f") AS {column}"
+        for column, lower, upper in _bucket_columns()
+    ]
+    
+    query = f"""
+        WITH priced AS (
+            SELECT
+                f.service_id,
+                s.category,
+                f.provider_id,
+                p.state,
+                f.gross_charge,
+                f.cash_price,
+                f.negotiated_median,
+                b.medicare_rate,
+                f.gross_charge / nullif(b.medicare_rate, 0) AS markup
+            FROM {parquet_source(fact_prices)} f
+            JOIN dim_service s ON f.service_id = s.service_id
+            JOIN dim_provider p ON f.provider_id = p.provider_id
+            LEFT JOIN benchmark b ON f.service_id = b.service_id AND p.state = b.state
+        )
+        SELECT
+            grouping({", ".join(GROUP_COLUMNS)}) AS grouping_id,
+            {", ".join(GROUP_COLUMNS)},
+            count(*) AS price_count,
+            count(DISTINCT provider_id) AS provider_count,
+            count(markup) AS markup_count,
+            median(medicare_rate) AS medicare_rate,
+            median(gross_charge) AS gross_charge_median,
+            avg(cash_price) AS cash_price_mean,
+            median(negotiated_median) AS negotiated_median,
+            avg(markup) AS markup_mean,
+            median(markup) AS markup_median,
+            quantile_cont(markup, [{quantiles}]) AS markup_quantiles,
+            median(cash_price / nullif(medicare_rate, 0)) AS cash_markup_median,
+            median(negotiated_median / nullif(medicare_rate, 0)) AS negotiated_markup_median,
+            {", ".join(severity_counts + bucket_counts)}
+        FROM priced
+        GROUP BY GROUPING SETS ({", ".join("(" + ", ".join(columns) + ")" for columns in grouping_sets)})
+    """
+    
+    start = time.perf_counter()
+    df = con.execute(query).df()
+    logger.info(f"✓ Aggregated {len(df):,} mart rows in one pass ({time.perf_counter() - start:.1f}s)")
+    
+    # Expand the quantile list into one column per percentile (NULL, which
+    # pandas reads as NA, for a group without any markup)
+    quantile_values = df.pop("markup_quantiles")
+    for i, q in enumerate(MARKUP_PERCENTILES):
+        df.insert(
+            df.columns.get_loc("markup_median") + 1 + i,
+            f"markup_p{round(q * 100)}",
+            [values[i] if values is not None and values is not pd.NA else None for values in quantile_values]
+        )
+    
+    df["severity"] = df["markup_median"].map(severity)
+    
+    return df
+
+
+def split_marts(
+    aggregates: pd.DataFrame,
+    dim_service: pd.DataFrame,
+    dim_provider: pd.DataFrame,
+    benchmarks: pd.DataFrame
+) -> Dict[str, pd.DataFrame]:
+    """
+    Split the aggregate rows into one table per mart, with dimension labels
+    
+    Args:
+        aggregates: Output of aggregate_markups
+        dim_service: Service dimension
+        dim_provider: Provider dimension
+        benchmarks: Medicare rates from select_benchmarks, for the benchmark source and year
+    
+    Returns:
+        Dict of mart name -> DataFrame
+    """
+    metrics = [col for col in aggregates.columns if col not in GROUP_COLUMNS + ["grouping_id"]]
+    marts = {}
+    
+    for mart_name, grouping_sets in MARTS.items():
+        keys = [col for col in GROUP_COLUMNS if any(col in columns for columns in grouping_sets)]
+        ids = [_grouping_id(columns) for columns in grouping_sets]
+        df = aggregates[aggregates["grouping_id"].isin(ids)][keys + metrics].copy()
+        
+        if "state" in keys:
+            df["state"] = df["state"].fillna(MARTS_NATIONAL)
+        
+        if "service_id" in keys:
+            df["service_id"] = df["service_id"].astype(int)
+            labels = dim_service[["service_id", "cpt_hcpcs", "description"]]
+            df = labels.merge(df, on="service_id", how="right")
+            sources = benchmarks[["service_id", "benchmark_source", "benchmark_year"]].drop_duplicates("service_id")
+            df = df.merge(sources, on="service_id", how="left")
+        
+        if "provider_id" in keys:
+            df["provider_id"] = df["provider_id"].astype(int)
+            df = dim_provider[["provider_id", "hospital_name"]].merge(df, on="provider_id", how="right")
+            # What DAX Allowed_Estimate and Variance_Pct used to compute on every refresh
+            df["allowed_estimate"] = df["negotiated_median"].fillna(df["medicare_rate"])
+            df["cash_variance_pct"] = (df["cash_price_mean"] - df["medicare_rate"]) / df["medicare_rate"]
+        
+        sort = [col for col in ["service_id", "category", "provider_id", "state"] if col in df.columns]
+        marts[mart_name] = df.sort_values(sort, kind="stable", ignore_index=True)
+        
+        logger.info(f"✓ Created {mart_name} with {len(df)} rows")
+    
+    return marts
+
+
+def negotiated_rate_percentiles(
+    dim_service: pd.DataFrame,
+    dim_provider: pd.DataFrame,
+    sketch_file: Path = RATE_SKETCHES_FILE
+) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Negotiated-rate percentiles per provider, state and nation, from the rate sketches
+    
+    02_process_mrf.py stores a quantile sketch of the payer rates of each
+    code and hospital (CCN and name). The sketches are merged up to each level and the
+    MARKUP_PERCENTILES are read from the merged sketch, so no raw rate is
+    rescanned and each percentile is within the sketch accuracy (relative)
+    of the exact value.
+    
+    Args:
+        dim_service: Service dimension
+        dim_provider: Provider dimension
+        sketch_file: Sketches written by 02_process_mrf.py
+    
+    Returns:
+        Dict with "provider_service" (service_id, provider_id) and
+        "service_state" (service_id, state, national rows included)
+        percentiles, or None if there are no sketches
+    """
+    if not sketch_file.exists():
+        logger.warning(f"⚠️  No negotiated-rate sketches found ({sketch_file.name}), skipping rate percentiles")
+        return None
+    
+    table = pq.read_table(sketch_file)
+    accuracy = float(table.schema.metadata[ACCURACY_KEY])
+    
+    # Sketches are resolved to providers as fact_prices rows are: by CCN, else by hospital name
+    ccns = table["ccn"].to_pandas() if "ccn" in table.column_names else None
+    provider_id = resolve_providers(ccns, table["hospital_name"].to_pandas(), build_provider_index(dim_provider))
+    keys = pd.DataFrame({
+        "service_id": table["code"].to_pandas().map(dim_service.set_index("cpt_hcpcs")["service_id"]),
+        "provider_id": provider_id,
+        "state": provider_id.map(dim_provider.set_index("provider_id")["state"])
+    })
+    mapped = keys["service_id"].notna() & keys["provider_id"].notna()
+    sketches = table["negotiated_sketch"].filter(mapped.to_numpy())
+    keys = keys[mapped].astype({"service_id": int, "provider_id": int}).reset_index(drop=True)
+    
+    def percentiles(columns: List[str]) -> pd.DataFrame:
+        grouped = keys.groupby(columns, sort=True)
+        df = grouped.size().reset_index()[columns]
+        merged = merge_sketches(sketches, grouped.ngroup().to_numpy(), len(df))
+        df["payer_rate_count"] = sketch_counts(merged)
+        values = sketch_quantiles(merged, MARKUP_PERCENTILES, accuracy)
+        for i, q in enumerate(MARKUP_PERCENTILES):
+            df[f"negotiated_p{round(q * 100)}"] = values[:, i]
+        return df
+    
+    national = percentiles(["service_id"])
+    national["state"] = MARTS_NATIONAL
+    
+    result = {
+        "provider_service": percentiles(["service_id", "provider_id"]),
+        "service_state": pd.concat([percentiles(["service_id", "state"]), national], ignore_index=True)
+    }
+    logger.info(f"✓ Merged {len(table):,} negotiated-rate sketches (accuracy ±{accuracy:.0%})")
+    
+    return result
+
+
+def add_rate_percentiles(marts: Dict[str, pd.DataFrame], rate_percentiles: Dict[str, pd.DataFrame]):
+    """
+    Join negotiated-rate percentiles onto the service and provider-service marts
+    
+    Args:
+        marts: Dict of mart name -> DataFrame, updated in place
+        rate_percentiles: Output of negotiated_rate_percentiles
+    """
+    for mart_name, level, keys in [
+        ("mart_service_markup", "service_state", ["service_id", "state"]),
+        ("mart_provider_service", "provider_service", ["service_id", "provider_id"])
+    ]:
+        marts[mart_name] = marts[mart_name].merge(rate_percentiles[level], on=keys, how="left")
+
+
+def save_marts(marts: Dict[str, pd.DataFrame]):
+    """
+    Save the marts as Parquet files in MARTS_DIR
+    
+    Args:
+        marts: Dict of mart name -> DataFrame
+    """
+    MARTS_DIR.mkdir(parents=True, exist_ok=True)
+    
+    for mart_name, df in marts.items():
+        output_file = MARTS_DIR / f"{mart_name}.parquet"
+        temp_file = output_file.with_suffix(".parquet.tmp")
+        df.to_parquet(temp_file, index=False)
+        temp_file.replace(output_file)
+        logger.info(f"✓ Saved {mart_name}: {len(df)} rows, {output_file.stat().st_size / 1024:.2f} KB")
+    
+    logger.info(f"\n✓ All marts saved to: {MARTS_DIR}")
+
+
+def _number(value, digits: int = 1) -> Optional[float]:
+    """Round a value for JSON, with None for missing values"""
+    if value is None or (isinstance(value, float) and math.isnan(value)) or pd.isna(value):
+        return None
+    return round(float(value), digits)
+
+
+def export_website_marts(marts: Dict[str, pd.DataFrame], output_file: Path):
+    """
+    Write the mart figures the website shows as JSON
+    
+    Replaces the hand-typed stateBenchmarks and nationalPercentiles in
+    website/data.js: the site loads this file at startup and keeps the
+    embedded values only when it is missing. Services and categories
+    without a markup in a state are left out of its byCpt and byCategory.
+    
+    Args:
+        marts: Dict of mart name -> DataFrame
+        output_file: JSON file to write
+    """
+    services = marts["mart_service_markup"]
+    categories = marts["mart_category_markup"]
+    states = marts["mart_state_markup"].set_index("state")
+    
+    national = states.loc[MARTS_NATIONAL] if MARTS_NATIONAL in states.index else None
+    national_categories = categories[categories["state"] == MARTS_NATIONAL].set_index("category")
+    
+    state_benchmarks = {}
+    for state in states.index.drop(MARTS_NATIONAL, errors="ignore"):
+        state_services = services[services["state"] == state]
+        state_categories = categories[categories["state"] == state].set_index("category")
+        
+        state_benchmarks[state] = {
+            "state": state,
+            "avgMultiplier": _number(states.loc[state, "markup_mean"]),
+            "byCpt": {
+                row.cpt_hcpcs: _number(row.markup_mean)
+                for row in state_services.itertuples() if _number(row.markup_mean) is not None
+            },
+            "byCategory": {
+                category: {
+                    "stateAvg": _number(row["markup_mean"]),
+                    "nationalMedian": _number(national_categories["markup_median"].get(category)),
+                    "percentile75": _number(national_categories.get("markup_p75", pd.Series(dtype=float)).get(category))
+                }
+                for category, row in state_categories.iterrows() if _number(row["markup_mean"]) is not None
+            }
+        }
+    
+    extract = {
+        "generatedAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "severityThresholds": MARKUP_SEVERITY_THRESHOLDS,
+        "markupBucketEdges": MARKUP_BUCKET_EDGES,
+        "nationalPercentiles": {
+            f"p{round(q * 100)}": _number(national[f"markup_p{round(q * 100)}"]) if national is not None else None
+            for q in MARKUP_PERCENTILES
+        },
+        "stateBenchmarks": state_benchmarks
+    }
+    
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    output_file.write_text(json.dumps(extract, indent=2))
+    logger.info(f"✓ Website extract saved to: {output_file}")
+
+
+def print_summary(marts: Dict[str, pd.DataFrame]):
+    """Print national markup statistics"""
+    logger.info("\n" + "=" * 60)
+    logger.info("ANALYTICS MARTS SUMMARY")
+    logger.info("=" * 60)
+    
+    print(f"\n📊 Mart Sizes:")
+    for mart_name, df in marts.items():
+        print(f"  {mart_name + ':':<24}{len(df):,} rows")
+    
+    categories = marts["mart_category_markup"]
+    national = categories[categories["state"] == MARTS_NATIONAL]
+    if not national.empty:
+        print(f"\n📈 National Markup by Category:")
+        columns = ["category", "price_count", "markup_median"] + [f"markup_p{round(q * 100)}" for q in MARKUP_PERCENTILES]
+        print(national[[col for col in columns if col in national.columns]].round(2).to_string(index=False))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Build analytics marts from the star schema")
+    parser.add_argument(
+        "--website-file", type=Path, default=WEBSITE_MARTS_FILE,
+        help="JSON extract of the marts loaded by the website"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Main orchestrator
+    
+    Returns:
+        Exit status: 0, or 1 if the star schema has not been built
+    """
+    args = parse_args(argv)
+    
+    logger.info("🚀 Starting analytics marts build...\n")
+    
+    logger.info("=" * 60)
+    logger.info("BUILDING ANALYTICS MARTS")
+    logger.info("=" * 60)
+    
+    tables = {
+        table_name: _star_table(table_name)
+        for table_name in ["dim_service", "dim_provider", "fact_prices", "fact_benchmarks"]
+    }
+    missing = [table_name for table_name, path in tables.items() if path is None]
+    if missing:
+        logger.error(f"✗ Star schema table(s) not found: {', '.join(missing)}")
+        logger.info("Please run 04_build_star_schema.py first")
+        return 1
+    
+    con = connect_duckdb()
+    dim_service = con.execute(f"SELECT * FROM {parquet_source(tables['dim_service'])}").df()
+    dim_provider = con.execute(f"SELECT * FROM {parquet_source(tables['dim_provider'])}").df()
+    fact_benchmarks = con.execute(f"SELECT * FROM {parquet_source(tables['fact_benchmarks'])}").df()
+    
+    benchmarks = select_benchmarks(fact_benchmarks, sorted(dim_provider["state"].dropna().unique()))
+    aggregates = aggregate_markups(con, tables["fact_prices"], dim_service, dim_provider, benchmarks)
+    marts = split_marts(aggregates, dim_service, dim_provider, benchmarks)
+    
+    rate_percentiles = negotiated_rate_percentiles(dim_service, dim_provider)
+    if rate_percentiles is not None:
+        add_rate_percentiles(marts, rate_percentiles)
+    
+    save_marts(marts)
+    export_website_marts(marts, args.website_file)
+    
+    print_summary(marts)
+    
+    logger.info("\n✅ Analytics marts build complete!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Benchmark Store
+Medicare benchmarks kept as a Parquet dataset partitioned by source and year
+(source=<source>/year=<year>/part-0.parquet), so new fee-schedule years are
+appended next to earlier ones and readers load only the slices they need
+"""
+
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from config import BENCHMARK_STORE_DIR, BENCHMARK_ROW_GROUP_ROWS
+
+logger = logging.getLogger(__name__)
+
+PARTITION_FILE = "part-0.parquet"
+
+# Partition columns, encoded in the directory names rather than the files
+PARTITIONING = ds.partitioning(
+    pa.schema([("source", pa.string()), ("year", pa.int64())]),
+    flavor="hive"
+)
+
+# Arrow types of the benchmark columns stored in each partition file
+BENCHMARK_TYPES = {
+    "code": pa.string(),
+    "description": pa.string(),
+    "medicare_rate": pa.float64(),
+    "state": pa.string(),
+    "locality": pa.string(),
+    "locality_name": pa.string()
+}
+
+# Schema metadata key marking partitions built from sample data
+SAMPLE_KEY = b"benchmark_sample"
+
+
+def partition_path(source: str, year: int, root: Path = BENCHMARK_STORE_DIR) -> Path:
+    """
+    Directory of one (source, year) partition
+    
+    Args:
+        source: Benchmark source (OPPS, PFS, CLFS)
+        year: Fee schedule year
+        root: Store directory
+    
+    Returns:
+        Partition directory
+    """
+    return root / f"source={source}" / f"year={int(year)}"
+
+
+def _partition_files(root: Path) -> List[Tuple[str, int, Path]]:
+    """(source, year, file) of every stored partition, from the directory names alone"""
+    partitions = []
+    for file_path in root.glob(f"source=*/year=*/{PARTITION_FILE}"):
+        year_dir = file_path.parent
+        source = year_dir.parent.name.split("=", 1)[1]
+        partitions.append((source, int(year_dir.name.split("=", 1)[1]), file_path))
+    
+    return sorted(partitions)
+
+
+def list_partitions(root: Path = BENCHMARK_STORE_DIR) -> List[Dict]:
+    """
+    Partitions present in the store
+    
+    Only the partition file footers are read.
+    
+    Args:
+        root: Store directory
+    
+    Returns:
+        List of dicts with source, year, rows, sample and path, sorted by source and year
+    """
+    partitions = []
+    for source, year, file_path in _partition_files(root):
+        metadata = pq.read_metadata(file_path)
+        schema_metadata = metadata.schema.to_arrow_schema().metadata or {}
+        
+        partitions.append({
+            "source": source,
+            "year": year,
+            "rows": metadata.num_rows,
+            "sample": schema_metadata.get(SAMPLE_KEY) == b"true",
+            "path": file_path
+        })
+    
+    return partitions
+
+
+def _partition_table(df: pd.DataFrame, sample: bool) -> pa.Table:
+    """Arrow table of one partition's rows, sorted by code, without the partition columns"""
+    columns = [col for col in BENCHMARK_TYPES if col in df.columns]
+    table = pa.Table.from_pandas(
+        df[columns].sort_values("code", kind="stable"),
+        schema=pa.schema([(col, BENCHMARK_TYPES[col]) for col in columns]),
+        preserve_index=False
+    )
+    return table.replace_schema_metadata({SAMPLE_KEY: b"true" if sample else b"false"})
+
+
+def write_benchmarks(df: pd.DataFrame, replace: bool = False, root: Path = BENCHMARK_STORE_DIR) -> Dict[str, int]:
+    """
+    Append benchmarks to the store, one partition per (source, year)
+    
+    A new (source, year) is added next to the stored ones, which are left
+    as they are. A stored (source, year) is compared with the incoming rows:
+    identical content is skipped, and different content (e.g. a corrected
+    release for the same year) replaces the partition with a warning, so
+    newer data is never dropped. replace rewrites partitions even when
+    unchanged. Partitions built from sample data (rows with is_sample set)
+    are removed once their source has real data for any year, and sample
+    rows are never written for a source that already has real data, nor
+    over a real partition. Each partition is written to a temporary file
+    and renamed into place.
+    
+    Args:
+        df: Benchmarks with source and year columns
+        replace: Rewrite partitions that are already stored, even if unchanged
+        root: Store directory
+    
+    Returns:
+        Dict with the number of partitions written and skipped
+    """
+    existing = {(p["source"], p["year"]): p for p in list_partitions(root)}
+    real_sources = {source for (source, _), p in existing.items() if not p["sample"]}
+    
+    if "is_sample" in df.columns:
+        is_sample = df["is_sample"].fillna(False).astype(bool)
+    else:
+        is_sample = pd.Series(False, index=df.index)
+    
+    missing_year = df["year"].isna()
+    if missing_year.any():
+        logger.warning(f"⚠️  Skipping {missing_year.sum()} benchmarks without a year")
+    
+    counts = {"written": 0, "skipped": 0}
+    written_real = set()
+    
+    for (source, year), group in df[~missing_year].groupby(["source", "year"], sort=True):
+        year = int(year)
+        sample = bool(is_sample.loc[group.index].all())
+        stored = existing.get((source, year))
+        
+        if sample and source in real_sources:
+            logger.info(f"  Skipping sample {source} {year}: store already holds real {source} data")
+            counts["skipped"] += 1
+            continue
+        
+        if stored is not None and sample and not stored["sample"]:
+            logger.info(f"  Skipping sample {source} {year}: store already holds real {source} {year} data")
+            counts["skipped"] += 1
+            continue
+        
+        table = _partition_table(group, sample)
+        
+        if stored is not None and not replace and stored["sample"] == sample:
+            if pq.read_table(stored["path"]).equals(table):
+                logger.info(f"  {source} {year} already ingested ({stored['rows']:,} rows), unchanged")
+                counts["skipped"] += 1
+                continue
+            logger.warning(
+                f"⚠️  {source} {year} differs from the stored partition "
+                f"({stored['rows']:,} -> {len(group):,} rows), replacing it"
+            )
+        
+        target_dir = partition_path(source, year, root)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target_file = target_dir / PARTITION_FILE
+        temp_file = target_dir / (PARTITION_FILE + ".tmp")
+        
+        pq.write_table(
+            table,
+            temp_file,
+            row_group_size=BENCHMARK_ROW_GROUP_ROWS,
+            compression="zstd",
+            write_statistics=True
+        )
+        temp_file.replace(target_file)
+        
+        action = "Replaced" if stored is not None else "Added"
+        logger.info(f"  ✓ {action} {source} {year}: {len(group):,} rows{' (sample)' if sample else ''}")
+        counts["written"] += 1
+        
+        if not sample:
+            real_sources.add(source)
+            written_real.add((source, year))
+    
+    # Sample partitions of a source go once it has real data for any year
+    for (source, year), stored in existing.items():
+        if stored["sample"] and source in real_sources and (source, year) not in written_real:
+            shutil.rmtree(stored["path"].parent)
+            logger.info(f"  Removed sample {source} {year}")
+    
+    return counts
+
+
+def read_benchmarks(
+    sources: Optional[Iterable[str]] = None,
+    years: Optional[Iterable[int]] = None,
+    codes: Optional[Iterable[str]] = None,
+    columns: Optional[List[str]] = None,
+    root: Path = BENCHMARK_STORE_DIR
+) -> pd.DataFrame:
+    """
+    Load benchmarks for the requested sources, years and codes
+    
+    Partitions outside the requested sources and years are never opened.
+    Within the remaining files the code filter is checked against each
+    row group's min/max statistics, so only row groups that can hold a
+    requested code are read. Partitions that lack a column (e.g. locality
+    outside PFS) return nulls for it; requested columns that no selected
+    partition has are left out.
+    
+    Args:
+        sources: Sources to load (None loads all)
+        years: Years to load (None loads all)
+        codes: CPT/HCPCS codes to load (None loads all)
+        columns: Columns to return (None returns all)
+        root: Store directory
+    
+    Returns:
+        DataFrame of benchmarks with source and year columns, empty if nothing matches
+    """
+    sources = set(sources) if sources is not None else None
+    years = {int(year) for year in years} if years is not None else None
+    
+    files = [
+        str(file_path) for source, year, file_path in _partition_files(root)
+        if (sources is None or source in sources) and (years is None or year in years)
+    ]
+    
+    if not files:
+        return pd.DataFrame(columns=columns or [])
+    
+    file_schema = pa.unify_schemas([pq.read_schema(path).remove_metadata() for path in files])
+    dataset = ds.dataset(
+        files,
+        schema=pa.unify_schemas([file_schema, PARTITIONING.schema]),
+        format="parquet",
+        partitioning=PARTITIONING,
+        partition_base_dir=str(root)
+    )
+    
+    if columns is not None:
+        columns = [col for col in columns if col in dataset.schema.names]
+    
+    row_filter = ds.field("code").isin(sorted(set(codes))) if codes is not None else None
+    
+    return dataset.to_table(columns=columns, filter=row_filter).to_pandas()
@@ -35,55 +35,96 @@ DATA_SOURCES = {
     }
 }
 
-# Hospital-specific MRF URLs (to be updated with actual Inova URLs)
+# Hospital-specific MRF URLs (to be updated with actual Inova URLs). The ccn is used for
+# files whose metadata carries none; location details live in PROVIDER_REGISTRY_FILE.
 HOSPITAL_MRF_URLS = {
     "inova_alexandria": {
         "url": "https://www.inova.org/price-transparency",  # Actual file obtained
         "hospital_name": "Inova Alexandria Hospital",
-        "ccn": "490089",  # CMS Certification Number for Alexandria
-        "city": "Alexandria",
-        "state": "VA"
+        "ccn": "490089"  # CMS Certification Number for Alexandria
     },
     "inova_fairfax": {
         "url": "https://www.inova.org/price-transparency",  # Placeholder - need actual MRF URL
         "hospital_name": "Inova Fairfax Hospital",
-        "ccn": "490007",  # CMS Certification Number
-        "city": "Falls Church",
-        "state": "VA"
+        "ccn": "490007"  # CMS Certification Number
     }
 }
 
-# Top 20 Common ER Services (CPT/HCPCS codes)
-TOP_ER_SERVICES = [
-    # ER Visit Levels
-    {"code": "99281", "description": "ER visit, minimal complexity", "category": "facility"},
-    {"code": "99282", "description": "ER visit, low complexity", "category": "facility"},
-    {"code": "99283", "description": "ER visit, moderate complexity", "category": "facility"},
-    {"code": "99284", "description": "ER visit, high complexity", "category": "facility"},
-    {"code": "99285", "description": "ER visit, very high complexity", "category": "facility"},
-    
-    # Imaging - CT
-    {"code": "70450", "description": "CT head/brain without contrast", "category": "imaging"},
-    {"code": "70486", "description": "CT face without contrast", "category": "imaging"},
-    {"code": "71045", "description": "Chest X-ray, single view", "category": "imaging"},
-    {"code": "71046", "description": "Chest X-ray, 2 views", "category": "imaging"},
-    {"code": "73610", "description": "Ankle X-ray, 3+ views", "category": "imaging"},
-    
-    # Lab Tests
-    {"code": "85025", "description": "Complete Blood Count (CBC) with differential", "category": "lab"},
-    {"code": "80053", "description": "Comprehensive Metabolic Panel (CMP)", "category": "lab"},
-    {"code": "81001", "description": "Urinalysis, automated", "category": "lab"},
-    {"code": "82947", "description": "Glucose, blood quantitative", "category": "lab"},
-    {"code": "85610", "description": "Prothrombin time (PT)", "category": "lab"},
-    
-    # Procedures
-    {"code": "12001", "description": "Simple repair, superficial wound", "category": "procedure"},
-    {"code": "29125", "description": "Application of short arm splint", "category": "procedure"},
-    {"code": "36415", "description": "Routine venipuncture", "category": "procedure"},
-    {"code": "96372", "description": "Injection, subcutaneous/intramuscular", "category": "procedure"},
-    {"code": "94640", "description": "Nebulizer treatment", "category": "procedure"},
+# Provider registry: hospitals keyed by CMS Certification Number (provider_id, ccn, hospital_name,
+# city, state, zip_code, latitude, longitude). 03_process_benchmarks.py --import-providers appends
+# every hospital in the CMS Outpatient file.
+PROVIDER_REGISTRY_FILE = REFERENCE_DIR / "providers.csv"
+
+# Downloads
+DOWNLOAD_CONCURRENCY = 4  # Files fetched at the same time
+DOWNLOAD_RETRIES = 5  # Attempts per file after the first, each resuming the .part file
+DOWNLOAD_BACKOFF = 2.0  # Seconds before the first retry, doubled on each further retry
+DOWNLOAD_RETRY_STATUS = {408, 429, 500, 502, 503, 504}  # HTTP statuses worth retrying
+DOWNLOAD_TIMEOUT = (10, 60)  # (connect, read) timeout in seconds
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024  # Bytes written per streamed chunk
+DOWNLOAD_MANIFEST = RAW_DATA_DIR / "download_manifest.json"  # ETag/Last-Modified/checksum per downloaded file
+MRF_ARCHIVE_DIR = RAW_DATA_DIR / "archive"  # Compressed copies of streamed MRFs (--stream --archive)
+
+# CMS fee schedules
+CMS_CHUNK_ROWS = 500_000  # Rows per streamed chunk of the CMS Outpatient file
+PFS_CONVERSION_FACTOR = 33.8872  # CY2023 PFS conversion factor, used if the RVU file has none
+
+# Star schema
+STAR_SCHEMA_DIR = PROCESSED_DATA_DIR / "star_schema"
+STAR_SCHEMA_ENGINE = "pandas"  # "pandas" (in memory) or "duckdb" (SQL joins over Parquet, spills to disk)
+DUCKDB_MEMORY_LIMIT = "2GB"  # DuckDB spills joins and sorts to DUCKDB_TEMP_DIR beyond this
+DUCKDB_TEMP_DIR = PROCESSED_DATA_DIR / "duckdb_tmp"
+DUCKDB_THREADS = None  # None uses every core
+# Fact table -> column it is partitioned by (<table>/<column>=<value>/part-0.parquet), None for a
+# single <table>.parquet. fact_prices can also be partitioned by a dim_provider column such as "state".
+STAR_SCHEMA_PARTITIONS = {
+    "fact_prices": "provider_id",
+    "fact_benchmarks": "source"
+}
+STAR_SCHEMA_SORT_COLUMNS = ["service_id", "provider_id"]  # Fact row order, so row-group statistics prune filters
+STAR_SCHEMA_ROW_GROUP_ROWS = 100_000  # Rows per Parquet row group
+STAR_SCHEMA_COMPRESSION = "zstd"
+STAR_SCHEMA_DICTIONARY_COLUMNS = [  # Low-cardinality columns to dictionary-encode
+    "service_id", "provider_id", "source", "year", "state", "locality",
+    "category", "modality", "city"
 ]
 
+# Analytics marts (05_build_marts.py)
+MARTS_DIR = PROCESSED_DATA_DIR / "marts"
+MARKUP_SEVERITY_THRESHOLDS = {  # Lowest markup (gross charge ÷ Medicare rate) of each severity; below is "fair"
+    "critical": 15,
+    "high": 8,
+    "moderate": 4
+}
+MARKUP_BUCKET_EDGES = [3, 5, 10, 15]  # Markup distribution buckets: 1-3x, 3-5x, 5-10x, 10-15x, 15x+
+MARKUP_PERCENTILES = [0.25, 0.5, 0.75, 0.9, 0.95]  # Percentiles of markup and negotiated rate kept in the marts
+MARTS_NATIONAL = "US"  # State value of the rows aggregated over every state
+WEBSITE_MARTS_FILE = PROJECT_ROOT / "website" / "marts.json"  # Mart extract the website loads at startup
+
+# Benchmark store
+BENCHMARK_SOURCES = ["OPPS", "PFS", "CLFS"]  # Medicare fee schedules benchmarks come from
+BENCHMARK_STORE_DIR = BENCHMARKS_DIR / "store"  # Parquet dataset partitioned source=<source>/year=<year>
+BENCHMARK_ROW_GROUP_ROWS = 50_000  # Rows per row group; partitions are sorted by code for pruning
+
+# Service catalog: CPT/HCPCS codes the pipeline prices (service_id, code, code_type, description,
+# category, core). Ships with the 20 core ER services; 03_process_benchmarks.py --extend-catalog
+# appends every code in the Medicare fee schedules.
+SERVICE_CATALOG_FILE = REFERENCE_DIR / "service_catalog.csv"
+
+# MRF processing
+MRF_CHUNK_ROWS = 200_000  # Rows per streamed chunk (0 = read whole file)
+MRF_WORKERS = 1  # Parallel parse processes (one file per worker)
+MRF_SPLIT_BYTES = 512 * 1024 * 1024  # CSVs this large are split across all workers
+CSV_ENGINE = "pandas"  # CSV reader for MRF and CMS files: "pandas" or "arrow"
+JSON_READ_SIZE = 1 << 20  # Characters per block when streaming JSON MRFs
+MRF_LAYOUT_CACHE = PROCESSED_DATA_DIR / "mrf_layouts.json"  # Resolved column layouts per file
+MRF_MANIFEST = PROCESSED_DATA_DIR / "mrf_manifest.json"  # Fingerprints of processed raw files
+MRF_CACHE_DIR = PROCESSED_DATA_DIR / "mrf_cache"  # Filtered output per raw file
+MRF_COLUMNAR_DIR = PROCESSED_DATA_DIR / "mrf_columnar"  # Full Parquet copy per raw file, sorted by code
+MRF_COLUMNAR_ROW_GROUP_ROWS = 64_000  # Rows per row group in the columnar copies
+RATE_SKETCH_ACCURACY = 0.01  # Relative error of negotiated-rate percentiles read from the quantile sketches
+RATE_SKETCHES_FILE = PROCESSED_DATA_DIR / "rate_sketches.parquet"  # Negotiated-rate sketch per (code, hospital)
+
 # State filter (expand as needed)
 TARGET_STATES = ["VA", "MD", "DC"]
 
@@ -93,6 +134,11 @@ DATA_QUALITY_THRESHOLDS = {
     "max_null_percentage": 0.1,    # Max 10% null values in key fields
     "min_benchmark_coverage": 0.9  # At least 90% of services should have Medicare benchmarks
 }
+DATA_QUALITY_BATCH_ROWS = 1_000_000  # Rows per batch when scanning a table for quality checks
+DATA_QUALITY_REPORT_DIR = PROCESSED_DATA_DIR / "quality"  # JSON quality report per stage
+
+# Pipeline runner (scripts/run_pipeline.py)
+PIPELINE_STATE_FILE = PROCESSED_DATA_DIR / "pipeline_state.json"  # Input/code hash of each stage's last successful run
 
 # Patient responsibility scenario defaults
 DEFAULT_SCENARIOS = {
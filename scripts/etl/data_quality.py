@@ -0,0 +1,322 @@
+"""
+Data Quality Checks
+Declarative table rules evaluated in a single streaming pass per table, with a
+machine-readable report and failure when an error-level rule is breached
+
+Rules are dicts with a "check" name, the column it applies to and, where
+needed, a threshold or referenced table:
+
+    {"check": "not_null", "column": "service_id"}
+    {"check": "unique", "column": "service_id"}
+    {"check": "positive", "column": "medicare_rate"}
+    {"check": "accepted_values", "column": "source", "values": ["OPPS", "PFS", "CLFS"]}
+    {"check": "references", "column": "service_id", "table": "dim_service", "key": "service_id"}
+    {"check": "max_null_fraction", "column": "gross_charge", "threshold": 0.1}
+    {"check": "min_coverage", "column": "service_id", "table": "dim_service", "key": "service_id", "threshold": 0.9}
+
+min_coverage is the share of the referenced table's keys that appear in the
+column. Every rule is an error unless it sets "severity": "warn". An empty
+table is evaluated like any other: it covers none of the referenced keys and
+its columns count as entirely null, so thresholds fail rather than pass.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple, Union
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from config import DATA_QUALITY_BATCH_ROWS
+
+logger = logging.getLogger(__name__)
+
+CHECKS = {
+    "not_null", "unique", "positive", "accepted_values", "references",
+    "max_null_fraction", "min_coverage"
+}
+
+# Checks that need the key set of another table
+REFERENCE_CHECKS = {"references", "min_coverage"}
+
+Table = Union[pd.DataFrame, Path]
+
+
+class DataQualityError(Exception):
+    """Raised when a data quality rule with error severity fails"""
+
+
+def _iter_batches(table: Table, columns: List[str]) -> Iterator[pa.RecordBatch]:
+    """Record batches of the given columns from a DataFrame or a Parquet file/directory"""
+    if isinstance(table, pd.DataFrame):
+        arrow_table = pa.Table.from_pandas(table[columns], preserve_index=False)
+        yield from arrow_table.to_batches(max_chunksize=DATA_QUALITY_BATCH_ROWS)
+    else:
+        dataset = ds.dataset(table, format="parquet")
+        # Little read-ahead, so memory stays near one batch however large the table
+        yield from dataset.to_batches(
+            columns=columns, batch_size=DATA_QUALITY_BATCH_ROWS, batch_readahead=1, fragment_readahead=1
+        )
+
+
+def _column_names(table: Table) -> List[str]:
+    """Column names of a DataFrame or Parquet file/directory"""
+    if isinstance(table, pd.DataFrame):
+        return list(table.columns)
+    return ds.dataset(table, format="parquet").schema.names
+
+
+def _is_empty(table: Table) -> bool:
+    """Whether a table has no rows, without scanning it"""
+    if isinstance(table, pd.DataFrame):
+        return table.empty
+    return ds.dataset(table, format="parquet").count_rows() == 0
+
+
+def _scan_order(tables: Dict[str, Table], rules: Dict[str, List[Dict]]) -> List[str]:
+    """Tables in an order where every referenced table is scanned before the tables referring to it"""
+    order = []
+    
+    def visit(name: str, path: Tuple[str, ...]):
+        if name in order:
+            return
+        if name in path:
+            raise ValueError(f"Circular table references: {' -> '.join(path + (name,))}")
+        for rule in rules.get(name, []):
+            if rule["check"] in REFERENCE_CHECKS:
+                visit(rule["table"], path + (name,))
+        order.append(name)
+    
+    for name in tables:
+        visit(name, ())
+    
+    return order
+
+
+def _missing(column: pa.Array) -> int:
+    """Nulls in a column, counting NaN in float columns as missing (as pandas does)"""
+    missing = column.null_count
+    if pa.types.is_floating(column.type):
+        missing += pc.sum(pc.is_nan(column)).as_py() or 0
+    return missing
+
+
+def _update(rule: Dict, state: Dict, column: pa.Array, keys: Dict[Tuple[str, str], pa.Array]):
+    """Fold one batch of a column into a rule's running state"""
+    check = rule["check"]
+    valid = len(column) - column.null_count
+    
+    if check in ("not_null", "max_null_fraction"):
+        state["failing"] += _missing(column)
+    elif check == "positive":
+        state["failing"] += pc.sum(pc.less_equal(column, 0)).as_py() or 0
+    elif check in ("accepted_values", "references"):
+        if check == "accepted_values":
+            allowed = pa.array(rule["values"]).cast(column.type)
+        else:
+            allowed = keys[(rule["table"], rule["key"])].cast(column.type)
+        state["failing"] += valid - (pc.sum(pc.is_in(column, value_set=allowed)).as_py() or 0)
+    elif check == "unique":
+        counts = pc.value_counts(column.drop_null())
+        for value, count in zip(counts.field("values").to_pylist(), counts.field("counts").to_pylist()):
+            state["failing"] += count if value in state["seen"] else count - 1
+            state["seen"].add(value)
+    elif check == "min_coverage":
+        allowed = keys[(rule["table"], rule["key"])].cast(column.type)
+        present = pc.unique(column.drop_null())
+        state["seen"].update(present.filter(pc.is_in(present, value_set=allowed)).to_pylist())
+
+
+def _result(table_name: str, rule: Dict, state: Dict, rows: int, keys: Dict[Tuple[str, str], pa.Array]) -> Dict:
+    """Report entry for a rule once its table has been scanned"""
+    check = rule["check"]
+    result = {"table_name": table_name, **rule}
+    result["severity"] = rule.get("severity", "error")
+    
+    if check == "max_null_fraction":
+        # No rows means no values at all, as bad as all of them null
+        observed = state["failing"] / rows if rows else 1.0
+        passed = observed <= rule["threshold"]
+        result.update({"observed": round(observed, 6), "failing_rows": state["failing"]})
+    elif check == "min_coverage":
+        total = len(keys[(rule["table"], rule["key"])])
+        observed = len(state["seen"]) / total if total else 1.0
+        passed = observed >= rule["threshold"]
+        result.update({"observed": round(observed, 6), "covered": len(state["seen"]), "total": total})
+    else:
+        passed = state["failing"] == 0
+        result["failing_rows"] = state["failing"]
+    
+    result["status"] = "pass" if passed else ("fail" if result["severity"] == "error" else "warn")
+    return result
+
+
+def _describe(result: Dict) -> str:
+    """One-line description of a check result"""
+    check = result["check"]
+    if check == "empty":
+        return f"{result['table_name']}: {result['reason']}"
+    
+    target = f"{result['table_name']}.{result['column']}"
+    
+    if check == "min_coverage":
+        return (
+            f"{target} covers {result['observed']:.1%} of {result['table']}.{result['key']} "
+            f"({result['covered']}/{result['total']}, min {result['threshold']:.0%})"
+        )
+    if check == "max_null_fraction":
+        return f"{target} is {result['observed']:.1%} null (max {result['threshold']:.0%})"
+    if check == "references":
+        return f"{target}: {result['failing_rows']} value(s) missing from {result['table']}.{result['key']}"
+    return f"{target} {check}: {result['failing_rows']} failing row(s)"
+
+
+def check_tables(tables: Dict[str, Table], rules: Dict[str, List[Dict]]) -> Dict:
+    """
+    Evaluate data quality rules against a set of tables
+    
+    All rules of a table are folded batch by batch over a single scan that
+    reads only the columns they use, so a table stored as Parquet is never
+    loaded whole. The key sets of referenced tables are collected during
+    their own scan, which is ordered first. Memory is bounded by one batch
+    plus the key sets, and for unique checks the distinct values seen. An
+    empty table is not scanned, but its rules are still evaluated (with zero
+    coverage and every value missing), so a build that lost its data fails
+    its thresholds.
+    
+    Args:
+        tables: Table name -> DataFrame, or Parquet file/directory path
+        rules: Table name -> list of rule dicts
+    
+    Returns:
+        Report dict with the row count and check results of every table
+    """
+    for table_name, table_rules in rules.items():
+        for rule in table_rules:
+            if rule["check"] not in CHECKS:
+                raise ValueError(f"Unknown data quality check {rule['check']!r} for {table_name}")
+            if rule["check"] in REFERENCE_CHECKS and rule["table"] not in tables:
+                raise ValueError(f"{table_name} rule references unknown table {rule['table']!r}")
+    
+    # Key columns other tables reference, collected while scanning the referenced table
+    wanted_keys: Dict[str, Set[str]] = {}
+    for table_rules in rules.values():
+        for rule in table_rules:
+            if rule["check"] in REFERENCE_CHECKS:
+                wanted_keys.setdefault(rule["table"], set()).add(rule["key"])
+    
+    keys: Dict[Tuple[str, str], pa.Array] = {}
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tables": {}
+    }
+    
+    for table_name in _scan_order(tables, rules):
+        table = tables[table_name]
+        table_rules = rules.get(table_name, [])
+        key_columns = sorted(wanted_keys.get(table_name, set()))
+        
+        if not table_rules and not key_columns:
+            continue
+        
+        if _is_empty(table):
+            for key in key_columns:
+                keys[(table_name, key)] = pa.array([])
+            empty = {
+                "table_name": table_name, "check": "empty", "status": "warn",
+                "severity": "warn", "reason": "table is empty"
+            }
+            results = [
+                _result(table_name, rule, {"failing": 0, "seen": set()}, 0, keys)
+                for rule in table_rules
+            ]
+            report["tables"][table_name] = {"rows": 0, "checks": [empty] + results}
+            continue
+        
+        columns = sorted({rule["column"] for rule in table_rules} | set(key_columns))
+        missing = sorted(set(columns) - set(_column_names(table)))
+        if missing:
+            raise ValueError(f"{table_name} has no column(s) {', '.join(missing)} needed by its rules")
+        states = [{"failing": 0, "seen": set()} for _ in table_rules]
+        key_values = {key: set() for key in key_columns}
+        rows = 0
+        
+        for batch in _iter_batches(table, columns):
+            rows += batch.num_rows
+            for rule, state in zip(table_rules, states):
+                _update(rule, state, batch.column(rule["column"]), keys)
+            for key in key_columns:
+                key_values[key].update(pc.unique(batch.column(key).drop_null()).to_pylist())
+        
+        for key, values in key_values.items():
+            keys[(table_name, key)] = pa.array(sorted(values))
+        
+        results = [_result(table_name, rule, state, rows, keys) for rule, state in zip(table_rules, states)]
+        
+        report["tables"][table_name] = {"rows": rows, "checks": results}
+    
+    report["passed"] = not failures(report)
+    
+    return report
+
+
+def failures(report: Dict) -> List[Dict]:
+    """
+    Failed error-severity checks in a report
+    
+    Args:
+        report: Report from check_tables
+    
+    Returns:
+        List of check results
+    """
+    return [
+        result for table in report["tables"].values()
+        for result in table["checks"] if result["status"] == "fail"
+    ]
+
+
+def log_report(report: Dict):
+    """
+    Log every check result
+    
+    Args:
+        report: Report from check_tables
+    """
+    symbols = {"pass": "✓", "warn": "⚠️ ", "fail": "✗"}
+    levels = {"pass": logging.INFO, "warn": logging.WARNING, "fail": logging.ERROR}
+    
+    for table in report["tables"].values():
+        for result in table["checks"]:
+            logger.log(levels[result["status"]], f"{symbols[result['status']]} {_describe(result)}")
+
+
+def write_report(report: Dict, report_file: Path):
+    """
+    Save a report as JSON
+    
+    Args:
+        report: Report from check_tables
+        report_file: Output path
+    """
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    report_file.write_text(json.dumps(report, indent=2, default=str))
+    logger.info(f"✓ Data quality report saved to: {report_file}")
+
+
+def enforce(report: Dict):
+    """
+    Fail when any error-severity check failed
+    
+    Args:
+        report: Report from check_tables
+    
+    Raises:
+        DataQualityError: Listing the failed checks
+    """
+    failed = failures(report)
+    if failed:
+        details = "; ".join(_describe(result) for result in failed)
+        raise DataQualityError(f"{len(failed)} data quality check(s) failed: {details}")
@@ -0,0 +1,59 @@
+"""
+DuckDB Session
+In-memory DuckDB connections that spill to disk, shared by the stages that
+run SQL over the Parquet outputs
+"""
+
+from pathlib import Path
+from typing import Union
+import duckdb
+from config import DUCKDB_MEMORY_LIMIT, DUCKDB_TEMP_DIR, DUCKDB_THREADS
+
+
+def connect_duckdb() -> duckdb.DuckDBPyConnection:
+    """
+    Open an in-memory DuckDB database that spills to disk
+    
+    Returns:
+        Connection limited to DUCKDB_MEMORY_LIMIT, spilling to DUCKDB_TEMP_DIR
+    """
+    DUCKDB_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    
+    con = duckdb.connect()
+    con.execute(f"SET memory_limit = {sql_string(DUCKDB_MEMORY_LIMIT)}")
+    con.execute(f"SET temp_directory = {sql_string(DUCKDB_TEMP_DIR)}")
+    if DUCKDB_THREADS:
+        con.execute(f"SET threads = {int(DUCKDB_THREADS)}")
+    
+    return con
+
+
+def sql_string(value) -> str:
+    """
+    Quote a value (e.g. a path) as a SQL string literal
+    
+    Args:
+        value: Value to quote, converted with str()
+    
+    Returns:
+        Single-quoted literal
+    """
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def parquet_source(table: Union[Path, str]) -> str:
+    """
+    read_parquet() call over a Parquet file, or every Parquet file under a folder
+    
+    Partition folders are not parsed as columns: the star schema's partition
+    files hold their partition column themselves.
+    
+    Args:
+        table: Parquet file or folder
+    
+    Returns:
+        SQL table expression
+    """
+    path = Path(table)
+    files = path / "**" / "*.parquet" if path.is_dir() else path
+    return f"read_parquet({sql_string(files)}, hive_partitioning = false)"
@@ -0,0 +1,78 @@
+"""
+File Fingerprints
+Content fingerprints used to detect new or changed input files
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+# Bytes read per step while hashing
+HASH_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def fast_hash(file_path: Path) -> str:
+    """
+    Hash a file's full content with BLAKE2b
+    
+    Args:
+        file_path: File to hash
+    
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK_BYTES)
+            if not block:
+                break
+            digest.update(block)
+    
+    return digest.hexdigest()
+
+
+def file_fingerprint(file_path: Path, previous: Optional[Dict] = None) -> Dict:
+    """
+    Fingerprint a file by size, modification time and content hash
+    
+    When size and mtime match the previous fingerprint the stored hash is
+    reused, so unchanged files are never read. Otherwise the file is hashed.
+    
+    Args:
+        file_path: File to fingerprint
+        previous: Stored fingerprint for the same file, if any
+    
+    Returns:
+        Dict with size, mtime and hash
+    """
+    stat = file_path.stat()
+    
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+        file_hash = previous["hash"]
+    else:
+        file_hash = fast_hash(file_path)
+    
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "hash": file_hash
+    }
+
+
+def same_content(previous: Dict, current: Dict) -> bool:
+    """
+    Whether two fingerprints describe the same file content
+    
+    A changed mtime alone (e.g. an identical file re-downloaded) does not
+    count as a change; size and hash must both match.
+    
+    Args:
+        previous: Stored fingerprint
+        current: Fresh fingerprint
+    
+    Returns:
+        True if the content is unchanged
+    """
+    return previous.get("size") == current["size"] and previous.get("hash") == current["hash"]
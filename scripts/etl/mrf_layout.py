@@ -0,0 +1,369 @@
+"""
+MRF Layout Inference
+Resolves which CSV columns hold codes, charges and payer rates from an MRF's
+metadata and header rows, and caches the mapping per hospital file
+"""
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+from config import HOSPITAL_MRF_URLS, MRF_LAYOUT_CACHE
+
+logger = logging.getLogger(__name__)
+
+# Rows before the column header row
+METADATA_ROWS = 3
+
+# Metadata labels that may carry the hospital's CMS Certification Number
+CCN_LABELS = ["ccn", "cms_certification_number", "medicare_provider_number", "provider_ccn"]
+
+# Legacy Inova layout: payer rates every 3rd column from here, up to this column
+LEGACY_RATE_START = 12
+LEGACY_RATE_STOP = 100
+
+
+def read_preamble(file_path: Path, rows: int = METADATA_ROWS + 1) -> List[List[str]]:
+    """
+    Read the metadata rows and the column header row of a CSV MRF
+    
+    Args:
+        file_path: Path to CSV MRF
+        rows: Number of leading rows to read
+    
+    Returns:
+        List of rows, each a list of cell strings
+    """
+    preamble = []
+    with open(file_path, "r", encoding="latin-1", newline="") as f:
+        for row in csv.reader(f):
+            preamble.append(row)
+            if len(preamble) == rows:
+                break
+    return preamble
+
+
+def read_preamble_stream(stream: BinaryIO, rows: int = METADATA_ROWS + 1) -> List[List[str]]:
+    """
+    Read the metadata rows and the column header row from a binary stream
+    
+    Consumes exactly those rows, leaving the stream at the first data row.
+    A quoted cell may span several lines.
+    
+    Args:
+        stream: Binary stream positioned at the start of a CSV MRF
+        rows: Number of leading rows to read
+    
+    Returns:
+        List of rows, each a list of cell strings
+    """
+    preamble = []
+    pending = b""
+    
+    while len(preamble) < rows:
+        line = stream.readline()
+        if not line:
+            break
+        
+        pending += line
+        # An odd number of quotes means the row continues on the next line
+        if pending.count(b'"') % 2:
+            continue
+        
+        parsed = list(csv.reader(io.StringIO(pending.decode("latin-1"), newline="")))
+        preamble.append(parsed[0] if parsed else [])
+        pending = b""
+    
+    return preamble
+
+
+def hospital_key(file_path: Path) -> str:
+    """
+    Hospital key from an MRF filename (e.g. inova_alexandria_mrf.csv -> inova_alexandria)
+    
+    Args:
+        file_path: Path to MRF
+    
+    Returns:
+        Hospital key
+    """
+    return re.sub(r"_mrf$", "", file_path.stem)
+
+
+def default_hospital_name(file_path: Path) -> str:
+    """
+    Hospital name to use when the file metadata does not carry one
+    
+    Args:
+        file_path: Path to MRF
+    
+    Returns:
+        Name from HOSPITAL_MRF_URLS, or the hospital key
+    """
+    key = hospital_key(file_path)
+    return HOSPITAL_MRF_URLS.get(key, {}).get("hospital_name", key)
+
+
+def default_ccn(file_path: Path) -> Optional[str]:
+    """
+    CCN to use when the file metadata does not carry one
+    
+    Args:
+        file_path: Path to MRF
+    
+    Returns:
+        CCN from HOSPITAL_MRF_URLS, or None
+    """
+    return HOSPITAL_MRF_URLS.get(hospital_key(file_path), {}).get("ccn") or None
+
+
+def metadata_ccn(preamble: List[List[str]]) -> Optional[str]:
+    """
+    Hospital CCN from the metadata rows, under any of CCN_LABELS
+    
+    Args:
+        preamble: Rows from read_preamble
+    
+    Returns:
+        The CCN as written, or None if the metadata has none
+    """
+    for label in CCN_LABELS:
+        value = metadata_value(preamble, label)
+        if value:
+            return value
+    return None
+
+
+def metadata_value(preamble: List[List[str]], label: str) -> Optional[str]:
+    """
+    Look up a labelled value in the metadata rows
+    
+    Metadata is laid out as a row of labels followed by a row of values,
+    so the value sits directly below its label.
+    
+    Args:
+        preamble: Rows from read_preamble
+        label: Label to find (case and space/underscore insensitive)
+    
+    Returns:
+        The value, or None if the label is not present
+    """
+    wanted = _normalize_name(label)
+    metadata = preamble[:METADATA_ROWS]
+    
+    for row_idx, row in enumerate(metadata[:-1]):
+        for col_idx, cell in enumerate(row):
+            if _normalize_name(cell) == wanted:
+                below = metadata[row_idx + 1]
+                if col_idx < len(below) and below[col_idx].strip():
+                    return below[col_idx].strip()
+    
+    return None
+
+
+def _normalize_name(name: str) -> str:
+    """Lower-case a header cell and collapse spaces/underscores"""
+    return re.sub(r"[\s_]+", "_", name.strip().lower())
+
+
+def unique_column_names(header: List[str]) -> List[str]:
+    """
+    Make header cells usable as DataFrame column names
+    
+    Blank cells become "Unnamed: <i>" and repeats get a ".<n>" suffix,
+    matching what pandas does when it reads the header itself.
+    
+    Args:
+        header: Raw header row
+    
+    Returns:
+        List of unique column names
+    """
+    names = []
+    seen: Dict[str, int] = {}
+    for idx, cell in enumerate(header):
+        name = cell.strip() or f"Unnamed: {idx}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def infer_layout(preamble: List[List[str]], file_path: Path) -> Dict:
+    """
+    Resolve the columns needed for charge extraction from the header row
+    
+    CMS-template headers are matched by name (description, code|N with
+    code|N|type, standard_charge|gross, standard_charge|discounted_cash and
+    every ...|negotiated_dollar payer/plan column). Headers that are not
+    recognised fall back to the legacy positional Inova layout.
+    
+    Args:
+        preamble: Metadata rows plus the header row
+        file_path: Path to the MRF (for the hospital name fallback)
+    
+    Returns:
+        Layout dict with column names for each field
+    """
+    columns = unique_column_names(preamble[METADATA_ROWS] if len(preamble) > METADATA_ROWS else [])
+    normalized = [_normalize_name(name) for name in columns]
+    
+    layout = {
+        "columns": columns,
+        "hospital_name": metadata_value(preamble, "hospital_name") or default_hospital_name(file_path),
+        "ccn": metadata_ccn(preamble) or default_ccn(file_path),
+        "description": None,
+        "revenue_code": None,
+        "codes": [],
+        "gross_charge": None,
+        "cash_price": None,
+        "rates": [],
+        "source": "header"
+    }
+    
+    def find(*candidates: str) -> Optional[str]:
+        for candidate in candidates:
+            if candidate in normalized:
+                return columns[normalized.index(candidate)]
+        return None
+    
+    layout["description"] = find("description")
+    layout["gross_charge"] = find("standard_charge|gross", "gross_charge")
+    layout["cash_price"] = find("standard_charge|discounted_cash", "discounted_cash", "cash_price")
+    
+    # code|1, code|1|type, code|2, ... ; codes typed RC are revenue codes
+    for name, norm in zip(columns, normalized):
+        match = re.fullmatch(r"code\|(\d+)", norm)
+        if match:
+            layout["codes"].append([name, find(f"code|{match.group(1)}|type")])
+    
+    if not layout["codes"] and find("code"):
+        layout["codes"].append([find("code"), find("code_type", "type")])
+        layout["revenue_code"] = find("revenue_code", "rev_code")
+    
+    layout["rates"] = [
+        name for name, norm in zip(columns, normalized)
+        if norm.endswith("negotiated_dollar")
+    ]
+    
+    has_prices = layout["gross_charge"] or layout["cash_price"] or layout["rates"]
+    if layout["description"] and layout["codes"] and has_prices:
+        return layout
+    
+    # Legacy positional layout
+    def at(position: int) -> Optional[str]:
+        return columns[position] if position < len(columns) else None
+    
+    layout.update({
+        "description": at(0),
+        "revenue_code": at(1),
+        "codes": [[at(3), at(4)]] if len(columns) >= 5 else [],
+        "gross_charge": at(9),
+        "cash_price": at(11),
+        "rates": [columns[i] for i in range(LEGACY_RATE_START, min(len(columns), LEGACY_RATE_STOP), 3)],
+        "source": "positional"
+    })
+    
+    return layout
+
+
+def layout_usecols(layout: Dict) -> List[str]:
+    """
+    Columns that must be read for a layout, in file order
+    
+    Args:
+        layout: Layout dict
+    
+    Returns:
+        List of column names
+    """
+    needed = {layout["description"], layout["revenue_code"], layout["gross_charge"], layout["cash_price"]}
+    needed.update(name for pair in layout["codes"] for name in pair)
+    needed.update(layout["rates"])
+    
+    return [name for name in layout["columns"] if name in needed]
+
+
+def layout_text_columns(layout: Dict) -> List[str]:
+    """
+    Identifier columns that must be read as text
+    
+    Args:
+        layout: Layout dict
+    
+    Returns:
+        List of column names
+    """
+    text = [layout["description"], layout["revenue_code"]]
+    text.extend(name for pair in layout["codes"] for name in pair)
+    
+    return [name for name in text if name]
+
+
+def _write_cache(cache: Dict):
+    """Replace the layout cache in one step, so parallel workers never read a half-written file"""
+    MRF_LAYOUT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=MRF_LAYOUT_CACHE.parent, prefix=MRF_LAYOUT_CACHE.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(temp_name, MRF_LAYOUT_CACHE)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+def get_mrf_layout(file_path: Path, preamble: Optional[List[List[str]]] = None) -> Dict:
+    """
+    Get the column layout for an MRF, using the cache when the header is unchanged
+    
+    Layouts are cached in MRF_LAYOUT_CACHE keyed by hospital key and a
+    fingerprint of the metadata and header rows, so a shifted layout or a
+    new file version is always re-inferred.
+    
+    Args:
+        file_path: Path to CSV MRF
+        preamble: Metadata and header rows, if already read
+    
+    Returns:
+        Layout dict
+    """
+    if preamble is None:
+        preamble = read_preamble(file_path)
+    
+    fingerprint = hashlib.sha256(json.dumps(preamble).encode("utf-8")).hexdigest()[:16]
+    cache_key = f"{hospital_key(file_path)}:{fingerprint}"
+    
+    cache = {}
+    if MRF_LAYOUT_CACHE.exists():
+        try:
+            cache = json.loads(MRF_LAYOUT_CACHE.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable layout cache: {e}")
+    
+    if cache_key in cache:
+        return cache[cache_key]
+    
+    layout = infer_layout(preamble, file_path)
+    
+    if layout["source"] == "positional":
+        logger.warning(f"⚠️  Unrecognized header in {file_path.name}, using positional Inova layout")
+    else:
+        logger.info(
+            f"Resolved layout for {file_path.name}: {len(layout['codes'])} code column(s), "
+            f"{len(layout['rates'])} payer rate column(s)"
+        )
+    
+    cache[cache_key] = layout
+    _write_cache(cache)
+    
+    return layout
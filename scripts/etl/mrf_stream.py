@@ -0,0 +1,333 @@
+"""
+MRF Streaming
+Opens a hospital MRF over HTTP as a decompressed byte stream, so it can be
+parsed while it downloads instead of landing the raw file on disk first
+"""
+
+import gzip
+import io
+import logging
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+import requests
+import urllib3
+from config import (
+    DOWNLOAD_RETRIES, DOWNLOAD_BACKOFF, DOWNLOAD_TIMEOUT, DOWNLOAD_CHUNK_BYTES,
+    DOWNLOAD_RETRY_STATUS
+)
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZIP_MAGIC = b"PK\x03\x04"
+
+# Fixed part of a zip local file header (signature through extra field length)
+ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def is_placeholder_url(url: str) -> bool:
+    """
+    Whether a configured MRF URL is a landing page rather than the file itself
+    
+    Args:
+        url: URL from HOSPITAL_MRF_URLS
+    
+    Returns:
+        True if the URL still needs to be replaced with the real MRF link
+    """
+    return "placeholder" in url.lower() or "price-transparency" in url
+
+
+class HTTPStream(io.RawIOBase):
+    """
+    Readable HTTP response body that survives dropped connections
+    
+    When the connection fails mid-body the remainder is requested again
+    with a Range request (guarded by If-Range), so the reader sees one
+    uninterrupted stream.
+    """
+    
+    def __init__(
+        self,
+        url: str,
+        session: Optional[requests.Session] = None,
+        retries: int = DOWNLOAD_RETRIES,
+        backoff: float = DOWNLOAD_BACKOFF
+    ):
+        self.url = url
+        self.session = session or requests.Session()
+        self.retries = retries
+        self.backoff = backoff
+        self.offset = 0
+        self.length = None
+        self.validator = None
+        self._response = None
+        self._with_retries(self._open)
+    
+    def _open(self):
+        """Request the body from the current offset"""
+        headers = {"Accept-Encoding": "identity"}
+        if self.offset:
+            headers["Range"] = f"bytes={self.offset}-"
+            if self.validator:
+                headers["If-Range"] = self.validator
+        
+        response = self.session.get(self.url, stream=True, timeout=DOWNLOAD_TIMEOUT, headers=headers)
+        response.raise_for_status()
+        
+        if self.offset and response.status_code != 206:
+            response.close()
+            raise ValueError(f"{self.url} changed or does not support resuming at byte {self.offset}")
+        
+        if not self.offset:
+            length = response.headers.get("content-length")
+            self.length = int(length) if length is not None else None
+            self.validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        
+        self._response = response
+    
+    def _with_retries(self, action):
+        """Run action, reopening the connection with backoff on retryable errors"""
+        for attempt in range(self.retries + 1):
+            try:
+                return action()
+            except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+                if isinstance(e, requests.exceptions.HTTPError) and e.response is not None:
+                    if e.response.status_code not in DOWNLOAD_RETRY_STATUS:
+                        raise
+                if attempt == self.retries:
+                    raise
+                
+                delay = self.backoff * 2 ** attempt
+                logger.warning(
+                    f"⚠️  {self.url}: {e} - resuming at byte {self.offset} in {delay:.1f}s "
+                    f"({attempt + 1}/{self.retries})"
+                )
+                time.sleep(delay)
+                
+                # The next attempt reopens from the current offset
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        def read() -> int:
+            if self._response is None:
+                self._open()
+            size = self._response.raw.readinto(buffer)
+            if size == 0 and self.length is not None and self.offset < self.length:
+                raise urllib3.exceptions.ProtocolError(
+                    f"connection closed after {self.offset} of {self.length} bytes"
+                )
+            self.offset += size
+            return size
+        
+        return self._with_retries(read)
+    
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+        super().close()
+
+
+class _TeeStream(io.RawIOBase):
+    """Readable stream that copies every byte read into a sink (if set)"""
+    
+    def __init__(self, source: BinaryIO, sink: Optional[BinaryIO] = None):
+        self.source = source
+        self.sink = sink
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        size = self.source.readinto(buffer)
+        if size and self.sink is not None:
+            self.sink.write(memoryview(buffer)[:size])
+        return size
+
+
+class _DecompressedStream(io.RawIOBase):
+    """
+    Readable stream of decompressed gzip or zip data
+    
+    gzip input may hold several members, which are read back to back. For
+    zip input only the first member is read, straight from its local file
+    header, so the central directory at the end of the archive is never
+    needed.
+    """
+    
+    def __init__(self, source: BinaryIO, compression: str):
+        self.source = source
+        self.compression = compression
+        self._decompressor = None
+        self._input = b""
+        self._stored_remaining = None
+        self._done = False
+        
+        if compression == "zip":
+            self._read_zip_header()
+    
+    def _read_exact(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            block = self.source.read(size - len(data))
+            if not block:
+                raise EOFError("zip archive ended inside a file header")
+            data += block
+        return data
+    
+    def _read_zip_header(self):
+        """Position the stream at the first member's data"""
+        fields = ZIP_LOCAL_HEADER.unpack(self._read_exact(ZIP_LOCAL_HEADER.size))
+        _, _, flags, method, _, _, _, compressed_size, _, name_length, extra_length = fields
+        name = self._read_exact(name_length).decode("utf-8", errors="replace")
+        self._read_exact(extra_length)
+        
+        logger.info(f"Streaming {name} from zip archive")
+        
+        if method == 8:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        elif method == 0 and not flags & 0x08:
+            self._stored_remaining = compressed_size
+        else:
+            raise ValueError(f"Unsupported zip member {name} (method {method}) for streaming")
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        if self._stored_remaining is not None:
+            view = memoryview(buffer)[:self._stored_remaining]
+            size = self.source.readinto(view) if len(view) else 0
+            self._stored_remaining -= size
+            return size
+        
+        while not self._done:
+            if not self._input:
+                self._input = self.source.read(DOWNLOAD_CHUNK_BYTES)
+                if not self._input:
+                    if self._decompressor is not None:
+                        raise EOFError(f"{self.compression} stream ended before the end of its data")
+                    self._done = True
+                    break
+            
+            if self._decompressor is None:
+                # Next gzip member
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            
+            data = self._decompressor.decompress(self._input, len(buffer))
+            self._input = self._decompressor.unconsumed_tail
+            
+            if self._decompressor.eof:
+                self._input = self._decompressor.unused_data
+                self._decompressor = None
+                if self.compression == "zip":
+                    self._done = True
+            
+            if data:
+                buffer[:len(data)] = data
+                return len(data)
+        
+        return 0
+
+
+def detect_compression(stream: io.BufferedReader) -> Optional[str]:
+    """
+    Detect gzip or zip input from its magic bytes
+    
+    Args:
+        stream: Buffered stream positioned at the start of the body
+    
+    Returns:
+        "gzip", "zip" or None for uncompressed input
+    """
+    head = stream.peek(4)[:4]
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(ZIP_MAGIC):
+        return "zip"
+    return None
+
+
+def detect_format(stream: io.BufferedReader) -> str:
+    """
+    Tell a JSON MRF from a CSV MRF by its first non-blank character
+    
+    Args:
+        stream: Buffered stream of decompressed MRF bytes
+    
+    Returns:
+        "json" or "csv"
+    """
+    head = stream.peek(1024).lstrip(b"\xef\xbb\xbf \t\r\n")
+    return "json" if head[:1] in (b"{", b"[") else "csv"
+
+
+@contextmanager
+def open_mrf_stream(url: str, archive: Optional[Path] = None) -> Iterator[Tuple[BinaryIO, str]]:
+    """
+    Open a remote MRF as a stream of decompressed bytes
+    
+    gzip and zip bodies are detected from their magic bytes and
+    decompressed on the fly. With archive set, the body is also copied to
+    a compressed file while it is read: gzip/zip bodies are stored as
+    received, anything else is gzip-compressed. The archive is completed
+    (including any bytes the parser did not need) when the stream closes
+    without error, and removed otherwise.
+    
+    Args:
+        url: MRF URL
+        archive: Archive path without compression suffix, or None
+    
+    Yields:
+        Tuple of (buffered decompressed stream, "csv" or "json")
+    """
+    http = HTTPStream(url)
+    # Until the archive format is known, teed bytes are held in memory
+    tee = _TeeStream(http, io.BytesIO() if archive is not None else None)
+    raw = io.BufferedReader(tee, buffer_size=DOWNLOAD_CHUNK_BYTES)
+    compression = detect_compression(raw)
+    
+    sink = None
+    archive_file = None
+    temp_file = None
+    if archive is not None:
+        suffix = ".zip" if compression == "zip" else ".gz"
+        archive_file = archive.with_name(archive.name + suffix)
+        temp_file = archive_file.with_name(archive_file.name + ".part")
+        archive_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        sink = open(temp_file, "wb") if compression else gzip.open(temp_file, "wb", compresslevel=6)
+        sink.write(tee.sink.getvalue())
+        tee.sink = sink
+    
+    if compression:
+        stream = io.BufferedReader(_DecompressedStream(raw, compression), buffer_size=DOWNLOAD_CHUNK_BYTES)
+    else:
+        stream = raw
+    
+    try:
+        yield stream, detect_format(stream)
+        
+        if sink is not None:
+            # Copy whatever the parser left unread so the archive is complete
+            while raw.read(DOWNLOAD_CHUNK_BYTES):
+                pass
+            sink.close()
+            temp_file.replace(archive_file)
+            logger.info(f"✓ Archived {url} to {archive_file.name}")
+    finally:
+        if sink is not None and not sink.closed:
+            sink.close()
+        if temp_file is not None:
+            temp_file.unlink(missing_ok=True)
+        http.close()
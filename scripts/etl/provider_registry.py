@@ -0,0 +1,220 @@
+"""
+Provider Registry
+The hospitals the pipeline can price (PROVIDER_REGISTRY_FILE), keyed by CMS
+Certification Number, and the lookup that resolves MRF rows to providers
+
+Every MRF row carries the CCN detected for its file (from the file's
+metadata, else its HOSPITAL_MRF_URLS entry) and the hospital name.
+resolve_providers matches the CCN against the registry with an Arrow hash
+lookup and falls back to the hospital name only for rows without a CCN.
+Only the distinct (ccn, hospital_name) pairs are resolved, so the cost stays
+one pass over the rows however many hospitals the registry holds.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from config import PROVIDER_REGISTRY_FILE
+
+# CCN: two-digit state code, then a facility type character and three digits
+CCN_PATTERN = r"^\d{2}[0-9A-Z]\d{3}$"
+
+REGISTRY_COLUMNS = [
+    "provider_id", "ccn", "hospital_name", "city", "state", "zip_code", "latitude", "longitude"
+]
+
+REGISTRY_TEXT_COLUMNS = ["city", "state", "zip_code"]
+
+
+def normalize_ccns(values: pd.Series) -> pd.Series:
+    """
+    Normalize CMS Certification Numbers
+    
+    Whitespace and case are ignored, and all-digit CCNs that lost their
+    leading zero (e.g. to a spreadsheet) are padded back to six characters.
+    
+    Args:
+        values: Raw CCNs
+    
+    Returns:
+        Series of six-character CCNs, null where a value is not a CCN
+    """
+    ccns = values.astype("string").str.strip().str.upper()
+    ccns = ccns.mask(ccns.str.fullmatch(r"\d{5}").fillna(False), "0" + ccns)
+    
+    return ccns.where(ccns.str.fullmatch(CCN_PATTERN).fillna(False))
+
+
+def normalize_names(values: pd.Series) -> pd.Series:
+    """
+    Hospital names reduced for matching: lower case, punctuation and repeated spaces dropped
+    
+    Args:
+        values: Hospital names
+    
+    Returns:
+        Series of match keys
+    """
+    names = values.astype("string").fillna("").str.lower()
+    return names.str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+
+
+def load_registry(registry_file: Path = PROVIDER_REGISTRY_FILE) -> pd.DataFrame:
+    """
+    Read the provider registry
+    
+    Args:
+        registry_file: Registry CSV with provider_id, ccn and hospital_name
+            columns (city, state, zip_code, latitude and longitude optional)
+    
+    Returns:
+        DataFrame with REGISTRY_COLUMNS, sorted by provider_id
+    
+    Raises:
+        ValueError: If a CCN is invalid, or a CCN or provider_id repeats
+    """
+    df = pd.read_csv(registry_file, dtype=str, keep_default_na=False)
+    
+    missing = [col for col in ["provider_id", "ccn", "hospital_name"] if col not in df.columns]
+    if missing:
+        raise ValueError(f"{registry_file.name} has no column(s) {', '.join(missing)}")
+    
+    ccns = normalize_ccns(df["ccn"])
+    invalid = df.loc[ccns.isna(), "ccn"]
+    if not invalid.empty:
+        raise ValueError(f"{registry_file.name}: not CCNs: {', '.join(invalid.head(10))}")
+    
+    df["ccn"] = ccns.astype(str)
+    df["provider_id"] = df["provider_id"].astype(int)
+    df["hospital_name"] = df["hospital_name"].str.strip()
+    
+    for col in ["ccn", "provider_id"]:
+        repeated = df.loc[df[col].duplicated(), col]
+        if not repeated.empty:
+            raise ValueError(f"{registry_file.name}: repeated {col} {', '.join(map(str, repeated.head(10)))}")
+    
+    for col in REGISTRY_TEXT_COLUMNS:
+        df[col] = df[col].str.strip() if col in df.columns else ""
+    for col in ["latitude", "longitude"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+    
+    return df[REGISTRY_COLUMNS].sort_values("provider_id", ignore_index=True)
+
+
+def build_provider_index(registry: pd.DataFrame) -> Dict:
+    """
+    Lookup index from CCN (and, for rows without one, hospital name) to provider
+    
+    Names shared by several registry hospitals are left out of the name
+    index, so an ambiguous name never picks one of them.
+    
+    Args:
+        registry: Registry from load_registry (or dim_provider)
+    
+    Returns:
+        Dict with the Arrow arrays of CCNs and names and the provider_id of each
+    """
+    names = normalize_names(registry["hospital_name"])
+    unique = ~names.duplicated(keep=False) & (names != "")
+    
+    return {
+        "ccns": pa.array(registry["ccn"].astype(str).tolist(), pa.string()),
+        "provider_id": registry["provider_id"].to_numpy(dtype=np.int64),
+        "names": pa.array(names[unique].tolist(), pa.string()),
+        "name_provider_id": registry.loc[unique, "provider_id"].to_numpy(dtype=np.int64)
+    }
+
+
+def _lookup(keys: pd.Series, value_set: pa.Array, ids: np.ndarray) -> np.ndarray:
+    """provider_id of each key found in value_set, -1 elsewhere"""
+    position = pc.index_in(pa.array(keys, pa.string(), from_pandas=True), value_set=value_set)
+    position = pc.fill_null(position, -1).to_numpy(zero_copy_only=False)
+    return np.where(position >= 0, ids[np.maximum(position, 0)] if len(ids) else -1, -1)
+
+
+def _encode(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Code of each value (0 for nulls) and the values by code (None first)"""
+    array = pa.array(values, pa.string(), from_pandas=True)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    encoded = pc.dictionary_encode(array)
+    codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False).astype(np.int64) + 1
+    return codes, np.concatenate([[None], encoded.dictionary.to_numpy(zero_copy_only=False)])
+
+
+def resolve_providers(ccns: Optional[pd.Series], names: pd.Series, index: Dict) -> pd.Series:
+    """
+    Resolve MRF rows to registry providers
+    
+    A row with a CCN is matched by CCN only; a row without one is matched
+    by hospital name.
+    
+    Args:
+        ccns: CCN of each row (None when the data carries no CCNs)
+        names: Hospital name of each row
+        index: Index from build_provider_index
+    
+    Returns:
+        Nullable Int64 Series of provider_ids (<NA> where unresolved), aligned with names
+    """
+    # Resolve each distinct (ccn, hospital_name) pair once: dictionary-encode
+    # both columns, then number the pairs of their codes
+    ccn_codes, ccn_values = _encode(ccns if ccns is not None else pd.Series(None, index=names.index, dtype=object))
+    name_codes, name_values = _encode(names)
+    width = len(name_values)
+    group, pairs = pd.factorize(ccn_codes * width + name_codes)
+    
+    ccn = normalize_ccns(pd.Series(ccn_values[pairs // width]))
+    by_ccn = _lookup(ccn, index["ccns"], index["provider_id"])
+    by_name = _lookup(normalize_names(pd.Series(name_values[pairs % width])), index["names"], index["name_provider_id"])
+    
+    resolved = np.where(ccn.notna().to_numpy(), by_ccn, by_name)[group]
+    
+    return pd.Series(pd.array(resolved, dtype="Int64"), index=names.index).mask(resolved < 0)
+
+
+def extend_registry(providers: pd.DataFrame, registry_file: Path = PROVIDER_REGISTRY_FILE) -> int:
+    """
+    Append hospitals missing from the registry, e.g. every CMS-certified hospital
+    
+    Existing rows and their provider_ids are kept; new CCNs get the next
+    provider_ids. Rows whose CCN is invalid are skipped.
+    
+    Args:
+        providers: DataFrame with ccn and hospital_name columns (city,
+            state, zip_code, latitude and longitude optional)
+        registry_file: Registry CSV to extend
+    
+    Returns:
+        Number of hospitals added
+    """
+    registry = load_registry(registry_file)
+    
+    new = providers.assign(ccn=normalize_ccns(providers["ccn"])).dropna(subset=["ccn"])
+    new = new[~new["ccn"].isin(registry["ccn"])].drop_duplicates("ccn").sort_values("ccn")
+    
+    if new.empty:
+        return 0
+    
+    added = pd.DataFrame({
+        "provider_id": np.arange(len(new)) + (registry["provider_id"].max() if len(registry) else 0) + 1,
+        "ccn": new["ccn"].to_numpy(),
+        "hospital_name": new["hospital_name"].fillna("").astype(str).str.strip().to_numpy(),
+        **{
+            col: new[col].to_numpy() if col in new.columns else ""
+            for col in REGISTRY_TEXT_COLUMNS
+        },
+        **{
+            col: pd.to_numeric(new[col], errors="coerce").to_numpy() if col in new.columns else np.nan
+            for col in ["latitude", "longitude"]
+        }
+    })
+    
+    temp_file = registry_file.with_suffix(".csv.tmp")
+    pd.concat([registry, added], ignore_index=True).to_csv(temp_file, index=False)
+    temp_file.replace(registry_file)
+    
+    return len(added)
@@ -0,0 +1,283 @@
+"""
+Service Catalog
+The CPT/HCPCS catalog the pipeline prices (SERVICE_CATALOG_FILE), and the
+code normalization applied to MRF codes before they are matched against it
+
+MRFs write the same code many ways: " 99283", "099283", "99283-25",
+"99283 25 59", "j1885". normalize_codes reduces each to the bare code
+(99283, J1885), its modifiers (25, 25-59) and its code type. The pattern
+is only evaluated over the distinct raw values, so normalizing tens of
+millions of rows costs one dictionary-encoding pass plus a take per row.
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from config import SERVICE_CATALOG_FILE
+
+# Version of the normalization below, stored with cached MRF outputs so a change re-parses them
+CODE_FORMAT = "1"
+
+# Bare code (5 digits, 4 digits and a letter for CPT Category II/III and PLA
+# codes, or a letter and 4 digits for HCPCS Level II) after any zero padding,
+# then optional two-character modifiers
+CODE_PATTERN = (
+    r"^0*(?P<code>\d{5}|\d{4}[A-Z]|[A-Z]\d{4})"
+    r"(?:[-\s.:]+(?P<modifier>[A-Z0-9]{2}(?:[-\s,]+[A-Z0-9]{2})*))?$"
+)
+_CODE_REGEX = re.compile(CODE_PATTERN)
+_MODIFIER_SEPARATOR = r"[-\s,]+"
+
+CATALOG_COLUMNS = ["service_id", "code", "code_type", "description", "category", "core"]
+
+# Categories of catalog services; the first four are the core ER categories
+CATALOG_CATEGORIES = [
+    "facility", "imaging", "lab", "procedure", "professional",
+    "evaluation", "anesthesia", "medicine", "drug", "supply", "other"
+]
+
+# (first, last, category) of the numeric CPT ranges
+CPT_RANGES = [
+    (100, 1999, "anesthesia"),
+    (10004, 69990, "procedure"),
+    (70010, 79999, "imaging"),
+    (80047, 89398, "lab"),
+    (90281, 99199, "medicine"),
+    (99202, 99499, "evaluation"),
+    (99500, 99607, "medicine")
+]
+
+# First letter of HCPCS Level II codes -> category
+HCPCS_CATEGORIES = {"J": "drug", "A": "supply", "E": "supply", "K": "supply", "L": "supply"}
+
+RawCodes = Union[pd.Series, pa.Array, pa.ChunkedArray]
+
+
+def normalize_codes(values: RawCodes) -> pd.DataFrame:
+    """
+    Normalize raw CPT/HCPCS codes, vectorized
+    
+    Whitespace and case are ignored. Values that are not a CPT/HCPCS code
+    (revenue codes, chargemaster numbers, blanks) get a null code.
+    
+    Args:
+        values: Raw codes
+    
+    Returns:
+        DataFrame with code, modifier (modifiers joined by "-", null
+        without) and code_type (CPT or HCPCS), one row per value
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    array = values if isinstance(values, (pa.Array, pa.ChunkedArray)) else pa.array(values, from_pandas=True)
+    # Arrow-backed pandas strings come back chunked
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if not pa.types.is_string(array.type):
+        array = pc.cast(array, pa.string())
+    
+    encoded = pc.dictionary_encode(array)
+    parts = pc.extract_regex(pc.utf8_upper(pc.utf8_trim_whitespace(encoded.dictionary)), CODE_PATTERN)
+    
+    # flatten() carries non-matches (null structs) into null fields; an
+    # unmatched optional group inside a match is an empty string
+    code, modifier = parts.flatten()
+    modifier = pc.if_else(pc.equal(modifier, ""), pa.scalar(None, pa.string()), modifier)
+    code_type = pc.if_else(pc.match_substring_regex(code, r"^\d"), "CPT", "HCPCS")
+    
+    columns = {
+        "code": code,
+        "modifier": pc.replace_substring_regex(modifier, _MODIFIER_SEPARATOR, "-"),
+        "code_type": code_type
+    }
+    df = pd.DataFrame({name: pc.take(column, encoded.indices).to_pandas() for name, column in columns.items()})
+    if index is not None:
+        df.index = index
+    return df
+
+
+@lru_cache(maxsize=65536)
+def normalize_code(value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Normalize one raw code, as normalize_codes does
+    
+    Args:
+        value: Raw code
+    
+    Returns:
+        Tuple of (code, modifier), code None if it is not a CPT/HCPCS code
+    """
+    match = _CODE_REGEX.match(str(value or "").strip().upper())
+    if not match:
+        return None, None
+    modifier = match.group("modifier")
+    return match.group("code"), re.sub(_MODIFIER_SEPARATOR, "-", modifier) if modifier else None
+
+
+def code_categories(codes: pd.Series) -> pd.Series:
+    """
+    Default category of normalized codes, from the CPT range or HCPCS letter
+    
+    Args:
+        codes: Normalized codes
+    
+    Returns:
+        Series of CATALOG_CATEGORIES values
+    """
+    codes = codes.astype(str)
+    numeric = pd.to_numeric(codes.where(codes.str.fullmatch(r"\d{5}")), errors="coerce").to_numpy()
+    
+    category = np.full(len(codes), "other", dtype=object)
+    for first, last, name in CPT_RANGES:
+        category[(numeric >= first) & (numeric <= last)] = name
+    letters = codes.str[0].to_numpy()
+    for letter, name in HCPCS_CATEGORIES.items():
+        category[letters == letter] = name
+    
+    return pd.Series(category, index=codes.index)
+
+
+def load_catalog(catalog_file: Path = SERVICE_CATALOG_FILE) -> pd.DataFrame:
+    """
+    Read the service catalog
+    
+    Codes are normalized; code_type, category and core default from the
+    code where the file leaves them blank.
+    
+    Args:
+        catalog_file: Catalog CSV with service_id, code and description columns
+    
+    Returns:
+        DataFrame with CATALOG_COLUMNS, sorted by service_id
+    
+    Raises:
+        ValueError: If a code is not CPT/HCPCS, or a code or service_id repeats
+    """
+    df = pd.read_csv(catalog_file, dtype=str, keep_default_na=False)
+    
+    missing = [col for col in ["service_id", "code", "description"] if col not in df.columns]
+    if missing:
+        raise ValueError(f"{catalog_file.name} has no column(s) {', '.join(missing)}")
+    
+    normalized = normalize_codes(df["code"])
+    invalid = df.loc[normalized["code"].isna(), "code"]
+    if not invalid.empty:
+        raise ValueError(f"{catalog_file.name}: not CPT/HCPCS codes: {', '.join(invalid.head(10))}")
+    
+    df["code"] = normalized["code"]
+    df["service_id"] = df["service_id"].astype(int)
+    
+    for col in ["code", "service_id"]:
+        repeated = df.loc[df[col].duplicated(), col]
+        if not repeated.empty:
+            raise ValueError(f"{catalog_file.name}: repeated {col} {', '.join(map(str, repeated.head(10)))}")
+    
+    for col, default in [("code_type", normalized["code_type"]), ("category", code_categories(df["code"]))]:
+        values = df[col] if col in df.columns else pd.Series("", index=df.index)
+        df[col] = values.where(values != "", default)
+    
+    core = df["core"] if "core" in df.columns else pd.Series("", index=df.index)
+    df["core"] = core.str.strip().str.lower().isin(["true", "1", "yes"])
+    
+    return df[CATALOG_COLUMNS].sort_values("service_id", ignore_index=True)
+
+
+@lru_cache(maxsize=4)
+def _catalog_codes(catalog_file: Path, modified: int) -> FrozenSet[str]:
+    """Codes of a catalog file version (modified is its mtime, to reload after edits)"""
+    return frozenset(load_catalog(catalog_file)["code"])
+
+
+def catalog_codes(catalog_file: Path = SERVICE_CATALOG_FILE) -> FrozenSet[str]:
+    """
+    Normalized codes of the service catalog, read once per file version
+    
+    Args:
+        catalog_file: Catalog CSV
+    
+    Returns:
+        Frozen set of codes
+    """
+    return _catalog_codes(catalog_file, catalog_file.stat().st_mtime_ns)
+
+
+def build_code_index(catalog: pd.DataFrame) -> Dict:
+    """
+    Lookup index from normalized code to service
+    
+    Args:
+        catalog: Catalog from load_catalog (or dim_service, with cpt_hcpcs)
+    
+    Returns:
+        Dict with the Arrow array of codes and the service_id of each
+    """
+    code_column = "code" if "code" in catalog.columns else "cpt_hcpcs"
+    return {
+        "codes": pa.array(catalog[code_column].astype(str).tolist(), pa.string()),
+        "service_id": catalog["service_id"].to_numpy(dtype=np.int64)
+    }
+
+
+def lookup_services(values: RawCodes, index: Dict) -> pd.DataFrame:
+    """
+    Resolve raw codes to catalog services, vectorized
+    
+    Args:
+        values: Raw codes
+        index: Index from build_code_index
+    
+    Returns:
+        DataFrame with service_id (nullable Int64, <NA> outside the
+        catalog), code, modifier and code_type, one row per value
+    """
+    df = normalize_codes(values)
+    
+    # Position of each code in the index, null outside it (and so a null service_id)
+    position = pc.index_in(pa.array(df["code"], pa.string(), from_pandas=True), value_set=index["codes"])
+    service_id = pc.take(pa.array(index["service_id"], pa.int64()), position)
+    df.insert(0, "service_id", service_id.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get).array)
+    
+    return df
+
+
+def extend_catalog(codes: pd.DataFrame, catalog_file: Path = SERVICE_CATALOG_FILE) -> int:
+    """
+    Append codes missing from the catalog, e.g. every fee-schedule code
+    
+    Existing rows and their service_ids are kept; new codes get the next
+    service_ids, their default category and core set to false. Values that
+    are not CPT/HCPCS codes (e.g. APC numbers) are skipped.
+    
+    Args:
+        codes: DataFrame with code and description columns
+        catalog_file: Catalog CSV to extend
+    
+    Returns:
+        Number of codes added
+    """
+    catalog = load_catalog(catalog_file)
+    
+    new = codes.assign(code=normalize_codes(codes["code"])["code"]).dropna(subset=["code"])
+    new = new[~new["code"].isin(catalog["code"])].drop_duplicates("code").sort_values("code")
+    
+    if new.empty:
+        return 0
+    
+    added = pd.DataFrame({
+        "service_id": np.arange(len(new)) + catalog["service_id"].max() + 1,
+        "code": new["code"].to_numpy(),
+        "code_type": normalize_codes(new["code"])["code_type"].to_numpy(),
+        "description": new["description"].fillna("").astype(str).str.strip().to_numpy(),
+        "category": code_categories(new["code"]).to_numpy(),
+        "core": False
+    })
+    
+    temp_file = catalog_file.with_suffix(".csv.tmp")
+    pd.concat([catalog, added], ignore_index=True).to_csv(temp_file, index=False)
+    temp_file.replace(catalog_file)
+    
+    return len(added)
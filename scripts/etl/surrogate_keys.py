@@ -0,0 +1,61 @@
+"""
+Surrogate Keys
+Deterministic fact table keys hashed from natural key columns, computed the
+same way in pandas and in DuckDB SQL so both star schema engines agree
+"""
+
+import hashlib
+from typing import List
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+KEY_SEPARATOR = "|"
+
+
+def surrogate_key(parts: List[pd.Series]) -> pd.Series:
+    """
+    Hash natural key columns into a stable 63-bit integer key
+    
+    The parts are joined as text with KEY_SEPARATOR (nulls as empty
+    strings) and the key is the first 64 bits of the MD5 digest shifted
+    right by one, so it is a positive BIGINT. The same row always gets the
+    same key, whatever else is in the table or which run built it.
+    
+    Args:
+        parts: Natural key columns, aligned on the same index
+    
+    Returns:
+        int64 Series of keys
+    """
+    text = [
+        pc.fill_null(pc.cast(pa.array(part, from_pandas=True), pa.large_string()), "")
+        for part in parts
+    ]
+    joined = pc.binary_join_element_wise(*text, pa.scalar(KEY_SEPARATOR, pa.large_string()))
+    
+    md5 = hashlib.md5
+    keys = np.fromiter(
+        (int.from_bytes(md5(value).digest()[:8], "big") >> 1 for value in joined.cast(pa.large_binary()).to_pylist()),
+        dtype=np.int64,
+        count=len(joined)
+    )
+    
+    return pd.Series(keys, index=parts[0].index)
+
+
+def surrogate_key_sql(parts: List[str]) -> str:
+    """
+    DuckDB expression computing surrogate_key from SQL expressions
+    
+    Args:
+        parts: SQL expressions of the natural key columns
+    
+    Returns:
+        SQL expression of type BIGINT
+    """
+    text = ", ".join(f"coalesce(CAST({part} AS VARCHAR), '')" for part in parts)
+    digest = f"md5(concat_ws('{KEY_SEPARATOR}', {text}))"
+    
+    return f"CAST(CAST('0x' || left({digest}, 16) AS UBIGINT) >> 1 AS BIGINT)"
@@ -1,35 +1,51 @@
 """
 Run complete ETL pipeline
 Orchestrates all data processing steps
+
+The stages form a DAG with declared inputs and outputs, like a Makefile.
+Each stage's key is a hash of its input files, its code (the stage script
+and every local module it imports, config.py included) and its arguments.
+A stage whose key matches the last successful run and whose outputs exist
+is skipped, so re-running an up-to-date pipeline only stats files. Input
+fingerprints reuse the stored hash while size and mtime are unchanged.
+The download stage is opt-in: its sources change without any local input
+changing, so it cannot be skipped by key and would cost a round trip per
+file on every run. It runs only with --download (or when named by --only
+or --from), and then re-requests each file conditionally. A stage whose
+main() raises or returns a non-zero status stops the run, and no key is
+recorded for it, so the next run retries it.
+
+Usage:
+    python scripts/run_pipeline.py                    # run stages that are out of date
+    python scripts/run_pipeline.py --download         # fetch new source files first
+    python scripts/run_pipeline.py --only marts       # rerun just these stages
+    python scripts/run_pipeline.py --from star_schema # rerun a stage and everything downstream
+    python scripts/run_pipeline.py --force            # rerun everything but the download
+    python scripts/run_pipeline.py --stage-args benchmarks="--replace --year 2025"
 """
 
+import argparse
+import ast
+import hashlib
+import importlib.util
+import json
 import logging
+import shlex
 import sys
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Set
 
-# Add scripts directory to path
-sys.path.insert(0, str(Path(__file__).parent))
+# Make the ETL modules (config, fingerprint, ...) importable
+ETL_DIR = Path(__file__).parent / "etl"
+sys.path.insert(0, str(ETL_DIR))
 
-from config import PROJECT_ROOT
-
-# Import ETL modules
-try:
-    from etl import download_data, process_mrf, process_benchmarks, build_star_schema
-except ImportError:
-    # If running as script, import directly
-    import importlib.util
-    
-    def load_module(name, path):
-        spec = importlib.util.spec_from_file_location(name, path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        return module
-    
-    etl_dir = Path(__file__).parent / "etl"
-    download_data = load_module("download_data", etl_dir / "01_download_data.py")
-    process_mrf = load_module("process_mrf", etl_dir / "02_process_mrf.py")
-    process_benchmarks = load_module("process_benchmarks", etl_dir / "03_process_benchmarks.py")
-    build_star_schema = load_module("build_star_schema", etl_dir / "04_build_star_schema.py")
+from config import (
+    PROJECT_ROOT, RAW_DATA_DIR, PROCESSED_DATA_DIR, BENCHMARK_STORE_DIR, STAR_SCHEMA_DIR,
+    MARTS_DIR, WEBSITE_MARTS_FILE, RATE_SKETCHES_FILE, SERVICE_CATALOG_FILE,
+    PROVIDER_REGISTRY_FILE, DATA_SOURCES, PIPELINE_STATE_FILE
+)
+from fingerprint import file_fingerprint
 
 # Setup logging
 logging.basicConfig(
@@ -38,43 +54,480 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+PRICES_FILE = PROCESSED_DATA_DIR / "hospital_prices.parquet"
+
+# Pipeline stages. inputs and outputs are files, directories (every file
+# below them) or glob patterns; a stage also depends on its own code.
+# opt_in stages have no local inputs to compare, so they run only when asked for
+# (download then re-requests each file conditionally and skips unchanged ones).
+STAGES = [
+    {
+        "name": "download",
+        "title": "🔽 Downloading data",
+        "script": "01_download_data.py",
+        "module": "download_data",
+        "deps": [],
+        "inputs": [],
+        "outputs": [],
+        "opt_in": True
+    },
+    {
+        "name": "mrf",
+        "title": "🏥 Processing hospital MRF files",
+        "script": "02_process_mrf.py",
+        "module": "process_mrf",
+        "deps": ["download"],
+        "inputs": [RAW_DATA_DIR / "*_mrf.csv", RAW_DATA_DIR / "*_mrf.json", SERVICE_CATALOG_FILE],
+        "outputs": [PRICES_FILE, RATE_SKETCHES_FILE]
+    },
+    {
+        "name": "benchmarks",
+        "title": "📊 Processing CMS benchmarks",
+        "script": "03_process_benchmarks.py",
+        "module": "process_benchmarks",
+        "deps": ["download"],
+        "inputs": [RAW_DATA_DIR / source["filename"] for source in DATA_SOURCES.values()] + [SERVICE_CATALOG_FILE],
+        "outputs": [BENCHMARK_STORE_DIR]
+    },
+    {
+        "name": "star_schema",
+        "title": "⭐ Building star schema",
+        "script": "04_build_star_schema.py",
+        "module": "build_star_schema",
+        "deps": ["mrf", "benchmarks"],
+        "inputs": [PRICES_FILE, BENCHMARK_STORE_DIR, SERVICE_CATALOG_FILE, PROVIDER_REGISTRY_FILE],
+        "outputs": [STAR_SCHEMA_DIR]
+    },
+    {
+        "name": "marts",
+        "title": "📈 Building analytics marts",
+        "script": "05_build_marts.py",
+        "module": "build_marts",
+        "deps": ["star_schema", "mrf"],
+        "inputs": [STAR_SCHEMA_DIR, RATE_SKETCHES_FILE, PROVIDER_REGISTRY_FILE],
+        "outputs": [MARTS_DIR, WEBSITE_MARTS_FILE]
+    }
+]
+
+STAGE_NAMES = [stage["name"] for stage in STAGES]
 
-def run_full_pipeline():
+
+class StageFailed(Exception):
+    """Raised when a stage's main() returns a non-zero exit status"""
+
+
+def load_module(name: str, path: Path):
     """
-    Run complete ETL pipeline
+    Import a stage script (file names start with a digit, so not via import)
+    
+    Args:
+        name: Module name to register
+        path: Script path
+    
+    Returns:
+        Loaded module
     """
-    logger.info("=" * 70)
-    logger.info(" ER BILL EXPLAINER - FULL ETL PIPELINE")
-    logger.info("=" * 70)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Register so worker processes can pickle functions from the module
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def topological_order(stages: List[Dict]) -> List[Dict]:
+    """
+    Order stages so every stage follows its dependencies
+    
+    Args:
+        stages: Stage definitions
+    
+    Returns:
+        Stages in run order (ties keep their listed order)
+    
+    Raises:
+        ValueError: If a dependency is unknown or the stages form a cycle
+    """
+    by_name = {stage["name"]: stage for stage in stages}
+    for stage in stages:
+        unknown = [dep for dep in stage["deps"] if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Stage {stage['name']} depends on unknown stage(s) {', '.join(unknown)}")
+    
+    ordered = []
+    done = set()
+    while len(ordered) < len(stages):
+        ready = [
+            stage for stage in stages
+            if stage["name"] not in done and all(dep in done for dep in stage["deps"])
+        ]
+        if not ready:
+            cycle = [stage["name"] for stage in stages if stage["name"] not in done]
+            raise ValueError(f"Stage dependencies form a cycle: {', '.join(cycle)}")
+        ordered.append(ready[0])
+        done.add(ready[0]["name"])
+    
+    return ordered
+
+
+def downstream(stages: List[Dict], names: Set[str]) -> Set[str]:
+    """
+    Stages that depend, directly or not, on any of the given stages
+    
+    Args:
+        stages: Stage definitions
+        names: Stage names to start from
+    
+    Returns:
+        The given names plus every stage downstream of them
+    """
+    selected = set(names)
+    for stage in topological_order(stages):
+        if any(dep in selected for dep in stage["deps"]):
+            selected.add(stage["name"])
+    return selected
+
+
+def code_files(script: str) -> List[Path]:
+    """
+    A stage script and every local ETL module it imports, recursively
+    
+    Args:
+        script: Script file name in scripts/etl
+    
+    Returns:
+        Sorted list of source files
+    """
+    found = set()
+    pending = [ETL_DIR / script]
+    
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                candidate = ETL_DIR / f"{module.split('.')[0]}.py"
+                if candidate.exists():
+                    pending.append(candidate)
+    
+    return sorted(found)
+
+
+def expand_paths(paths: List[Path]) -> List[Path]:
+    """
+    Files named by a stage's inputs
+    
+    Directories stand for every file below them (hidden staging entries and
+    .tmp files excluded), names containing * are glob patterns, and any
+    other path is kept as is, even if it does not exist yet.
+    
+    Args:
+        paths: Declared inputs
+    
+    Returns:
+        Sorted, de-duplicated list of file paths
+    """
+    files = set()
+    
+    for path in paths:
+        if "*" in path.name:
+            files.update(match for match in path.parent.glob(path.name) if match.is_file())
+        elif path.is_dir():
+            files.update(
+                match for match in path.rglob("*")
+                if match.is_file()
+                and match.suffix != ".tmp"
+                and not any(part.startswith(".") for part in match.relative_to(path).parts)
+            )
+        else:
+            files.add(path)
+    
+    return sorted(files)
+
+
+def _relative(path: Path) -> str:
+    """Path relative to the project root, as stored in the state file"""
+    try:
+        return path.resolve().relative_to(PROJECT_ROOT.resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def stage_key(stage: Dict, argv: List[str], fingerprints: Dict) -> str:
+    """
+    Hash of everything a stage's outputs depend on
+    
+    Args:
+        stage: Stage definition
+        argv: Arguments the stage runs with
+        fingerprints: Stored file fingerprints (relative path -> fingerprint);
+            updated in place with fresh ones
+    
+    Returns:
+        Hex digest of the stage's code, input files and arguments
+    """
+    hashes = {}
+    
+    for path in code_files(stage["script"]) + expand_paths(stage["inputs"]):
+        name = _relative(path)
+        if not path.exists():
+            hashes[name] = None
+            continue
+        fingerprints[name] = file_fingerprint(path, fingerprints.get(name))
+        hashes[name] = fingerprints[name]["hash"]
+    
+    payload = json.dumps({"files": hashes, "argv": argv}, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def outputs_exist(stage: Dict) -> bool:
+    """
+    Whether every declared output of a stage is present
+    
+    Args:
+        stage: Stage definition
+    
+    Returns:
+        True if each output file exists and each output directory has files
+    """
+    for path in stage["outputs"]:
+        if path.is_dir():
+            if not expand_paths([path]):
+                return False
+        elif not path.exists():
+            return False
+    return True
+
+
+def load_state() -> Dict:
+    """
+    Load the pipeline state
+    
+    Returns:
+        Dict with the key of each stage's last successful run and the
+        fingerprints of the files they were computed from
+    """
+    if not PIPELINE_STATE_FILE.exists():
+        return {"stages": {}, "files": {}}
     
     try:
-        # Step 1: Download data
-        logger.info("\n🔽 STEP 1/4: Downloading data...")
-        download_data.main()
+        state = json.loads(PIPELINE_STATE_FILE.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable pipeline state {PIPELINE_STATE_FILE.name}: {e}")
+        return {"stages": {}, "files": {}}
+    
+    state.setdefault("stages", {})
+    state.setdefault("files", {})
+    return state
+
+
+def save_state(state: Dict):
+    """
+    Save the pipeline state
+    
+    Args:
+        state: Dict from load_state, updated
+    """
+    PIPELINE_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = PIPELINE_STATE_FILE.with_suffix(".json.tmp")
+    temp_file.write_text(json.dumps(state, indent=2, sort_keys=True))
+    temp_file.replace(PIPELINE_STATE_FILE)
+
+
+def run_pipeline(
+    only: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    force: bool = False,
+    dry_run: bool = False,
+    download: bool = False,
+    stage_args: Optional[Dict[str, List[str]]] = None
+) -> List[str]:
+    """
+    Run the pipeline stages that are out of date
+    
+    Args:
+        only: Run just these stages, whether up to date or not
+        start: Run this stage and every stage downstream of it, whether up to date or not
+        force: Run every stage (opt-in stages only with download)
+        dry_run: Only report which stages would run
+        download: Also run the opt-in download stage
+        stage_args: Stage name -> arguments passed to its main(); part of the
+            stage's key, so changing them reruns the stage
+    
+    Returns:
+        Names of the stages run (or, for a dry run, that would run)
+    
+    Raises:
+        StageFailed: If a stage returns a non-zero exit status (exceptions
+            raised by a stage propagate as they are)
+    """
+    stages = topological_order(STAGES)
+    
+    opt_in = {stage["name"] for stage in stages if stage.get("opt_in")}
+    
+    if only:
+        selected = set(only)
+        forced = set(only)
+    elif start:
+        selected = downstream(stages, {start}) - (opt_in - {start})
+        forced = selected
+    else:
+        selected = set(STAGE_NAMES) - opt_in
+        forced = selected if force else set()
+    
+    if download:
+        selected |= opt_in
+    # Opt-in stages cannot be checked by key, so when asked for they run
+    forced |= selected & opt_in
+    
+    stage_args = stage_args or {}
+    state = load_state()
+    ran = []
+    
+    for number, stage in enumerate(stages, 1):
+        name = stage["name"]
+        if name not in selected:
+            continue
+        
+        argv = stage_args.get(name, [])
+        key = stage_key(stage, argv, state["files"])
+        current = state["stages"].get(name, {}).get("key") == key and outputs_exist(stage)
+        
+        if current and name not in forced:
+            logger.info(f"✓ STEP {number}/{len(stages)}: {name} is up to date")
+            continue
         
-        # Step 2: Process MRF files
-        logger.info("\n🏥 STEP 2/4: Processing hospital MRF files...")
-        process_mrf.main()
+        ran.append(name)
+        if dry_run:
+            reason = "forced" if name in forced else "out of date"
+            logger.info(f"→ STEP {number}/{len(stages)}: {name} would run ({reason})")
+            continue
         
-        # Step 3: Process benchmarks
-        logger.info("\n📊 STEP 3/4: Processing CMS benchmarks...")
-        process_benchmarks.main()
+        logger.info(f"\n{stage['title']} (STEP {number}/{len(stages)}: {name})...")
+        started = time.perf_counter()
         
-        # Step 4: Build star schema
-        logger.info("\n⭐ STEP 4/4: Building star schema...")
-        build_star_schema.main()
+        # Forget the last key first: a failed run may have left the outputs half-written
+        state["stages"].pop(name, None)
+        save_state(state)
         
-        logger.info("\n" + "=" * 70)
-        logger.info("✅ PIPELINE COMPLETE!")
-        logger.info("=" * 70)
-        logger.info("\n📝 Next steps:")
-        logger.info("1. Open Power BI Desktop")
-        logger.info("2. Import parquet files from data/processed/star_schema/")
-        logger.info("3. Build your dashboard!")
+        module = sys.modules.get(stage["module"]) or load_module(stage["module"], ETL_DIR / stage["script"])
+        status = module.main(argv)
+        if status:
+            raise StageFailed(f"{name} stage failed (exit status {status})")
         
+        # Record the key the outputs were built from, so the next run can skip them
+        state["stages"][name] = {"key": key, "seconds": round(time.perf_counter() - started, 1)}
+        save_state(state)
+    
+    if not dry_run:
+        save_state(state)
+    
+    return ran
+
+
+def parse_stage_args(values: List[str]) -> Dict[str, List[str]]:
+    """
+    Parse --stage-args values
+    
+    Args:
+        values: STAGE=ARGS strings; ARGS is split like a shell command line
+    
+    Returns:
+        Dict of stage name -> arguments (a stage given twice gets both sets)
+    
+    Raises:
+        ValueError: If a value has no "=" or names an unknown stage
+    """
+    stage_args: Dict[str, List[str]] = {}
+    for value in values:
+        name, sep, args = value.partition("=")
+        if not sep or name not in STAGE_NAMES:
+            raise ValueError(f"Expected STAGE=ARGS with STAGE one of {', '.join(STAGE_NAMES)}, got {value!r}")
+        stage_args.setdefault(name, []).extend(shlex.split(args))
+    return stage_args
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the ETL pipeline, skipping stages that are up to date")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--only", nargs="+", choices=STAGE_NAMES, metavar="STAGE",
+        help=f"Run just these stages ({', '.join(STAGE_NAMES)}), even if up to date"
+    )
+    target.add_argument(
+        "--from", dest="start", choices=STAGE_NAMES, metavar="STAGE",
+        help="Run this stage and everything downstream of it, even if up to date"
+    )
+    target.add_argument(
+        "--force", action="store_true",
+        help="Run every stage, even if up to date (the download too with --download)"
+    )
+    parser.add_argument(
+        "--download", action="store_true",
+        help="Also run the download stage, which re-requests every source file"
+    )
+    parser.add_argument(
+        "--stage-args", action="append", default=[], metavar="STAGE=ARGS",
+        help='Arguments for a stage\'s script, e.g. benchmarks="--replace" (repeatable)'
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Only list the stages that would run"
+    )
+    args = parser.parse_args(argv)
+    
+    try:
+        args.stage_args = parse_stage_args(args.stage_args)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    return args
+
+
+def run_full_pipeline(argv: Optional[List[str]] = None):
+    """
+    Run complete ETL pipeline
+    
+    Args:
+        argv: Command-line arguments (defaults to sys.argv)
+    """
+    args = parse_args(argv)
+    
+    logger.info("=" * 70)
+    logger.info(" ER BILL EXPLAINER - FULL ETL PIPELINE")
+    logger.info("=" * 70)
+    
+    started = time.perf_counter()
+    
+    try:
+        ran = run_pipeline(args.only, args.start, args.force, args.dry_run, args.download, args.stage_args)
     except Exception as e:
         logger.error(f"\n✗ Pipeline failed: {e}")
         raise
+    
+    if args.dry_run:
+        logger.info(f"\n{len(ran)} stage(s) would run")
+        return
+    
+    logger.info("\n" + "=" * 70)
+    if ran:
+        logger.info(f"✅ PIPELINE COMPLETE! Ran {', '.join(ran)} in {time.perf_counter() - started:.1f}s")
+    else:
+        logger.info("✅ PIPELINE UP TO DATE - nothing to run")
+    logger.info("=" * 70)
+    logger.info("\n📝 Next steps:")
+    logger.info("1. Open Power BI Desktop")
+    logger.info("2. Import parquet files from data/processed/star_schema/ and data/processed/marts/")
+    logger.info("3. Build your dashboard!")
 
 
 if __name__ == "__main__":
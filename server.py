@@ -1,9 +1,11 @@
 """
 ER Bill Explainer — Backend API Server
-Provides /explain-bill endpoint using Google Gemini 1.5 Flash
+Provides /explain-bill endpoint using Google Gemini 1.5 Flash, and serves the
+precomputed analytics marts
 """
 
 import os
+from pathlib import Path
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -41,6 +43,27 @@ def serve_index():
 def serve_static(path):
     return send_from_directory(app.static_folder, path)
 
+# ── API: Analytics Marts ──────────────────────────────────────────
+MARTS_DIR = Path(__file__).parent / "data" / "processed" / "marts"
+
+@app.route("/api/marts/<name>")
+def get_mart(name):
+    """Return a mart built by scripts/etl/05_build_marts.py as JSON records."""
+    mart_file = MARTS_DIR / f"{name}.parquet"
+    if not name.startswith("mart_") or not mart_file.is_file():
+        return jsonify({"error": f"Unknown mart '{name}'"}), 404
+
+    import pandas as pd
+    df = pd.read_parquet(mart_file)
+
+    # Optional equality filters, e.g. /api/marts/mart_service_markup?state=VA
+    for column, value in request.args.items():
+        if column not in df.columns:
+            return jsonify({"error": f"Unknown column '{column}'"}), 400
+        df = df[df[column].astype(str) == value]
+
+    return app.response_class(df.to_json(orient="records"), mimetype="application/json")
+
 # ── API: Explain Bill ─────────────────────────────────────────────
 SYSTEM_PROMPT = """You are a medical billing assistant.
 Explain the following emergency room bill in simple language that a non-medical person can understand.
@@ -0,0 +1,246 @@
+"""
+Shared test setup
+Makes the ETL modules importable, loads the numbered stage scripts, writes
+synthetic MRF fixtures and serves files over a local HTTP server
+"""
+
+import csv
+import importlib.util
+import json
+import random
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).parent.parent / "scripts" / "etl"
+sys.path.insert(0, str(ETL_DIR))
+
+
+def load_stage(name: str, script: str):
+    """
+    Import a stage script (file names start with a digit, so not via import)
+    
+    Args:
+        name: Module name to register
+        script: Script file name in scripts/etl
+    
+    Returns:
+        Loaded module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, ETL_DIR / script)
+    module = importlib.util.module_from_spec(spec)
+    # Register so worker processes can pickle functions from the module
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def download_data():
+    return load_stage("download_data", "01_download_data.py")
+
+
+@pytest.fixture(scope="session")
+def process_mrf():
+    return load_stage("process_mrf", "02_process_mrf.py")
+
+
+@pytest.fixture(scope="session")
+def process_benchmarks():
+    return load_stage("process_benchmarks", "03_process_benchmarks.py")
+
+
+@pytest.fixture(scope="session")
+def build_star_schema():
+    return load_stage("build_star_schema", "04_build_star_schema.py")
+
+
+@pytest.fixture(scope="session")
+def build_marts():
+    return load_stage("build_marts", "05_build_marts.py")
+
+
+@pytest.fixture(scope="session")
+def run_pipeline():
+    return load_stage("run_pipeline", "../run_pipeline.py")
+
+
+# Codes of the synthetic MRFs: a few catalog codes among many others
+FIXTURE_CODES = ["99283", "99284", "99285", "70450", "85025", "J1885"] + [str(10000 + i) for i in range(200)]
+
+
+def write_inova_mrf(path: Path, rows: int, seed: int = 0, rate_columns: int = 28) -> Path:
+    """
+    Write a synthetic MRF in Inova's positional CSV layout
+    
+    Rows mix quoted multi-line and quote-escaped descriptions, blank codes,
+    non-numeric charges and rate cells outside the 0-100000 sanity bounds.
+    
+    Args:
+        path: File to write
+        rows: Data rows
+        seed: Random seed
+        rate_columns: Columns after the cash price column
+    
+    Returns:
+        path
+    """
+    rnd = random.Random(seed)
+    
+    with open(path, "w", newline="", encoding="latin-1") as f:
+        writer = csv.writer(f)
+        writer.writerow(["hospital_name", "last_updated_on", "version"])
+        writer.writerow(["Inova Alexandria Hospital", "2024-01-01", "2.0"])
+        writer.writerow(["meta"])
+        writer.writerow(
+            ["description", "revenue_code", "setting", "code", "code_type", "x5", "x6", "x7", "x8",
+             "gross", "dmin", "cash"] + [f"p{i}" for i in range(rate_columns)]
+        )
+        for _ in range(rows):
+            writer.writerow(
+                [
+                    rnd.choice(["CT HEAD", 'ER VISIT "L3"', "multi\nline desc", "  spaced  ", ""]),
+                    rnd.choice(["0450", "", "0320"]),
+                    "RC",
+                    rnd.choice(FIXTURE_CODES + [""]),
+                    rnd.choice(["CPT", "HCPCS", ""]),
+                    "", "", "", "",
+                    rnd.choice([f"{rnd.uniform(10, 9000):.2f}", "", "N/A"]),
+                    "",
+                    rnd.choice([f"{rnd.uniform(10, 900):.2f}", ""])
+                ]
+                + [rnd.choice(["", f"{rnd.uniform(-5, 120000):.2f}", "per diem", "0"]) for _ in range(rate_columns)]
+            )
+    
+    return path
+
+
+def write_json_mrf(path: Path, items: int, seed: int = 0) -> Path:
+    """
+    Write a synthetic CMS standard-charges JSON MRF, one array item per line
+    
+    Items mix a code with a modifier suffix, string and non-numeric cash
+    prices and payer rates outside the 0-100000 sanity bounds.
+    
+    Args:
+        path: File to write
+        items: Items in standard_charge_information
+        seed: Random seed
+    
+    Returns:
+        path
+    """
+    rnd = random.Random(seed)
+    
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            '{"hospital_name": "Inova Fairfax \\"Main\\" Hospital", "ccn": "490063", '
+            '"last_updated_on": "2024-01-01", "version": "2.0.0",\n'
+            ' "standard_charge_information": [\n'
+        )
+        for i in range(items):
+            item = {
+                "description": f"SERVICE {i} é",
+                "code_information": [
+                    {"code": rnd.choice(FIXTURE_CODES + [" 99283-25 "]), "type": "CPT"},
+                    {"code": "0450", "type": "RC"}
+                ],
+                "standard_charges": [{
+                    "setting": "outpatient",
+                    "gross_charge": round(rnd.uniform(1, 9000), 2),
+                    "discounted_cash": rnd.choice([None, 100.5, "12.5", "n/a"]),
+                    "payers_information": [
+                        {
+                            "payer_name": f"Payer {j}",
+                            "plan_name": "PPO",
+                            "standard_charge_dollar": rnd.choice([round(rnd.uniform(-1, 120000), 2), None]),
+                            "methodology": "fee schedule"
+                        }
+                        for j in range(rnd.randint(0, 12))
+                    ]
+                }]
+            }
+            f.write(("," if i else "") + json.dumps(item) + "\n")
+        f.write("]}\n")
+    
+    return path
+
+
+class FileServer(ThreadingHTTPServer):
+    """Serves files from memory with ETags, conditional and Range requests"""
+    
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FileHandler)
+        self.files = {}      # path -> (body, etag)
+        self.requests = []   # (path, headers) of every request
+        self.drop_after = {}  # path -> bytes sent before the next response is cut off
+    
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_port}{path}"
+    
+    def publish(self, path: str, body: bytes, etag: str):
+        self.files[path] = (body, etag)
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        if self.path not in server.files:
+            self.send_error(404)
+            return
+        body, etag = server.files[self.path]
+        
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        # Like real servers: Range without If-Range is always honoured
+        if match and (if_range is None or if_range == etag):
+            start = int(match.group(1))
+        
+        if start:
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        
+        payload = body[start:]
+        drop = server.drop_after.pop(self.path, None)
+        self.wfile.write(payload if drop is None else payload[:drop])
+        if drop is not None:
+            self.close_connection = True
+
+
+@pytest.fixture
+def server():
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_layout_cache(tmp_path, monkeypatch):
+    # Resolved MRF layouts go to a scratch file, not data/processed
+    import mrf_layout
+    monkeypatch.setattr(mrf_layout, "MRF_LAYOUT_CACHE", tmp_path / "mrf_layouts.json")
@@ -0,0 +1,117 @@
+"""
+Tests for the partitioned benchmark store in benchmark_store.py
+"""
+
+import pandas as pd
+import pytest
+
+from benchmark_store import list_partitions, partition_path, read_benchmarks, write_benchmarks
+
+
+def benchmarks(source, year, rates, sample=False):
+    df = pd.DataFrame({
+        "code": [f"{99281 + i}" for i in range(len(rates))],
+        "description": "ER visit",
+        "medicare_rate": rates,
+        "source": source,
+        "year": year
+    })
+    if sample:
+        df["is_sample"] = True
+    return df
+
+
+def stored(root):
+    return {(p["source"], p["year"]): (p["rows"], p["sample"]) for p in list_partitions(root)}
+
+
+@pytest.fixture
+def root(tmp_path):
+    return tmp_path / "store"
+
+
+def test_new_year_is_appended_next_to_earlier_ones(root):
+    write_benchmarks(benchmarks("PFS", 2023, [10.0, 20.0]), root=root)
+    earlier = partition_path("PFS", 2023, root) / "part-0.parquet"
+    mtime = earlier.stat().st_mtime_ns
+    
+    counts = write_benchmarks(
+        pd.concat([benchmarks("PFS", 2023, [10.0, 20.0]), benchmarks("PFS", 2024, [11.0, 21.0, 31.0])]),
+        root=root
+    )
+    
+    assert counts == {"written": 1, "skipped": 1}
+    assert stored(root) == {("PFS", 2023): (2, False), ("PFS", 2024): (3, False)}
+    assert earlier.stat().st_mtime_ns == mtime
+    assert read_benchmarks(years=[2024], root=root)["medicare_rate"].tolist() == [11.0, 21.0, 31.0]
+
+
+def test_identical_rows_are_skipped(root):
+    write_benchmarks(benchmarks("CLFS", 2023, [7.77]), root=root)
+    target = partition_path("CLFS", 2023, root) / "part-0.parquet"
+    mtime = target.stat().st_mtime_ns
+    
+    # Row order does not matter: partitions are stored sorted by code
+    counts = write_benchmarks(benchmarks("CLFS", 2023, [7.77]).iloc[::-1], root=root)
+    
+    assert counts == {"written": 0, "skipped": 1}
+    assert target.stat().st_mtime_ns == mtime
+
+
+def test_changed_release_for_a_stored_year_replaces_it(root, caplog):
+    write_benchmarks(benchmarks("PFS", 2023, [10.0, 20.0]), root=root)
+    
+    # e.g. the April RVU23B update of the January RVU23A file
+    counts = write_benchmarks(benchmarks("PFS", 2023, [10.5, 20.0, 30.0]), root=root)
+    
+    assert counts == {"written": 1, "skipped": 0}
+    assert read_benchmarks(root=root)["medicare_rate"].tolist() == [10.5, 20.0, 30.0]
+    assert "differs from the stored partition" in caplog.text
+
+
+def test_replace_rewrites_unchanged_partitions(root):
+    write_benchmarks(benchmarks("PFS", 2023, [10.0]), root=root)
+    
+    assert write_benchmarks(benchmarks("PFS", 2023, [10.0]), replace=True, root=root) == {"written": 1, "skipped": 0}
+
+
+def test_real_data_replaces_sample_partitions(root):
+    write_benchmarks(
+        pd.concat([benchmarks("OPPS", 2024, [450.0], sample=True), benchmarks("CLFS", 2024, [45.5], sample=True)]),
+        root=root
+    )
+    assert stored(root) == {("CLFS", 2024): (1, True), ("OPPS", 2024): (1, True)}
+    
+    # Real OPPS data for another year removes the OPPS sample; the CLFS sample stays
+    write_benchmarks(benchmarks("OPPS", 2022, [400.0, 500.0]), root=root)
+    assert stored(root) == {("CLFS", 2024): (1, True), ("OPPS", 2022): (2, False)}
+    
+    # Samples are never written once a source has real data
+    counts = write_benchmarks(benchmarks("OPPS", 2024, [450.0], sample=True), root=root)
+    assert counts == {"written": 0, "skipped": 1}
+    assert stored(root) == {("CLFS", 2024): (1, True), ("OPPS", 2022): (2, False)}
+    
+    # Real data for the sample's own year takes its partition
+    write_benchmarks(benchmarks("CLFS", 2024, [7.77, 10.56]), root=root)
+    assert stored(root) == {("CLFS", 2024): (2, False), ("OPPS", 2022): (2, False)}
+
+
+def test_rows_without_year_are_not_stored(root):
+    df = benchmarks("PFS", 2023, [10.0, 20.0])
+    df["year"] = [2023, None]
+    
+    write_benchmarks(df, root=root)
+    
+    assert stored(root) == {("PFS", 2023): (1, False)}
+
+
+def test_read_filters_sources_years_and_codes(root):
+    write_benchmarks(
+        pd.concat([benchmarks("PFS", 2023, [10.0, 20.0, 30.0]), benchmarks("CLFS", 2024, [1.0, 2.0])]),
+        root=root
+    )
+    
+    df = read_benchmarks(sources=["PFS"], codes=["99282", "99283"], columns=["code", "year"], root=root)
+    
+    assert df.to_dict("records") == [{"code": "99282", "year": 2023}, {"code": "99283", "year": 2023}]
+    assert read_benchmarks(sources=["OPPS"], root=root).empty
@@ -0,0 +1,228 @@
+"""
+Tests for PFS and CLFS ingestion in 03_process_benchmarks.py
+Fixtures are small zips laid out like the CMS downloads
+"""
+
+import csv
+import io
+import json
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def csv_text(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\r\n").writerows(rows)
+    return buffer.getvalue()
+
+
+# PPRRVU: title rows, then a header split over two rows (continuation rows start blank)
+PPRRVU_ROWS = [
+    ["2023 National Physician Fee Schedule Relative Value File January Release"],
+    ["CPT codes and descriptions only are copyright 2022 American Medical Association."],
+    [],
+    ["HCPCS", "MOD", "DESCRIPTION", "STATUS", "WORK", "NON-FAC", "FACILITY", "MP", "CONV"],
+    ["", "", "", "CODE", "RVU", "PE RVU", "PE RVU", "RVU", "FACTOR"],
+    ["99283", "", "Emergency dept visit", "A", "1.60", "0.40", "0.30", "0.15", "33.8872"],
+    ["99283", "26", "Emergency dept visit", "A", "1.60", "0.40", "0.30", "0.15", "33.8872"],
+    ["99285", "", "Emergency dept visit", "R", "4.00", "0.90", "0.70", "0.40", ""],
+    ["0001U", "", "Rbc dna hea 35 ag 11 bld grp", "I", "0.00", "0.00", "0.00", "0.00", "33.8872"],
+    ["G0999", "", "Unpriced code", "A", "", "", "", "", "33.8872"]
+]
+
+GPCI_ROWS = [
+    ["ADDENDUM E. FINAL CY 2023 GEOGRAPHIC PRACTICE COST INDICES (GPCIs) BY STATE AND MEDICARE LOCALITY"],
+    [],
+    ["Medicare Administrative Contractor (MAC)", "State", "Locality Number", "Locality Name",
+     "2023 PW GPCI (with 1.0 Floor)", "2023 PE GPCI", "2023 MP GPCI"],
+    ["12302", "VA", "00", "VIRGINIA", "1.000", "1.010", "0.900"],
+    ["12201", "DC", "01", "DC + MD/VA SUBURBS", "1.050", "1.300", "1.200"],
+    ["", "", "", "", "", "", ""],
+    ["Source: CMS, CY 2023 PFS final rule"]
+]
+
+CLFS_ROWS = [
+    ["CY 2023 Clinical Laboratory Fee Schedule"],
+    ["CPT codes, descriptions and other data only are copyright 2022 American Medical Association."],
+    [],
+    ["YEAR", "HCPCS", "MOD", "EFF_DATE", "INDICATOR", "RATE", "SHORTDESC", "LONGDESC"],
+    ["2023", "85025", "", "20230101", "N", "7.77", "Complete cbc w/auto diff wbc", "Blood count"],
+    ["2023", "85025", "QW", "20230101", "N", "7.77", "Complete cbc w/auto diff wbc", "Blood count"],
+    ["2023", "80053", "", "20230101", "N", "10.56", "Comprehen metabolic panel", "Metabolic panel"],
+    ["2023", "0001U", "", "20230101", "N", "", "Rbc dna hea 35 ag 11 bld grp", "Unpriced"]
+]
+
+
+@pytest.fixture
+def pfs_zip(tmp_path):
+    zip_path = tmp_path / "pfs_rvu_2023.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("RVU23A/PPRRVU23_JAN.csv", csv_text(PPRRVU_ROWS))
+        archive.writestr("RVU23A/GPCI2023.csv", csv_text(GPCI_ROWS))
+        archive.writestr("RVU23A/RVU23A.pdf", b"%PDF-1.4")
+    return zip_path
+
+
+@pytest.fixture
+def clfs_zip(tmp_path):
+    zip_path = tmp_path / "clfs_2023.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("CLFS 2023 Q1V1.csv", csv_text(CLFS_ROWS))
+    return zip_path
+
+
+def pfs_payment(work, pe, mp, gpci, cf):
+    return round((work * gpci[0] + pe * gpci[1] + mp * gpci[2]) * cf, 2)
+
+
+def test_pfs_payments_per_code_and_locality(process_benchmarks, pfs_zip, tmp_path, monkeypatch):
+    # 99285 has no conversion factor in the file and falls back to the configured one
+    cf = 40.0
+    monkeypatch.setattr(process_benchmarks, "PFS_CONVERSION_FACTOR", cf)
+    
+    df = process_benchmarks.process_pfs_rvu(pfs_zip)
+    
+    va, dc = (1.000, 1.010, 0.900), (1.050, 1.300, 1.200)
+    expected = {
+        ("99283", "12302-00"): pfs_payment(1.60, 0.30, 0.15, va, 33.8872),
+        ("99283", "12201-01"): pfs_payment(1.60, 0.30, 0.15, dc, 33.8872),
+        ("99285", "12302-00"): pfs_payment(4.00, 0.70, 0.40, va, cf),
+        ("99285", "12201-01"): pfs_payment(4.00, 0.70, 0.40, dc, cf)
+    }
+    
+    # Modifier rows, non-payable statuses, unpriced codes and footer rows are dropped
+    assert dict(zip(zip(df["code"], df["locality"]), df["medicare_rate"])) == pytest.approx(expected)
+    assert set(df["source"]) == {"PFS"}
+    assert set(df["year"]) == {2023}
+    assert set(zip(df["locality"], df["state"], df["locality_name"])) == {
+        ("12302-00", "VA", "VIRGINIA"), ("12201-01", "DC", "DC + MD/VA SUBURBS")
+    }
+    assert set(df["description"]) == {"Emergency dept visit"}
+    # Members are streamed from the archive, not extracted
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["pfs_rvu_2023.zip"]
+
+
+def test_clfs_national_rates(process_benchmarks, clfs_zip):
+    df = process_benchmarks.process_clfs(clfs_zip)
+    
+    assert df[["code", "medicare_rate", "source", "year"]].to_dict("records") == [
+        {"code": "85025", "medicare_rate": 7.77, "source": "CLFS", "year": 2023},
+        {"code": "80053", "medicare_rate": 10.56, "source": "CLFS", "year": 2023}
+    ]
+    assert df["description"].tolist() == ["Complete cbc w/auto diff wbc", "Comprehen metabolic panel"]
+
+
+def test_missing_members_give_no_benchmarks(process_benchmarks, tmp_path):
+    zip_path = tmp_path / "pfs_rvu_2023.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("PPRRVU23_JAN.csv", csv_text(PPRRVU_ROWS))
+    
+    assert process_benchmarks.process_pfs_rvu(zip_path).empty
+    assert process_benchmarks.process_pfs_rvu(tmp_path / "absent.zip").empty
+    assert process_benchmarks.process_clfs(tmp_path / "absent.zip").empty
+
+
+OPPS_HEADER = [
+    "Rndrng_Prvdr_CCN", "Rndrng_Prvdr_Org_Name", "Rndrng_Prvdr_State_Abrvtn",
+    "APC", "APC_Desc", "CAPC_Srvcs", "Avg_Mdcr_Pymt_Amt"
+]
+
+
+def write_opps(path, rows=2000, seed=0):
+    """Write a synthetic CMS Outpatient provider-by-service file"""
+    rng = np.random.default_rng(seed)
+    apcs = [f"{5000 + i:04d}" for i in range(25)]
+    df = pd.DataFrame({
+        "Rndrng_Prvdr_CCN": rng.integers(490000, 490100, rows).astype(str),
+        "Rndrng_Prvdr_Org_Name": "Hospital",
+        "Rndrng_Prvdr_State_Abrvtn": rng.choice(["VA", "MD", "DC", "CA", " VA", "NY"], rows),
+        "APC": rng.choice(apcs, rows),
+        "APC_Desc": "Level 1 service",
+        "CAPC_Srvcs": rng.integers(11, 5000, rows),
+        "Avg_Mdcr_Pymt_Amt": rng.lognormal(5, 1, rows).round(2)
+    })
+    df.loc[rng.random(rows) < 0.02, "Avg_Mdcr_Pymt_Amt"] = np.nan
+    df["APC_Desc"] = df["APC"].map(lambda apc: f"APC {apc} service")
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def raw_dir(process_benchmarks, tmp_path, monkeypatch):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    monkeypatch.setattr(process_benchmarks, "RAW_DATA_DIR", raw_dir)
+    monkeypatch.setattr(process_benchmarks, "DOWNLOAD_MANIFEST", raw_dir / "download_manifest.json")
+    return raw_dir
+
+
+def test_outpatient_without_year_falls_back_to_sample_data(process_benchmarks, raw_dir):
+    # Saved under the downloader's fixed name, with no manifest entry to recover the year from
+    write_opps(raw_dir / "cms_outpatient_hospitals.csv")
+    
+    df = process_benchmarks.process_cms_outpatient()
+    
+    pd.testing.assert_frame_equal(df, process_benchmarks.create_sample_benchmarks())
+
+
+def test_outpatient_unexpected_columns_fall_back_before_the_year_is_needed(process_benchmarks, raw_dir):
+    (raw_dir / "cms_outpatient_hospitals.csv").write_text("a,b\n1,2\n")
+    
+    df = process_benchmarks.process_cms_outpatient()
+    
+    assert df["is_sample"].all()
+
+
+def test_outpatient_year_from_downloaded_file_name(process_benchmarks, raw_dir):
+    write_opps(raw_dir / "cms_outpatient_hospitals.csv")
+    (raw_dir / "download_manifest.json").write_text(json.dumps({
+        "cms_outpatient_hospitals.csv": {
+            "url": "https://data.cms.gov/provider-summary/data",
+            "source_filename": "MUP_OHP_R24_P04_V10_D22_Prov_Svc.csv"
+        }
+    }))
+    
+    df = process_benchmarks.process_cms_outpatient()
+    
+    assert set(df["source"]) == {"OPPS"} and set(df["year"]) == {2022}
+    assert set(process_benchmarks.process_cms_outpatient(year=2021)["year"]) == {2021}
+
+
+def whole_file_benchmarks(path, states):
+    """OPPS benchmarks of a whole file from one groupby: service-weighted mean payment per APC and state"""
+    df = pd.read_csv(path, dtype={"APC": str, "Rndrng_Prvdr_State_Abrvtn": str})
+    df = df.dropna(subset=["Avg_Mdcr_Pymt_Amt"]).assign(state=df["Rndrng_Prvdr_State_Abrvtn"].str.strip())
+    if states is not None:
+        df = df[df["state"].isin(states)]
+    df["payment_total"] = df["Avg_Mdcr_Pymt_Amt"] * df["CAPC_Srvcs"]
+    
+    totals = df.groupby(["APC", "state"]).agg(
+        description=("APC_Desc", "first"), payment_total=("payment_total", "sum"), services=("CAPC_Srvcs", "sum")
+    ).reset_index()
+    return pd.DataFrame({
+        "code": totals["APC"],
+        "description": totals["description"],
+        "medicare_rate": (totals["payment_total"] / totals["services"]).round(2),
+        "state": totals["state"]
+    })
+
+
+@pytest.mark.parametrize("states", [["VA", "MD", "DC"], None])
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+@pytest.mark.parametrize("chunk_rows", [97, 1000, 5000])
+def test_outpatient_chunked_totals_match_whole_file(process_benchmarks, raw_dir, chunk_rows, engine, states):
+    cms_file = write_opps(raw_dir / "cms_outpatient_hospitals.csv", rows=3000, seed=3)
+    expected = whole_file_benchmarks(cms_file, states)
+    
+    df = process_benchmarks.process_cms_outpatient(engine=engine, chunk_rows=chunk_rows, states=states, year=2023)
+    
+    assert set(df["source"]) == {"OPPS"} and set(df["year"]) == {2023}
+    assert set(df["state"]) == ({"VA", "MD", "DC"} if states else {"VA", "MD", "DC", "CA", "NY"})
+    pd.testing.assert_frame_equal(
+        df[expected.columns].sort_values(["code", "state"], ignore_index=True),
+        expected.sort_values(["code", "state"], ignore_index=True),
+        check_exact=False, atol=0.01, rtol=0
+    )
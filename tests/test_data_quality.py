@@ -0,0 +1,144 @@
+"""
+Tests for the data quality checks in data_quality.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_quality
+from data_quality import DataQualityError, check_tables, enforce, failures
+
+
+@pytest.fixture
+def tables():
+    dim_service = pd.DataFrame({"service_id": [1, 2, 3, 4]})
+    fact_prices = pd.DataFrame({
+        # 4 is never priced, 9 is not in dim_service; 2 repeats across the whole table
+        "service_id": [1, 2, 3, 2, 1, 9, 2, 3, 1, 2],
+        "price_id": list(range(10)),
+        "gross_charge": [10.0, np.nan, 30.0, None, 50.0, 60.0, 70.0, 80.0, 90.0, 100.0]
+    })
+    return {"dim_service": dim_service, "fact_prices": fact_prices}
+
+
+def results(report, table_name="fact_prices"):
+    return {(r["check"], r["column"]): r for r in report["tables"][table_name]["checks"]}
+
+
+def test_not_null(tables):
+    report = check_tables(tables, {"fact_prices": [
+        {"check": "not_null", "column": "gross_charge"},
+        {"check": "not_null", "column": "price_id"}
+    ]})
+    
+    checks = results(report)
+    # NaN counts as missing, like None
+    assert checks[("not_null", "gross_charge")]["failing_rows"] == 2
+    assert checks[("not_null", "gross_charge")]["status"] == "fail"
+    assert checks[("not_null", "price_id")]["status"] == "pass"
+
+
+def test_unique(tables):
+    report = check_tables(tables, {"fact_prices": [
+        {"check": "unique", "column": "service_id"},
+        {"check": "unique", "column": "price_id"}
+    ]})
+    
+    checks = results(report)
+    # Rows beyond the first of each repeated value: 2 more 1s, 3 more 2s, 1 more 3
+    assert checks[("unique", "service_id")]["failing_rows"] == 6
+    assert checks[("unique", "price_id")]["status"] == "pass"
+
+
+def test_references(tables):
+    report = check_tables(tables, {"fact_prices": [
+        {"check": "references", "column": "service_id", "table": "dim_service", "key": "service_id"}
+    ]})
+    
+    check = results(report)[("references", "service_id")]
+    assert (check["failing_rows"], check["status"]) == (1, "fail")
+
+
+@pytest.mark.parametrize("threshold, status", [(0.75, "pass"), (0.8, "fail")])
+def test_min_coverage(tables, threshold, status):
+    report = check_tables(tables, {"fact_prices": [
+        {"check": "min_coverage", "column": "service_id", "table": "dim_service", "key": "service_id",
+         "threshold": threshold}
+    ]})
+    
+    check = results(report)[("min_coverage", "service_id")]
+    assert (check["covered"], check["total"], check["status"]) == (3, 4, status)
+
+
+def test_empty_table_fails_thresholds(tables):
+    tables["fact_prices"] = tables["fact_prices"].head(0)
+    
+    report = check_tables(tables, {"fact_prices": [
+        {"check": "min_coverage", "column": "service_id", "table": "dim_service", "key": "service_id",
+         "threshold": 0.5},
+        {"check": "max_null_fraction", "column": "gross_charge", "threshold": 0.5}
+    ]})
+    
+    checks = report["tables"]["fact_prices"]["checks"]
+    assert [c["status"] for c in checks] == ["warn", "fail", "fail"]
+    assert not report["passed"]
+
+
+RULES = {
+    "dim_service": [{"check": "unique", "column": "service_id"}],
+    "fact_prices": [
+        {"check": "not_null", "column": "gross_charge"},
+        {"check": "unique", "column": "service_id"},
+        {"check": "references", "column": "service_id", "table": "dim_service", "key": "service_id"},
+        {"check": "min_coverage", "column": "service_id", "table": "dim_service", "key": "service_id",
+         "threshold": 0.9},
+        {"check": "max_null_fraction", "column": "gross_charge", "threshold": 0.1},
+        {"check": "positive", "column": "gross_charge"}
+    ]
+}
+
+
+@pytest.mark.parametrize("batch_rows", [1, 3, 4])
+@pytest.mark.parametrize("stored", [False, True])
+def test_batched_scan_matches_single_batch(tables, tmp_path, monkeypatch, batch_rows, stored):
+    expected = check_tables(tables, RULES)
+    if stored:
+        # A partitioned Parquet directory, so batches also span files
+        tables["fact_prices"].assign(part=np.arange(10) % 3).to_parquet(tmp_path / "fact_prices", partition_cols=["part"])
+        tables["dim_service"].to_parquet(tmp_path / "dim_service.parquet")
+        tables = {"dim_service": tmp_path / "dim_service.parquet", "fact_prices": tmp_path / "fact_prices"}
+    monkeypatch.setattr(data_quality, "DATA_QUALITY_BATCH_ROWS", batch_rows)
+    
+    report = check_tables(tables, RULES)
+    
+    assert report["tables"] == expected["tables"]
+
+
+def test_enforce_raises_only_on_error_failures(tables):
+    warn_only = {"fact_prices": [
+        {"check": "references", "column": "service_id", "table": "dim_service", "key": "service_id",
+         "severity": "warn"},
+        {"check": "not_null", "column": "price_id"}
+    ]}
+    report = check_tables(tables, warn_only)
+    
+    assert [r["status"] for r in report["tables"]["fact_prices"]["checks"]] == ["warn", "pass"]
+    assert report["passed"] and not failures(report)
+    enforce(report)
+    
+    report = check_tables(tables, {"fact_prices": warn_only["fact_prices"] + [
+        {"check": "unique", "column": "service_id"}
+    ]})
+    
+    with pytest.raises(DataQualityError, match="1 data quality check"):
+        enforce(report)
+
+
+def test_unknown_check_or_table_is_rejected(tables):
+    with pytest.raises(ValueError, match="Unknown data quality check"):
+        check_tables(tables, {"fact_prices": [{"check": "sorted", "column": "price_id"}]})
+    with pytest.raises(ValueError, match="unknown table"):
+        check_tables(tables, {"fact_prices": [
+            {"check": "references", "column": "service_id", "table": "dim_provider", "key": "provider_id"}
+        ]})
@@ -0,0 +1,144 @@
+"""
+Tests for 01_download_data.py against a local HTTP server
+"""
+
+import json
+import re
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(download_data, monkeypatch):
+    # Write bodies in small chunks, so a dropped connection leaves the bytes before it
+    monkeypatch.setattr(download_data, "DOWNLOAD_CHUNK_BYTES", 1024)
+
+
+def test_resumes_dropped_connection_with_if_range(download_data, server, tmp_path):
+    body = bytes(range(256)) * 400
+    server.publish("/data.csv", body, '"v1"')
+    server.drop_after["/data.csv"] = 30_000
+    destination = tmp_path / "data.csv"
+    
+    entry = download_data.download_file(server.url("/data.csv"), destination, retries=2, backoff=0)
+    
+    assert destination.read_bytes() == body
+    assert entry["etag"] == '"v1"'
+    resumed = server.requests[1][1]
+    assert re.fullmatch(r"bytes=[1-9]\d*-", resumed["Range"])
+    assert resumed["If-Range"] == '"v1"'
+    assert not download_data.part_path(destination).exists()
+    assert not download_data.validator_path(download_data.part_path(destination)).exists()
+
+
+def test_part_file_from_earlier_run_not_spliced_after_change(download_data, server, tmp_path):
+    old, new = b"a" * 50_000, b"b" * 60_000
+    server.publish("/data.csv", old, '"v1"')
+    server.drop_after["/data.csv"] = 20_000
+    destination = tmp_path / "data.csv"
+    
+    # First run fails part-way, leaving a .part file and its validator
+    assert download_data.download_file(server.url("/data.csv"), destination, retries=0, backoff=0) is None
+    assert 0 < download_data.part_path(destination).stat().st_size <= 20_000
+    
+    # The file changes before the next run resumes
+    server.publish("/data.csv", new, '"v2"')
+    entry = download_data.download_file(server.url("/data.csv"), destination, retries=0, backoff=0)
+    
+    assert destination.read_bytes() == new
+    assert entry["etag"] == '"v2"'
+    assert server.requests[-1][1]["If-Range"] == '"v1"'
+
+
+def test_part_file_without_validator_restarts_from_zero(download_data, server, tmp_path):
+    body = b"c" * 40_000
+    server.publish("/data.csv", body, '"v2"')
+    destination = tmp_path / "data.csv"
+    download_data.part_path(destination).write_bytes(b"stale" * 1000)
+    
+    download_data.download_file(server.url("/data.csv"), destination, retries=0, backoff=0)
+    
+    assert destination.read_bytes() == body
+    assert "Range" not in server.requests[-1][1]
+
+
+@pytest.fixture
+def manifest_file(download_data, tmp_path, monkeypatch):
+    manifest_file = tmp_path / "download_manifest.json"
+    monkeypatch.setattr(download_data, "DOWNLOAD_MANIFEST", manifest_file)
+    return manifest_file
+
+
+def test_unchanged_source_costs_one_304(download_data, server, tmp_path, manifest_file):
+    body = b"x" * 10_000
+    server.publish("/2024_outpatient.csv", body, '"v1"')
+    destination = tmp_path / "outpatient.csv"
+    jobs = [{"url": server.url("/2024_outpatient.csv"), "destination": destination, "description": "OPPS"}]
+    
+    assert download_data.download_all(jobs, retries=0) == {destination: True}
+    entry = json.loads(manifest_file.read_text())["outpatient.csv"]
+    assert entry["etag"] == '"v1"'
+    assert entry["content_length"] == len(body)
+    assert entry["source_filename"] == "2024_outpatient.csv"
+    assert entry["size"] == len(body) and entry["hash"]
+    mtime = destination.stat().st_mtime_ns
+    
+    assert download_data.download_all(jobs, retries=0) == {destination: True}
+    
+    assert len(server.requests) == 2
+    assert server.requests[-1][1]["If-None-Match"] == '"v1"'
+    assert destination.read_bytes() == body
+    assert destination.stat().st_mtime_ns == mtime
+    assert json.loads(manifest_file.read_text())["outpatient.csv"] == entry
+
+
+def test_changed_source_replaces_file_and_manifest_entry(download_data, server, tmp_path, manifest_file):
+    destination = tmp_path / "outpatient.csv"
+    jobs = [{"url": server.url("/outpatient.csv"), "destination": destination, "description": "OPPS"}]
+    server.publish("/outpatient.csv", b"old" * 1000, '"v1"')
+    download_data.download_all(jobs, retries=0)
+    
+    server.publish("/outpatient.csv", b"new" * 2000, '"v2"')
+    assert download_data.download_all(jobs, retries=0) == {destination: True}
+    
+    assert server.requests[-1][1]["If-None-Match"] == '"v1"'
+    assert destination.read_bytes() == b"new" * 2000
+    entry = json.loads(manifest_file.read_text())["outpatient.csv"]
+    assert entry["etag"] == '"v2"'
+    assert entry["size"] == 6000
+
+
+def test_local_edit_or_force_downloads_unconditionally(download_data, server, tmp_path, manifest_file):
+    body = b"y" * 5000
+    destination = tmp_path / "outpatient.csv"
+    jobs = [{"url": server.url("/outpatient.csv"), "destination": destination, "description": "OPPS"}]
+    server.publish("/outpatient.csv", body, '"v1"')
+    download_data.download_all(jobs, retries=0)
+    
+    # The manifest no longer describes the local copy, so a 304 would keep a corrupt file
+    destination.write_bytes(b"truncated")
+    download_data.download_all(jobs, retries=0)
+    assert "If-None-Match" not in server.requests[-1][1]
+    assert destination.read_bytes() == body
+    
+    download_data.download_all(jobs, retries=0, force=True)
+    assert "If-None-Match" not in server.requests[-1][1]
+
+
+def test_failed_redownload_keeps_previous_copy_without_failing(download_data, server, tmp_path, manifest_file, monkeypatch):
+    kept, missing = tmp_path / "kept.csv", tmp_path / "missing.csv"
+    kept.write_text("previous copy")
+    jobs = [
+        {"url": server.url(f"/{destination.name}"), "destination": destination, "description": destination.name}
+        for destination in [kept, missing]
+    ]
+    monkeypatch.setattr(download_data, "RAW_DATA_DIR", tmp_path)
+    monkeypatch.setattr(download_data, "hospital_mrf_jobs", lambda: [])
+    monkeypatch.setattr(download_data, "cms_download_jobs", lambda: jobs[:1])
+    
+    # The server has neither file, so both downloads fail
+    assert download_data.main(["--retries", "0"]) == 0
+    assert kept.read_text() == "previous copy"
+    
+    monkeypatch.setattr(download_data, "cms_download_jobs", lambda: jobs)
+    assert download_data.main(["--retries", "0"]) == 1
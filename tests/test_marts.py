@@ -0,0 +1,165 @@
+"""
+Tests for the analytics marts in 05_build_marts.py
+"""
+
+import json
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import MARKUP_PERCENTILES, MARTS_NATIONAL
+
+CATEGORIES = {1: "facility", 2: "facility", 3: "imaging", 4: "lab"}
+
+
+@pytest.fixture
+def dims():
+    dim_service = pd.DataFrame({
+        "service_id": list(CATEGORIES),
+        "cpt_hcpcs": ["99283", "99284", "70450", "85025"],
+        "description": ["ER visit 3", "ER visit 4", "CT head", "CBC"],
+        "category": list(CATEGORIES.values())
+    })
+    dim_provider = pd.DataFrame({
+        "provider_id": [1, 2, 3, 4],
+        "hospital_name": ["Alexandria", "Fairfax", "Bethesda", "Baltimore"],
+        "state": ["VA", "VA", "MD", "MD"]
+    })
+    return dim_service, dim_provider
+
+
+@pytest.fixture
+def benchmarks():
+    # 85025 has no MD rate, and a zero rate must not produce an infinite markup
+    rows = [
+        (1, "VA", 400.0), (1, "MD", 450.0), (2, "VA", 700.0), (2, "MD", 0.0),
+        (3, "VA", 180.0), (3, "MD", 200.0), (4, "VA", 8.0)
+    ]
+    df = pd.DataFrame(rows, columns=["service_id", "state", "medicare_rate"])
+    df["benchmark_source"] = np.where(df["service_id"] == 4, "CLFS", "OPPS")
+    df["benchmark_year"] = 2024
+    return df
+
+
+@pytest.fixture
+def fact_prices(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = 600
+    df = pd.DataFrame({
+        "price_id": np.arange(rows),
+        "service_id": rng.integers(1, 5, rows),
+        "provider_id": rng.integers(1, 5, rows),
+        "gross_charge": np.where(rng.random(rows) < 0.1, np.nan, rng.uniform(50, 9000, rows)),
+        "cash_price": rng.uniform(20, 2000, rows),
+        "negotiated_median": rng.uniform(20, 3000, rows)
+    })
+    df.to_parquet(tmp_path / "fact_prices.parquet", index=False)
+    return df
+
+
+@pytest.fixture
+def marts(build_marts, tmp_path, dims, benchmarks, fact_prices):
+    dim_service, dim_provider = dims
+    con = duckdb.connect()
+    aggregates = build_marts.aggregate_markups(con, tmp_path / "fact_prices.parquet", dim_service, dim_provider, benchmarks)
+    return build_marts.split_marts(aggregates, dim_service, dim_provider, benchmarks)
+
+
+def expected_markups(fact_prices, dims, benchmarks, keys, national=True):
+    """Markup statistics of fact_prices grouped by keys, with national rows if state is a key and national is set"""
+    dim_service, dim_provider = dims
+    df = fact_prices.merge(dim_service, on="service_id").merge(dim_provider, on="provider_id")
+    df = df.merge(benchmarks[["service_id", "state", "medicare_rate"]], on=["service_id", "state"], how="left")
+    df["markup"] = df["gross_charge"] / df["medicare_rate"].replace(0, np.nan)
+    
+    frames = [df, df.assign(state=MARTS_NATIONAL)] if "state" in keys and national else [df]
+    grouped = pd.concat(frames, ignore_index=True).groupby(keys)
+    expected = pd.DataFrame({
+        "price_count": grouped.size(),
+        "provider_count": grouped["provider_id"].nunique(),
+        "markup_count": grouped["markup"].count(),
+        "markup_mean": grouped["markup"].mean(),
+        "markup_median": grouped["markup"].median(),
+        **{f"markup_p{round(q * 100)}": grouped["markup"].quantile(q) for q in MARKUP_PERCENTILES}
+    })
+    return expected.reset_index()
+
+
+def compare(mart, expected, keys):
+    columns = list(expected.columns)
+    actual = mart[columns].sort_values(keys, ignore_index=True)
+    expected = expected.sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("mart_name, keys", [
+    ("mart_state_markup", ["state"]),
+    ("mart_category_markup", ["category", "state"]),
+    ("mart_service_markup", ["service_id", "category", "state"]),
+    ("mart_provider_service", ["service_id", "category", "provider_id", "state"])
+])
+def test_grouping_sets_match_pandas_groupby(marts, fact_prices, dims, benchmarks, mart_name, keys):
+    mart = marts[mart_name]
+    
+    national = mart_name != "mart_provider_service"
+    
+    compare(mart, expected_markups(fact_prices, dims, benchmarks, keys, national), keys)
+    assert set(mart["state"]) == ({"VA", "MD", MARTS_NATIONAL} if national else {"VA", "MD"})
+
+
+def test_split_marts_labels_rows(marts, fact_prices):
+    services = marts["mart_service_markup"]
+    providers = marts["mart_provider_service"]
+    
+    assert services["cpt_hcpcs"].notna().all()
+    assert set(services.loc[services["cpt_hcpcs"] == "85025", "benchmark_source"]) == {"CLFS"}
+    # No MD rate for 85025 and a zero MD rate for 99284: priced, but without a markup
+    no_rate = services[services["cpt_hcpcs"].isin(["85025", "99284"]) & (services["state"] == "MD")]
+    assert (no_rate["price_count"] > 0).all() and (no_rate["markup_count"] == 0).all()
+    assert providers["hospital_name"].notna().all()
+    assert providers["price_count"].sum() == len(fact_prices)
+    with_rate = providers["medicare_rate"].notna() & providers["negotiated_median"].isna()
+    assert (providers.loc[with_rate, "allowed_estimate"] == providers.loc[with_rate, "medicare_rate"]).all()
+
+
+def test_severity_and_buckets_count_every_markup(marts, build_marts):
+    states = marts["mart_state_markup"]
+    severities = [f"{level}_count" for level in ["critical", "high", "moderate", "fair"]]
+    buckets = [col for col, _, _ in build_marts._bucket_columns()]
+    
+    assert (states[severities].sum(axis=1) == states["markup_count"]).all()
+    assert (states[buckets].sum(axis=1) == states["markup_count"]).all()
+    assert states["severity"].tolist() == [build_marts.severity(markup) for markup in states["markup_median"]]
+
+
+def test_website_extract_keeps_the_shape_app_js_reads(marts, build_marts, tmp_path):
+    output_file = tmp_path / "website" / "marts.json"
+    
+    build_marts.export_website_marts(marts, output_file)
+    extract = json.loads(output_file.read_text())
+    
+    assert set(extract["nationalPercentiles"]) == {f"p{round(q * 100)}" for q in MARKUP_PERCENTILES}
+    assert set(extract["severityThresholds"]) == {"critical", "high", "moderate"}
+    assert len(extract["markupBucketEdges"]) == 4
+    assert set(extract["stateBenchmarks"]) == {"VA", "MD"}
+    
+    categories = marts["mart_category_markup"].set_index(["category", "state"])
+    services = marts["mart_service_markup"].set_index(["cpt_hcpcs", "state"])
+    for state, benchmark in extract["stateBenchmarks"].items():
+        assert set(benchmark) == {"state", "avgMultiplier", "byCpt", "byCategory"}
+        assert all(isinstance(value, float) for value in benchmark["byCpt"].values())
+        for cpt, value in benchmark["byCpt"].items():
+            assert value == build_marts._number(services.loc[(cpt, state), "markup_mean"])
+        for category, values in benchmark["byCategory"].items():
+            assert set(values) == {"stateAvg", "nationalMedian", "percentile75"}
+            assert values == {
+                "stateAvg": build_marts._number(categories.loc[(category, state), "markup_mean"]),
+                "nationalMedian": build_marts._number(categories.loc[(category, MARTS_NATIONAL), "markup_median"]),
+                "percentile75": build_marts._number(categories.loc[(category, MARTS_NATIONAL), "markup_p75"])
+            }
+    # A service or category without any markup in a state is left out, so app.js keeps its fallback
+    assert "85025" not in extract["stateBenchmarks"]["MD"]["byCpt"]
+    assert set(extract["stateBenchmarks"]["MD"]["byCategory"]) == {"facility", "imaging"}
+    assert set(extract["stateBenchmarks"]["VA"]["byCategory"]) == {"facility", "imaging", "lab"}
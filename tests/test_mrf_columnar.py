@@ -0,0 +1,66 @@
+"""
+Tests for the columnar (Parquet) MRF copies in 02_process_mrf.py
+"""
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import write_inova_mrf, write_json_mrf
+
+CODES = {"99283", "70450", "J1885", "10007"}
+
+
+@pytest.fixture
+def columnar_dir(process_mrf, tmp_path, monkeypatch):
+    columnar_dir = tmp_path / "columnar"
+    monkeypatch.setattr(process_mrf, "MRF_COLUMNAR_DIR", columnar_dir)
+    # Small row groups, so a code filter has row groups to skip
+    monkeypatch.setattr(process_mrf, "MRF_COLUMNAR_ROW_GROUP_ROWS", 250)
+    return columnar_dir
+
+
+def by_code(df):
+    return df.sort_values("code", kind="stable", ignore_index=True)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+def test_filtered_columnar_read_matches_filtered_parse(process_mrf, tmp_path, columnar_dir, engine):
+    mrf_file = write_inova_mrf(tmp_path / "inova_alexandria_mrf.csv", rows=4000)
+    expected = process_mrf.parse_inova_csv_mrf(mrf_file, chunk_rows=700, codes=CODES, engine=engine)
+    
+    path = process_mrf.convert_mrf_to_columnar(mrf_file, chunk_rows=700, engine=engine)
+    df = process_mrf.read_columnar_mrf(path, codes=CODES)
+    
+    assert set(df["code"]) == CODES
+    assert pq.ParquetFile(path).metadata.num_row_groups > 1
+    pd.testing.assert_frame_equal(df, by_code(expected))
+
+
+def test_negotiated_rates_survive_the_round_trip(process_mrf, tmp_path, columnar_dir):
+    mrf_file = write_json_mrf(tmp_path / "inova_fairfax_mrf.json", items=1500)
+    expected = by_code(process_mrf.parse_json_mrf(mrf_file))
+    
+    df = process_mrf.read_columnar_mrf(process_mrf.convert_mrf_to_columnar(mrf_file))
+    
+    assert df["negotiated_rates"].dtype == process_mrf.NEGOTIATED_RATES_DTYPE
+    assert df["negotiated_rates"].tolist() == expected["negotiated_rates"].tolist()
+    assert (df["negotiated_rates"].list.len() == 0).any() and (df["negotiated_rates"].list.len() > 5).any()
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_copy_is_rebuilt_only_when_the_raw_file_changes(process_mrf, tmp_path, columnar_dir):
+    mrf_file = write_inova_mrf(tmp_path / "inova_alexandria_mrf.csv", rows=1000)
+    path = process_mrf.convert_mrf_to_columnar(mrf_file)
+    written = path.stat().st_mtime_ns
+    
+    assert process_mrf.convert_mrf_to_columnar(mrf_file) == path
+    assert path.stat().st_mtime_ns == written
+    
+    write_inova_mrf(mrf_file, rows=1200, seed=1)
+    process_mrf.convert_mrf_to_columnar(mrf_file)
+    
+    pd.testing.assert_frame_equal(
+        process_mrf.read_columnar_mrf(path, codes=CODES),
+        by_code(process_mrf.parse_inova_csv_mrf(mrf_file, codes=CODES))
+    )
@@ -0,0 +1,179 @@
+"""
+Tests for the CSV MRF parser in 02_process_mrf.py
+"""
+
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from conftest import write_inova_mrf
+
+
+def reference_records(file_path):
+    """Charge records as the original row-by-row parser extracted them"""
+    df = pd.read_csv(file_path, skiprows=3, dtype=str, encoding="latin-1")
+    records = []
+    
+    def number(value):
+        try:
+            return float(value) if pd.notna(value) else None
+        except ValueError:
+            return None
+    
+    for _, row in df.iterrows():
+        code = str(row.iloc[3]) if pd.notna(row.iloc[3]) else ""
+        if not code or code == "nan":
+            continue
+        
+        rates = []
+        for col_idx in range(12, min(len(row), 100), 3):
+            rate = number(row.iloc[col_idx])
+            if rate is not None and 0 < rate < 100000:
+                rates.append(rate)
+        
+        records.append({
+            "code": code.strip(),
+            "description": str(row.iloc[0]).strip() if pd.notna(row.iloc[0]) else "",
+            "revenue_code": str(row.iloc[1]) if pd.notna(row.iloc[1]) else "",
+            "code_type": str(row.iloc[4]) if pd.notna(row.iloc[4]) else "",
+            "gross_charge": number(row.iloc[9]),
+            "cash_price": number(row.iloc[11]),
+            "negotiated_rates": rates
+        })
+    
+    return pd.DataFrame(records)
+
+
+@pytest.fixture
+def mrf_file(tmp_path):
+    return write_inova_mrf(tmp_path / "inova_test_mrf.csv", rows=2000)
+
+
+def test_vectorized_parse_matches_row_by_row_reference(process_mrf, mrf_file):
+    expected = reference_records(mrf_file)
+    result = process_mrf.parse_inova_csv_mrf(mrf_file)
+    
+    assert len(result) == len(expected) > 0
+    for col in ["code", "description", "revenue_code", "code_type"]:
+        assert result[col].tolist() == expected[col].tolist(), col
+    for col in ["gross_charge", "cash_price"]:
+        pd.testing.assert_series_equal(
+            result[col], expected[col].astype("float64"), check_names=False, check_index=False
+        )
+    assert result["negotiated_rates"].tolist() == expected["negotiated_rates"].tolist()
+
+
+@pytest.mark.parametrize("chunk_rows", [37, 500])
+def test_chunked_parse_matches_whole_file(process_mrf, mrf_file, chunk_rows):
+    baseline = process_mrf.parse_inova_csv_mrf(mrf_file)
+    chunked = process_mrf.parse_inova_csv_mrf(mrf_file, chunk_rows=chunk_rows)
+    
+    pd.testing.assert_frame_equal(chunked, baseline)
+
+
+def write_straddling_mrf(path):
+    """MRF whose middle row has a long quoted description full of newlines and commas"""
+    header = "hospital_name,last_updated_on,version\nInova Alexandria Hospital,2024-01-01,2.0\nmeta\n"
+    columns = "description,revenue_code,setting,code,code_type,x5,x6,x7,x8,gross,dmin,cash,p0,p1,p2\n"
+    long_description = '"' + "line, with ""quotes""\n" * 200 + '"'
+    rows = [
+        "CT HEAD,0450,RC,70450,CPT,,,,,100.00,,80.00,50.00,,\n",
+        f"{long_description},0450,RC,99283,CPT,,,,,200.00,,150.00,75.00,,\n",
+        "ER VISIT,0450,RC,99285,CPT,,,,,300.00,,250.00,125.00,,\n"
+    ]
+    path.write_bytes((header + columns + "".join(rows)).encode("latin-1"))
+    return path
+
+
+def test_split_moves_boundary_past_quoted_multiline_row(process_mrf, tmp_path):
+    mrf_file = write_straddling_mrf(tmp_path / "inova_split_mrf.csv")
+    data = mrf_file.read_bytes()
+    start = process_mrf._find_data_offset(mrf_file)
+    long_row_start = data.index(b"\n", start) + 1
+    last_row_start = data.index(b"ER VISIT")
+    
+    # The midpoint target falls inside the long row's quoted description
+    target = start + (len(data) - start) // 2
+    assert long_row_start < target < last_row_start
+    
+    ranges = process_mrf._split_byte_ranges(mrf_file, start, parts=2, block_size=64)
+    
+    assert ranges == [(start, last_row_start), (last_row_start, len(data))]
+
+
+def test_split_ranges_are_row_aligned(process_mrf, tmp_path):
+    mrf_file = write_inova_mrf(tmp_path / "inova_split_mrf.csv", rows=3000, seed=3)
+    start = process_mrf._find_data_offset(mrf_file)
+    
+    ranges = process_mrf._split_byte_ranges(mrf_file, start, parts=16, block_size=256)
+    
+    assert ranges[0][0] == start and ranges[-1][1] == mrf_file.stat().st_size
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    
+    layout = process_mrf.get_mrf_layout(mrf_file)
+    pieces = [
+        part for range_start, range_end in ranges
+        for part in process_mrf._parse_byte_range(mrf_file, range_start, range_end, layout, None, None)[0]
+    ]
+    pd.testing.assert_frame_equal(
+        pd.concat(pieces, ignore_index=True), process_mrf.parse_inova_csv_mrf(mrf_file)
+    )
+
+
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+def test_parallel_byte_ranges_match_serial_parse(process_mrf, tmp_path, engine):
+    mrf_file = write_straddling_mrf(tmp_path / "inova_split_mrf.csv")
+    serial = process_mrf.parse_inova_csv_mrf(mrf_file, engine=engine)
+    
+    parallel = process_mrf.parse_inova_csv_mrf(mrf_file, workers=2, engine=engine)
+    
+    assert len(serial) == 3
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+@pytest.mark.parametrize("chunk_rows", [None, 250])
+def test_arrow_reader_matches_pandas_reader(process_mrf, mrf_file, chunk_rows):
+    codes = {"99283", "99285", "J1885"}
+    expected = process_mrf.parse_inova_csv_mrf(mrf_file, chunk_rows=chunk_rows, codes=codes)
+    
+    result = process_mrf.parse_inova_csv_mrf(mrf_file, chunk_rows=chunk_rows, codes=codes, engine="arrow")
+    
+    assert set(expected["code"]) == codes
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_code_filter_keeps_only_requested_codes(process_mrf, mrf_file):
+    everything = process_mrf.parse_inova_csv_mrf(mrf_file)
+    
+    filtered = process_mrf.parse_inova_csv_mrf(mrf_file, chunk_rows=300, codes={"99284"})
+    
+    pd.testing.assert_frame_equal(
+        filtered, everything[everything["code"] == "99284"].reset_index(drop=True)
+    )
+
+
+def peak_parse_memory(process_mrf, mrf_file, chunk_rows):
+    """Peak traced allocation while parsing a file with a code filter"""
+    tracemalloc.start()
+    try:
+        process_mrf.parse_inova_csv_mrf(mrf_file, chunk_rows=chunk_rows, codes={"99285"})
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_memory_stays_flat_as_input_grows(process_mrf, tmp_path):
+    small = write_inova_mrf(tmp_path / "inova_small_mrf.csv", rows=5_000, seed=1)
+    large = write_inova_mrf(tmp_path / "inova_large_mrf.csv", rows=40_000, seed=2)
+    peak_parse_memory(process_mrf, small, 2000)  # warm up import-time and layout allocations
+    
+    small_peak = peak_parse_memory(process_mrf, small, 2000)
+    large_peak = peak_parse_memory(process_mrf, large, 2000)
+    whole_file_peak = peak_parse_memory(process_mrf, large, None)
+    
+    # 8x the rows costs little more memory when streamed: only one chunk
+    # plus the few kept records are held at a time
+    assert large.stat().st_size > 7 * small.stat().st_size
+    assert large_peak < 1.5 * small_peak
+    assert whole_file_peak > 3 * large_peak
@@ -0,0 +1,118 @@
+"""
+Tests for incremental MRF processing in 02_process_mrf.py
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import write_inova_mrf
+
+
+@pytest.fixture
+def raw_dir(process_mrf, tmp_path, monkeypatch):
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    monkeypatch.setattr(process_mrf, "RAW_DATA_DIR", raw_dir)
+    monkeypatch.setattr(process_mrf, "MRF_MANIFEST", tmp_path / "mrf_manifest.json")
+    monkeypatch.setattr(process_mrf, "MRF_CACHE_DIR", tmp_path / "mrf_cache")
+    write_inova_mrf(raw_dir / "inova_alexandria_mrf.csv", rows=400, seed=1)
+    write_inova_mrf(raw_dir / "inova_fairfax_mrf.csv", rows=400, seed=2)
+    return raw_dir
+
+
+@pytest.fixture
+def parsed(process_mrf, monkeypatch):
+    """Names of the files parsed, recorded by wrapping process_mrf_file"""
+    parsed = []
+    process_mrf_file = process_mrf.process_mrf_file
+    
+    def spy(mrf_file, *args):
+        parsed.append(mrf_file.name)
+        return process_mrf_file(mrf_file, *args)
+    
+    monkeypatch.setattr(process_mrf, "process_mrf_file", spy)
+    return parsed
+
+
+def test_unchanged_files_reuse_cached_output(process_mrf, raw_dir, parsed):
+    first = process_mrf.process_inova_mrf_files(chunk_rows=100)
+    assert sorted(parsed) == ["inova_alexandria_mrf.csv", "inova_fairfax_mrf.csv"]
+    assert not first.empty
+    
+    # Re-downloading an identical file only moves its mtime
+    os.utime(raw_dir / "inova_fairfax_mrf.csv", ns=(0, 0))
+    parsed.clear()
+    second = process_mrf.process_inova_mrf_files(chunk_rows=100)
+    
+    assert parsed == []
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_changed_file_is_reparsed(process_mrf, raw_dir, parsed):
+    process_mrf.process_inova_mrf_files(chunk_rows=100)
+    write_inova_mrf(raw_dir / "inova_fairfax_mrf.csv", rows=400, seed=3)
+    parsed.clear()
+    
+    result = process_mrf.process_inova_mrf_files(chunk_rows=100)
+    
+    assert parsed == ["inova_fairfax_mrf.csv"]
+    parsed.clear()
+    pd.testing.assert_frame_equal(result, process_mrf.process_inova_mrf_files(chunk_rows=100, incremental=False))
+    assert sorted(parsed) == ["inova_alexandria_mrf.csv", "inova_fairfax_mrf.csv"]
+
+
+def test_removed_file_is_forgotten(process_mrf, raw_dir, parsed):
+    process_mrf.process_inova_mrf_files(chunk_rows=100)
+    (raw_dir / "inova_fairfax_mrf.csv").unlink()
+    
+    result = process_mrf.process_inova_mrf_files(chunk_rows=100)
+    
+    assert set(result["ccn"]) == {"490089"}
+    assert list(process_mrf.load_manifest()) == ["inova_alexandria_mrf.csv"]
+    assert [path.name for path in process_mrf.MRF_CACHE_DIR.iterdir()] == ["inova_alexandria_mrf.parquet"]
+
+
+def fail_on(process_mrf, monkeypatch, name):
+    """Make parsing one file raise, as a corrupt download would"""
+    process_mrf_file = process_mrf.process_mrf_file
+    
+    def flaky(mrf_file, *args):
+        if mrf_file.name == name:
+            raise ValueError(f"corrupt {name}")
+        return process_mrf_file(mrf_file, *args)
+    
+    monkeypatch.setattr(process_mrf, "process_mrf_file", flaky)
+
+
+def test_failed_reparse_keeps_last_good_output(process_mrf, raw_dir, monkeypatch):
+    first = process_mrf.process_inova_mrf_files(chunk_rows=100)
+    entry = process_mrf.load_manifest()["inova_fairfax_mrf.csv"]
+    write_inova_mrf(raw_dir / "inova_fairfax_mrf.csv", rows=400, seed=3)
+    
+    with monkeypatch.context() as patch:
+        fail_on(process_mrf, patch, "inova_fairfax_mrf.csv")
+        result = process_mrf.process_inova_mrf_files(chunk_rows=100)
+        
+        pd.testing.assert_frame_equal(result, first)
+        # The old entry stays, so the next run tries the changed file again
+        assert process_mrf.load_manifest()["inova_fairfax_mrf.csv"] == entry
+        
+        # A full re-parse does not fall back to outputs of earlier file versions
+        full = process_mrf.process_inova_mrf_files(chunk_rows=100, incremental=False)
+        assert set(full["ccn"]) == {"490089"}
+    
+    fixed = process_mrf.process_inova_mrf_files(chunk_rows=100)
+    
+    assert process_mrf.load_manifest()["inova_fairfax_mrf.csv"] != entry
+    pd.testing.assert_frame_equal(fixed, process_mrf.process_inova_mrf_files(chunk_rows=100, incremental=False))
+
+
+def test_failed_new_file_is_left_out(process_mrf, raw_dir, monkeypatch):
+    fail_on(process_mrf, monkeypatch, "inova_fairfax_mrf.csv")
+    
+    result = process_mrf.process_inova_mrf_files(chunk_rows=100)
+    
+    assert set(result["ccn"]) == {"490089"}
+    assert list(process_mrf.load_manifest()) == ["inova_alexandria_mrf.csv"]
@@ -0,0 +1,94 @@
+"""
+Tests for the streaming JSON MRF parser in 02_process_mrf.py
+"""
+
+import json
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from conftest import write_json_mrf
+
+
+@pytest.fixture
+def json_file(tmp_path):
+    return write_json_mrf(tmp_path / "inova_fairfax_mrf.json", items=1500)
+
+
+def reference_records(process_mrf, json_file, codes=None):
+    """Records of the whole file decoded at once with json.load"""
+    document = json.loads(json_file.read_text(encoding="utf-8"))
+    return [
+        record for item in document["standard_charge_information"]
+        for record in process_mrf._json_item_records(item, document["hospital_name"], "490063", codes)
+    ]
+
+
+@pytest.mark.parametrize("read_size", [64, 1000, 1 << 20])
+def test_streamed_records_match_whole_document(process_mrf, json_file, read_size):
+    expected = reference_records(process_mrf, json_file)
+    
+    records = list(process_mrf.iter_json_mrf_records(json_file, read_size=read_size))
+    
+    assert len(records) == 1500
+    assert records == expected
+
+
+def test_record_fields(process_mrf, json_file):
+    records = list(process_mrf.iter_json_mrf_records(json_file))
+    
+    assert {record["hospital_name"] for record in records} == {'Inova Fairfax "Main" Hospital'}
+    assert {record["ccn"] for record in records} == {"490063"}
+    assert {record["revenue_code"] for record in records} == {"0450"}
+    assert all(0 < rate < 100000 for record in records for rate in record["negotiated_rates"])
+    assert {record["cash_price"] for record in records} <= {None, 100.5, 12.5}
+    modified = [record for record in records if record["modifier"]]
+    assert modified and all(
+        (record["code"], record["modifier"]) == ("99283", "25") for record in modified
+    )
+
+
+def test_code_filter_matches_filtering_afterwards(process_mrf, json_file):
+    codes = {"99283", "J1885"}
+    everything = process_mrf.parse_json_mrf(json_file)
+    
+    filtered = process_mrf.parse_json_mrf(json_file, codes=codes)
+    
+    assert set(filtered["code"]) == codes
+    pd.testing.assert_frame_equal(
+        filtered, everything[everything["code"].isin(codes)].reset_index(drop=True)
+    )
+
+
+def test_unterminated_array_raises(process_mrf, tmp_path):
+    json_file = tmp_path / "broken_mrf.json"
+    json_file.write_text('{"hospital_name": "X", "standard_charge_information": [{"description": "A"},')
+    
+    with pytest.raises(ValueError):
+        list(process_mrf.iter_json_mrf_records(json_file, read_size=16))
+
+
+def peak_stream_memory(process_mrf, json_file):
+    """Peak traced allocation while streaming every record of a file"""
+    tracemalloc.start()
+    try:
+        for _ in process_mrf.iter_json_mrf_records(json_file, codes={"99285"}, read_size=1 << 16):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_memory_is_constant_in_file_size(process_mrf, tmp_path):
+    small = write_json_mrf(tmp_path / "small_mrf.json", items=2_000, seed=1)
+    large = write_json_mrf(tmp_path / "large_mrf.json", items=16_000, seed=2)
+    peak_stream_memory(process_mrf, small)  # warm up
+    
+    small_peak = peak_stream_memory(process_mrf, small)
+    large_peak = peak_stream_memory(process_mrf, large)
+    
+    # Memory is bounded by one read block plus one item, not the file
+    assert large.stat().st_size > 7 * small.stat().st_size
+    assert large_peak < 1.5 * small_peak
+    assert large_peak < large.stat().st_size / 4
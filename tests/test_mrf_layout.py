@@ -0,0 +1,133 @@
+"""
+Tests for MRF layout inference and caching in mrf_layout.py
+"""
+
+import csv
+import json
+
+import pandas as pd
+import pytest
+
+import mrf_layout
+
+# CMS template: metadata labels, their values, then the column header. The
+# columns are in an order the positional Inova layout would misread.
+CMS_HEADER = [
+    "code|1|type", "code|1", "description", "setting", "code|2", "code|2|type",
+    "standard_charge|Aetna|PPO|negotiated_dollar", "standard_charge|gross",
+    "standard_charge|discounted_cash", "standard_charge|Cigna|HMO|negotiated_dollar",
+    "standard_charge|Aetna|PPO|methodology"
+]
+
+CMS_ROWS = [
+    ["CPT", "99283", "ER visit level 3", "outpatient", "0450", "RC", "812.50", "2400.00", "900", "1200"],
+    ["CPT", "70450", "CT head", "outpatient", "0350", "RC", "", "3100.5", "", "950", "fee schedule"],
+    ["HCPCS", " j1885 ", "Ketorolac", "outpatient", "", "", "n/a", "45", "12.5", "150000", ""]
+]
+
+
+def write_cms_mrf(path, metadata=None, header=CMS_HEADER, rows=CMS_ROWS):
+    metadata = metadata or {
+        "hospital_name": "Inova Mount Vernon Hospital",
+        "last_updated_on": "2024-07-01",
+        "version": "2.2.0",
+        "hospital_location": "Alexandria, VA",
+        "medicare_provider_number": "490122"
+    }
+    with open(path, "w", newline="", encoding="latin-1") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(metadata))
+        writer.writerow(list(metadata.values()))
+        writer.writerow(["", "", "", "attestation: true"])
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+def test_cms_template_columns_are_resolved_by_name(tmp_path):
+    layout = mrf_layout.get_mrf_layout(write_cms_mrf(tmp_path / "inova_alexandria_mrf.csv"))
+    
+    assert layout["source"] == "header"
+    assert layout["description"] == "description"
+    assert layout["codes"] == [["code|1", "code|1|type"], ["code|2", "code|2|type"]]
+    assert layout["gross_charge"] == "standard_charge|gross"
+    assert layout["cash_price"] == "standard_charge|discounted_cash"
+    assert layout["rates"] == [
+        "standard_charge|Aetna|PPO|negotiated_dollar", "standard_charge|Cigna|HMO|negotiated_dollar"
+    ]
+    assert mrf_layout.layout_usecols(layout) == [
+        name for name in CMS_HEADER if not name.endswith(("setting", "methodology"))
+    ]
+
+
+def test_hospital_name_and_ccn_come_from_the_metadata(tmp_path):
+    # The file name points at Inova Alexandria (490089); the metadata wins
+    layout = mrf_layout.get_mrf_layout(write_cms_mrf(tmp_path / "inova_alexandria_mrf.csv"))
+    
+    assert (layout["hospital_name"], layout["ccn"]) == ("Inova Mount Vernon Hospital", "490122")
+
+
+def test_missing_metadata_falls_back_to_the_configured_hospital(tmp_path):
+    mrf_file = write_cms_mrf(tmp_path / "inova_alexandria_mrf.csv", metadata={"version": "2.2.0", "notes": ""})
+    
+    layout = mrf_layout.get_mrf_layout(mrf_file)
+    
+    assert layout["ccn"] == "490089"
+    assert layout["hospital_name"] == mrf_layout.default_hospital_name(mrf_file)
+
+
+def test_cms_template_file_parses_by_column_name(process_mrf, tmp_path):
+    mrf_file = write_cms_mrf(tmp_path / "inova_alexandria_mrf.csv")
+    
+    df = process_mrf.parse_inova_csv_mrf(mrf_file).set_index("code")
+    
+    assert sorted(df.index) == ["70450", "99283", "J1885"]
+    assert set(df["hospital_name"]) == {"Inova Mount Vernon Hospital"} and set(df["ccn"]) == {"490122"}
+    assert df.loc["99283", ["gross_charge", "cash_price"]].tolist() == [2400.0, 900.0]
+    assert df.loc["99283", "negotiated_rates"] == [812.5, 1200.0]
+    assert df.loc["99283", "revenue_code"] == "0450"
+    # Out-of-bounds and non-numeric rates are dropped
+    assert df.loc["J1885", "negotiated_rates"] == []
+    assert pd.isna(df.loc["70450", "cash_price"])
+
+
+def test_cached_layout_is_reused_until_the_header_changes(tmp_path, monkeypatch):
+    mrf_file = write_cms_mrf(tmp_path / "inova_alexandria_mrf.csv")
+    layout = mrf_layout.get_mrf_layout(mrf_file)
+    
+    inferred = []
+    monkeypatch.setattr(mrf_layout, "infer_layout", lambda *args: inferred.append(args) or layout)
+    assert mrf_layout.get_mrf_layout(mrf_file) == layout
+    assert not inferred
+    
+    write_cms_mrf(mrf_file, header=CMS_HEADER[:-1] + ["extra"])
+    mrf_layout.get_mrf_layout(mrf_file)
+    assert len(inferred) == 1
+    assert len(json.loads(mrf_layout.MRF_LAYOUT_CACHE.read_text())) == 2
+
+
+def test_cache_is_replaced_atomically(tmp_path):
+    cache = mrf_layout.MRF_LAYOUT_CACHE
+    cache.write_text("{ not json")
+    
+    mrf_layout.get_mrf_layout(write_cms_mrf(tmp_path / "inova_alexandria_mrf.csv"))
+    
+    # An unreadable cache is ignored and rewritten whole; no temporary file is left behind
+    assert len(json.loads(cache.read_text())) == 1
+    assert sorted(path.name for path in cache.parent.iterdir() if path.name.startswith(cache.name)) == [cache.name]
+
+
+def test_failed_cache_write_keeps_the_previous_cache(tmp_path, monkeypatch):
+    cache = mrf_layout.MRF_LAYOUT_CACHE
+    mrf_layout.get_mrf_layout(write_cms_mrf(tmp_path / "inova_alexandria_mrf.csv"))
+    before = cache.read_text()
+    
+    def failing_dump(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(mrf_layout.json, "dump", failing_dump)
+    
+    with pytest.raises(OSError):
+        mrf_layout.get_mrf_layout(write_cms_mrf(tmp_path / "inova_fairfax_mrf.csv"))
+    
+    assert cache.read_text() == before
+    assert [path.name for path in cache.parent.iterdir() if path.name.startswith(cache.name)] == [cache.name]
@@ -0,0 +1,66 @@
+"""
+Tests for parsing MRF files in a process pool (02_process_mrf._parse_files)
+"""
+
+import pandas as pd
+import pytest
+
+from conftest import write_inova_mrf, write_json_mrf
+
+
+@pytest.fixture
+def mrf_files(tmp_path):
+    files = [
+        write_inova_mrf(tmp_path / f"hospital_{i}_mrf.csv", rows=300 + 100 * i, seed=i) for i in range(4)
+    ]
+    files.append(write_json_mrf(tmp_path / "inova_fairfax_mrf.json", items=500))
+    # One file large enough to be split across the workers instead of handed to one
+    files.append(write_inova_mrf(tmp_path / "inova_alexandria_mrf.csv", rows=3000, seed=9))
+    return files
+
+
+@pytest.fixture
+def broken_file(tmp_path):
+    broken_file = tmp_path / "broken_mrf.json"
+    broken_file.write_text('{"hospital_name": "X", "standard_charge_information": [{"description": "A"},')
+    return broken_file
+
+
+def combined(results, mrf_files):
+    return pd.concat([results[mrf_file] for mrf_file in mrf_files], ignore_index=True)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+def test_workers_match_a_serial_run(process_mrf, mrf_files, monkeypatch, engine):
+    monkeypatch.setattr(process_mrf, "MRF_SPLIT_BYTES", mrf_files[-1].stat().st_size)
+    serial, serial_failed = process_mrf._parse_files(mrf_files, 200, 1, engine)
+    
+    parallel, parallel_failed = process_mrf._parse_files(mrf_files, 200, 3, engine)
+    
+    assert serial_failed == parallel_failed == []
+    assert set(parallel) == set(mrf_files)
+    for mrf_file in mrf_files:
+        pd.testing.assert_frame_equal(parallel[mrf_file], serial[mrf_file])
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_bad_file_is_reported_without_losing_the_others(process_mrf, mrf_files, broken_file, workers):
+    files = mrf_files[:2] + [broken_file] + mrf_files[2:]
+    
+    results, failed = process_mrf._parse_files(files, 200, workers)
+    
+    assert failed == [broken_file]
+    assert set(results) == set(mrf_files)
+    assert all(not results[mrf_file].empty for mrf_file in mrf_files)
+
+
+def test_pooled_batch_combines_in_file_order(process_mrf, mrf_files, broken_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(process_mrf, "RAW_DATA_DIR", tmp_path)
+    monkeypatch.setattr(process_mrf, "MRF_MANIFEST", tmp_path / "mrf_manifest.json")
+    monkeypatch.setattr(process_mrf, "MRF_CACHE_DIR", tmp_path / "mrf_cache")
+    
+    serial = process_mrf.process_inova_mrf_files(chunk_rows=200, workers=1, incremental=False)
+    parallel = process_mrf.process_inova_mrf_files(chunk_rows=200, workers=3, incremental=False)
+    
+    assert not serial.empty
+    pd.testing.assert_frame_equal(parallel, serial)
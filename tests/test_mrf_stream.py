@@ -0,0 +1,120 @@
+"""
+Tests for streaming remote MRFs (mrf_stream.py and 02_process_mrf.process_mrf_url)
+Compressed MRFs are served by a local HTTP server and parsed as they arrive
+"""
+
+import gzip
+import io
+import types
+import zipfile
+
+import pandas as pd
+import pytest
+
+import mrf_stream
+from conftest import write_inova_mrf, write_json_mrf
+
+
+def zip_bytes(name, data):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Small reads, so the bodies arrive in many pieces; no waiting between retries
+    monkeypatch.setattr(mrf_stream, "DOWNLOAD_CHUNK_BYTES", 1024)
+    monkeypatch.setattr(mrf_stream, "time", types.SimpleNamespace(sleep=lambda seconds: None))
+
+
+@pytest.fixture
+def archive_dir(process_mrf, tmp_path, monkeypatch):
+    archive_dir = tmp_path / "archive"
+    monkeypatch.setattr(process_mrf, "MRF_ARCHIVE_DIR", archive_dir)
+    return archive_dir
+
+
+@pytest.fixture
+def json_mrf(tmp_path):
+    return write_json_mrf(tmp_path / "inova_fairfax_mrf.json", items=2000)
+
+
+@pytest.fixture
+def csv_mrf(tmp_path):
+    return write_inova_mrf(tmp_path / "inova_alexandria_mrf.csv", rows=3000)
+
+
+def test_gzipped_json_stream_matches_local_parse(process_mrf, server, json_mrf):
+    server.publish("/mrf.json.gz", gzip.compress(json_mrf.read_bytes()), '"v1"')
+    expected = process_mrf.filter_to_catalog_services(
+        process_mrf.parse_json_mrf(json_mrf, codes=process_mrf.get_target_codes())
+    )
+    
+    df = process_mrf.process_mrf_url("inova_fairfax", server.url("/mrf.json.gz"))
+    
+    assert len(df) > 0
+    pd.testing.assert_frame_equal(df, expected)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+@pytest.mark.parametrize("compression", ["gzip", "zip"])
+def test_compressed_csv_stream_matches_local_parse(process_mrf, server, csv_mrf, engine, compression):
+    data = csv_mrf.read_bytes()
+    body = gzip.compress(data) if compression == "gzip" else zip_bytes("standardcharges.csv", data)
+    server.publish("/mrf", body, '"v1"')
+    expected = process_mrf.filter_to_catalog_services(
+        process_mrf.parse_inova_csv_mrf(csv_mrf, chunk_rows=500, codes=process_mrf.get_target_codes(), engine=engine)
+    )
+    
+    df = process_mrf.process_mrf_url("inova_alexandria", server.url("/mrf"), chunk_rows=500, engine=engine)
+    
+    assert len(df) > 0
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_dropped_connection_is_resumed_under_the_parser(process_mrf, server, json_mrf):
+    body = gzip.compress(json_mrf.read_bytes())
+    server.publish("/mrf.json.gz", body, '"v1"')
+    expected = process_mrf.process_mrf_url("inova_fairfax", server.url("/mrf.json.gz"))
+    server.drop_after["/mrf.json.gz"] = len(body) // 2
+    
+    df = process_mrf.process_mrf_url("inova_fairfax", server.url("/mrf.json.gz"))
+    
+    pd.testing.assert_frame_equal(df, expected)
+    assert server.requests[-1][1]["Range"].startswith("bytes=")
+    assert server.requests[-1][1]["If-Range"] == '"v1"'
+
+
+def test_archive_keeps_compressed_body_as_received(process_mrf, server, json_mrf, archive_dir):
+    body = gzip.compress(json_mrf.read_bytes())
+    server.publish("/mrf.json.gz", body, '"v1"')
+    
+    process_mrf.process_mrf_url("inova_fairfax", server.url("/mrf.json.gz"), archive=True)
+    
+    assert [path.name for path in archive_dir.iterdir()] == ["inova_fairfax_mrf.gz"]
+    assert (archive_dir / "inova_fairfax_mrf.gz").read_bytes() == body
+
+
+def test_archive_compresses_plain_body(process_mrf, server, csv_mrf, archive_dir):
+    server.publish("/mrf.csv", csv_mrf.read_bytes(), '"v1"')
+    
+    process_mrf.process_mrf_url("inova_alexandria", server.url("/mrf.csv"), archive=True)
+    
+    assert gzip.decompress((archive_dir / "inova_alexandria_mrf.gz").read_bytes()) == csv_mrf.read_bytes()
+
+
+def test_streamed_files_skip_placeholders_and_failures(process_mrf, server, json_mrf, monkeypatch):
+    server.publish("/fairfax.json.gz", gzip.compress(json_mrf.read_bytes()), '"v1"')
+    monkeypatch.setattr(process_mrf, "HOSPITAL_MRF_URLS", {
+        "inova_fairfax": {"url": server.url("/fairfax.json.gz")},
+        "inova_loudoun": {"url": server.url("/missing.json.gz")},
+        "inova_alexandria": {"url": "https://www.inova.org/price-transparency"}
+    })
+    
+    df = process_mrf.process_streamed_mrf_files()
+    
+    assert set(df["hospital_name"]) == {'Inova Fairfax "Main" Hospital'}
+    assert {"negotiated_min", "negotiated_median", "negotiated_max", "payer_count"} <= set(df.columns)
+    assert [path for path, _ in server.requests] == ["/fairfax.json.gz", "/missing.json.gz"]
@@ -0,0 +1,92 @@
+"""
+Tests for the provider registry lookup in provider_registry.py
+"""
+
+import pandas as pd
+import pytest
+
+from provider_registry import build_provider_index, extend_registry, load_registry, resolve_providers
+
+
+@pytest.fixture
+def registry_file(tmp_path):
+    registry_file = tmp_path / "providers.csv"
+    registry_file.write_text(
+        "provider_id,ccn,hospital_name,city,state,zip_code,latitude,longitude\n"
+        "1,490089,Inova Alexandria Hospital,Alexandria,VA,22304,,\n"
+        "2,490007,Inova Fairfax Hospital,Falls Church,VA,22042,,\n"
+        "5,050454,Twin Valley Hospital,Springfield,CA,90001,,\n"
+        "7,360180,Twin Valley Hospital,Springfield,OH,45501,,\n"
+    )
+    return registry_file
+
+
+@pytest.fixture
+def index(registry_file):
+    return build_provider_index(load_registry(registry_file))
+
+
+def resolve(ccns, names, index):
+    return resolve_providers(pd.Series(ccns, dtype=object), pd.Series(names, dtype=object), index).tolist()
+
+
+def test_rows_with_a_ccn_match_by_ccn_only(index):
+    resolved = resolve(
+        ["490089", " 490007 ", "50454", "490089", "999999"],
+        ["Inova Alexandria Hospital", "Some Other Name", "Twin Valley Hospital", "Inova Fairfax Hospital",
+         "Inova Fairfax Hospital"],
+        index
+    )
+    
+    # A CCN that lost its leading zero is padded; a CCN outside the registry never falls back to the name
+    assert resolved == [1, 2, 5, 1, pd.NA]
+
+
+def test_rows_without_a_ccn_match_by_name(index):
+    resolved = resolve(
+        [None, None, "", "n/a"],
+        ["INOVA FAIRFAX HOSPITAL", "Inova  Alexandria Hospital.", "Inova Fairfax Hospital", "Inova Alexandria Hospital"],
+        index
+    )
+    
+    assert resolved == [2, 1, 2, 1]
+
+
+def test_ambiguous_or_unknown_names_stay_unresolved(index):
+    resolved = resolve(
+        [None, None, None],
+        ["Twin Valley Hospital", "Unknown Medical Center", None],
+        index
+    )
+    
+    assert resolved == [pd.NA, pd.NA, pd.NA]
+
+
+def test_resolution_without_a_ccn_column(index):
+    names = pd.Series(["Inova Fairfax Hospital", "Unknown Medical Center"] * 3, index=range(10, 16))
+    
+    resolved = resolve_providers(None, names, index)
+    
+    assert resolved.index.equals(names.index)
+    assert resolved.tolist() == [2, pd.NA] * 3
+
+
+def test_extend_registry_keeps_existing_provider_ids(registry_file):
+    before = load_registry(registry_file)
+    providers = pd.DataFrame({
+        "ccn": ["490007", "490118", "50001", "not a ccn", "490118", "490011"],
+        "hospital_name": ["Renamed Fairfax", " New Hospital B ", "New Hospital A", "Bad", "Duplicate", "New Hospital C"],
+        "state": ["VA", "VA", "CA", "VA", "VA", "VA"]
+    })
+    
+    added = extend_registry(providers, registry_file)
+    after = load_registry(registry_file)
+    
+    assert added == 3
+    pd.testing.assert_frame_equal(after.head(len(before)), before)
+    new = after.iloc[len(before):]
+    assert new["provider_id"].tolist() == [8, 9, 10]
+    assert new["ccn"].tolist() == ["050001", "490011", "490118"]
+    assert new["hospital_name"].tolist() == ["New Hospital A", "New Hospital C", "New Hospital B"]
+    assert extend_registry(providers, registry_file) == 0
+    pd.testing.assert_frame_equal(load_registry(registry_file), after)
@@ -0,0 +1,81 @@
+"""
+Tests for quantile_sketch.py
+"""
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from quantile_sketch import build_sketches, merge_sketches, sketch_counts, sketch_quantiles
+
+ACCURACY = 0.01
+QUANTILES = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+@pytest.fixture
+def groups():
+    """Lognormal rates for a few groups of very different sizes, with an empty group"""
+    rng = np.random.default_rng(7)
+    sizes = [1, 2, 5, 37, 1000, 20_000, 0]
+    return [rng.lognormal(mean=6, sigma=1.5, size=size) for size in sizes]
+
+
+def sketch_groups(groups):
+    values = np.concatenate(groups)
+    rows = np.repeat(np.arange(len(groups)), [len(group) for group in groups])
+    return build_sketches(values, rows, len(groups), ACCURACY)
+
+
+def test_quantiles_within_accuracy_of_numpy(groups):
+    estimates = sketch_quantiles(sketch_groups(groups), QUANTILES, ACCURACY)
+    
+    for group, estimate in zip(groups, estimates):
+        if not len(group):
+            assert np.isnan(estimate).all()
+            continue
+        exact = np.quantile(group, QUANTILES)
+        assert np.max(np.abs(estimate - exact) / exact) <= ACCURACY
+
+
+def test_non_positive_values_are_left_out():
+    values = np.array([-3.0, 0.0, np.nan, 10.0, 20.0])
+    
+    sketches = build_sketches(values, np.zeros(5), 1, ACCURACY)
+    
+    assert sketch_counts(sketches).tolist() == [2]
+    assert sketch_quantiles(sketches, [0.5], ACCURACY)[0, 0] == pytest.approx(15, rel=ACCURACY)
+
+
+def test_merging_split_sketches_equals_sketch_of_all_values(groups):
+    values = np.concatenate(groups)
+    whole = build_sketches(values, np.zeros(len(values)), 1, ACCURACY)
+    
+    # Sketch the values in uneven shuffled parts, then merge them in another order
+    rng = np.random.default_rng(11)
+    parts = rng.integers(0, 9, size=len(values))
+    split = build_sketches(values, parts, 9, ACCURACY)
+    order = rng.permutation(9)
+    merged = merge_sketches(split.take(pa.array(order)), np.zeros(9), 1)
+    
+    assert merged.equals(whole)
+    assert sketch_counts(merged).tolist() == [len(values)]
+    np.testing.assert_array_equal(
+        sketch_quantiles(merged, QUANTILES, ACCURACY), sketch_quantiles(whole, QUANTILES, ACCURACY)
+    )
+
+
+def test_merge_is_associative(groups):
+    sketches = sketch_groups(groups)
+    
+    # ((g0 + g1) + (g2 + g3)) + ... against every group at once
+    pairs = merge_sketches(sketches, np.arange(len(groups)) // 2, (len(groups) + 1) // 2)
+    nested = merge_sketches(pairs, np.zeros(len(pairs)), 1)
+    flat = merge_sketches(pa.chunked_array([sketches[:3], sketches[3:]]), np.zeros(len(groups)), 1)
+    
+    assert nested.equals(flat)
+    assert sketch_counts(flat).tolist() == [sum(len(group) for group in groups)]
+
+
+def test_invalid_accuracy_raises():
+    with pytest.raises(ValueError):
+        build_sketches(np.array([1.0]), np.zeros(1), 1, 1.5)
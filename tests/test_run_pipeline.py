@@ -0,0 +1,147 @@
+"""
+Tests for the stage runner in scripts/run_pipeline.py
+The runner is pointed at small stage scripts written to a scratch directory
+"""
+
+import sys
+import time
+
+import pytest
+
+STAGE_SCRIPT = '''
+from pathlib import Path
+
+def main(argv=None):
+    with open({log!r}, "a") as log:
+        log.write({name!r} + " " + " ".join(argv or []) + "\\n")
+    if Path({fail!r}).exists():
+        return 1
+    Path({output!r}).parent.mkdir(parents=True, exist_ok=True)
+    Path({output!r}).write_text(Path({source!r}).read_text().upper() + " ".join(argv or []))
+    return 0
+'''
+
+
+@pytest.fixture
+def pipeline(run_pipeline, tmp_path, monkeypatch):
+    """Three stages: an opt-in fetch, a build from its file and a report from the build"""
+    etl_dir = tmp_path / "etl"
+    etl_dir.mkdir()
+    files = {
+        "remote": tmp_path / "remote.txt",
+        "raw": tmp_path / "raw" / "source.txt",
+        "built": tmp_path / "out" / "built.txt",
+        "report": tmp_path / "out" / "report.txt",
+        "log": tmp_path / "calls.log"
+    }
+    files["remote"].write_text("v1")
+    
+    stages = []
+    for name, deps, source, output in [
+        ("fetch", [], files["remote"], files["raw"]),
+        ("build", ["fetch"], files["raw"], files["built"]),
+        ("report", ["build"], files["built"], files["report"])
+    ]:
+        (etl_dir / f"stage_{name}.py").write_text(STAGE_SCRIPT.format(
+            log=str(files["log"]), name=name, fail=str(tmp_path / f"fail_{name}"),
+            output=str(output), source=str(source)
+        ))
+        stages.append({
+            "name": name,
+            "title": name,
+            "script": f"stage_{name}.py",
+            "module": f"test_pipeline_stage_{name}",
+            "deps": deps,
+            "inputs": [source] if deps else [],
+            "outputs": [output],
+            **({"opt_in": True} if not deps else {})
+        })
+    
+    monkeypatch.setattr(run_pipeline, "ETL_DIR", etl_dir)
+    monkeypatch.setattr(run_pipeline, "STAGES", stages)
+    monkeypatch.setattr(run_pipeline, "STAGE_NAMES", [stage["name"] for stage in stages])
+    monkeypatch.setattr(run_pipeline, "PIPELINE_STATE_FILE", tmp_path / "pipeline_state.json")
+    monkeypatch.setattr(run_pipeline, "PROJECT_ROOT", tmp_path)
+    
+    def calls():
+        return files["log"].read_text().splitlines() if files["log"].exists() else []
+    
+    files["calls"] = calls
+    yield files
+    
+    for stage in stages:
+        sys.modules.pop(stage["module"], None)
+
+
+def test_second_run_with_nothing_changed_runs_no_stage(run_pipeline, pipeline):
+    assert run_pipeline.run_pipeline(download=True) == ["fetch", "build", "report"]
+    
+    started = time.perf_counter()
+    assert run_pipeline.run_pipeline() == []
+    assert time.perf_counter() - started < 1
+    
+    assert len(pipeline["calls"]()) == 3
+
+
+def test_download_stage_runs_only_when_asked_for(run_pipeline, pipeline):
+    pipeline["raw"].parent.mkdir()
+    pipeline["raw"].write_text("local")
+    
+    assert run_pipeline.run_pipeline() == ["build", "report"]
+    assert run_pipeline.run_pipeline(force=True) == ["build", "report"]
+    assert run_pipeline.run_pipeline(start="build") == ["build", "report"]
+    
+    # A new remote version reaches the later stages once downloaded
+    pipeline["remote"].write_text("v2")
+    assert run_pipeline.run_pipeline(download=True) == ["fetch", "build", "report"]
+    assert pipeline["report"].read_text() == "V2"
+    assert run_pipeline.run_pipeline(only=["fetch"]) == ["fetch"]
+
+
+def test_changed_input_reruns_stage_and_downstream(run_pipeline, pipeline):
+    run_pipeline.run_pipeline(download=True)
+    
+    pipeline["raw"].write_text("edited")
+    
+    assert run_pipeline.run_pipeline() == ["build", "report"]
+    assert pipeline["report"].read_text() == "EDITED"
+
+
+def test_stage_args_reach_main_and_rerun_the_stage(run_pipeline, pipeline):
+    run_pipeline.run_pipeline(download=True)
+    
+    stage_args = {"build": ["--replace", "--year", "2025"]}
+    assert run_pipeline.run_pipeline(stage_args=stage_args) == ["build", "report"]
+    assert pipeline["calls"]()[-2] == "build --replace --year 2025"
+    assert pipeline["built"].read_text() == "V1--replace --year 2025"
+    assert run_pipeline.run_pipeline(stage_args=stage_args) == []
+
+
+def test_failed_stage_stops_the_run_and_is_retried(run_pipeline, pipeline, tmp_path):
+    run_pipeline.run_pipeline(download=True)
+    pipeline["raw"].write_text("edited")
+    (tmp_path / "fail_build").touch()
+    
+    with pytest.raises(run_pipeline.StageFailed):
+        run_pipeline.run_pipeline()
+    assert pipeline["calls"]()[-1] == "build "
+    
+    (tmp_path / "fail_build").unlink()
+    assert run_pipeline.run_pipeline() == ["build", "report"]
+
+
+def test_parse_stage_args(run_pipeline):
+    args = run_pipeline.parse_args(
+        ["--stage-args", "benchmarks=--replace --year 2025", "--stage-args", "star_schema=--engine duckdb"]
+    )
+    
+    assert args.stage_args == {"benchmarks": ["--replace", "--year", "2025"], "star_schema": ["--engine", "duckdb"]}
+    with pytest.raises(SystemExit):
+        run_pipeline.parse_args(["--stage-args", "nonexistent=--replace"])
+
+
+def test_real_pipeline_skips_download_by_default(run_pipeline, tmp_path, monkeypatch):
+    monkeypatch.setattr(run_pipeline, "PIPELINE_STATE_FILE", tmp_path / "pipeline_state.json")
+    
+    assert "download" not in run_pipeline.run_pipeline(dry_run=True)
+    assert run_pipeline.run_pipeline(dry_run=True, download=True)[0] == "download"
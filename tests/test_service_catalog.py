@@ -0,0 +1,92 @@
+"""
+Tests for code normalization and the service catalog in service_catalog.py
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from service_catalog import (
+    build_code_index, extend_catalog, load_catalog, lookup_services, normalize_code, normalize_codes
+)
+
+
+@pytest.fixture
+def catalog_file(tmp_path):
+    catalog_file = tmp_path / "services.csv"
+    catalog_file.write_text(
+        "service_id,code,code_type,description,category,core\n"
+        "1,99283,CPT,ER visit level 3,facility,true\n"
+        "2,70450,CPT,CT head without contrast,imaging,true\n"
+        "4,J1885,,Ketorolac injection,,\n"
+    )
+    return catalog_file
+
+
+@pytest.fixture
+def index(catalog_file):
+    return build_code_index(load_catalog(catalog_file))
+
+
+VARIANTS = ["99283", "099283", "99283-25", " 99283 ", "99283 25 59", "00099283"]
+
+
+@pytest.mark.parametrize("values", [
+    pd.Series(VARIANTS + ["j1885", " J1885-JW "]),
+    pd.Series(VARIANTS + ["j1885", " J1885-JW "], dtype="string[pyarrow]"),
+    pa.array(VARIANTS + ["j1885", " J1885-JW "])
+])
+def test_code_variants_resolve_to_one_service(index, values):
+    df = lookup_services(values, index)
+    
+    assert df["service_id"].tolist() == [1] * 6 + [4, 4]
+    assert df["code"].tolist() == ["99283"] * 6 + ["J1885"] * 2
+    assert df["code_type"].tolist() == ["CPT"] * 6 + ["HCPCS"] * 2
+    assert df["modifier"].fillna("").tolist() == ["", "", "25", "", "25-59", "", "", "JW"]
+
+
+def test_non_codes_are_unresolved(index):
+    df = lookup_services(pd.Series(["0450", "", None, "CDM12345", "99999", "N/A"]), index)
+    
+    assert df["service_id"].isna().tolist() == [True] * 6
+    assert df["code"].fillna("").tolist() == ["", "", "", "", "99999", ""]
+
+
+def test_scalar_normalization_matches_vectorized():
+    values = VARIANTS + ["j1885", " J1885-JW ", "0450", "", None, "0001U", "1234f"]
+    
+    vectorized = normalize_codes(pd.Series(values, dtype=object))
+    
+    assert [normalize_code(value) for value in values] == [
+        (code, modifier) for code, modifier in zip(
+            vectorized["code"].astype(object).where(vectorized["code"].notna(), None),
+            vectorized["modifier"].astype(object).where(vectorized["modifier"].notna(), None)
+        )
+    ]
+
+
+def test_load_catalog_fills_defaults(catalog_file):
+    catalog = load_catalog(catalog_file)
+    
+    ketorolac = catalog.set_index("code").loc["J1885"]
+    assert (ketorolac["code_type"], ketorolac["category"], ketorolac["core"]) == ("HCPCS", "drug", False)
+
+
+def test_extend_catalog_never_renumbers_existing_services(catalog_file):
+    before = load_catalog(catalog_file)
+    codes = pd.DataFrame({
+        "code": ["99283", "85025", "0450", "070450", " 80053 ", "85025-91"],
+        "description": ["Renamed", "CBC", "Revenue code", "CT head", "CMP", "CBC repeat"]
+    })
+    
+    added = extend_catalog(codes, catalog_file)
+    after = load_catalog(catalog_file)
+    
+    assert added == 2
+    pd.testing.assert_frame_equal(after.head(len(before)), before)
+    new = after.iloc[len(before):]
+    assert new["service_id"].tolist() == [5, 6]
+    assert new["code"].tolist() == ["80053", "85025"]
+    assert new["category"].tolist() == ["lab", "lab"]
+    assert not new["core"].any()
+    assert extend_catalog(codes, catalog_file) == 0
@@ -0,0 +1,144 @@
+"""
+Tests for the fact table builds in 04_build_star_schema.py
+"""
+
+import functools
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import benchmark_store
+import duckdb_session
+
+
+def write_prices(path, rows=3000, seed=0):
+    """hospital_prices.parquet as 02_process_mrf.py saves it"""
+    rng = np.random.default_rng(seed)
+    hospitals = [
+        ("490089", "Inova Alexandria Hospital"),
+        ("490007", "Inova Fairfax Hospital"),
+        (None, "Inova Fairfax Hospital"),      # no CCN: resolved by name
+        ("999999", "Unlisted Hospital"),       # not in the registry: dropped
+        (None, "Unlisted Hospital")
+    ]
+    codes = ["99283", "099284", " 99285 ", "70450", "j1885", "85025", "00000", "NOTACODE"]
+    picked = rng.integers(0, len(hospitals), rows)
+    rates = rng.lognormal(6, 1, (rows, 3))
+    df = pd.DataFrame({
+        "code": rng.choice(codes, rows),
+        "modifier": "",
+        # Few distinct line items, so many rows are duplicates told apart by their order
+        "description": rng.choice(["ER VISIT", "CT HEAD", None], rows),
+        "revenue_code": rng.choice(["0450", "0320", ""], rows),
+        "code_type": "CPT",
+        "gross_charge": np.where(rng.random(rows) < 0.1, np.nan, rng.uniform(10, 9000, rows).round(2)),
+        "cash_price": rng.uniform(10, 900, rows).round(2),
+        "negotiated_min": rates.min(axis=1),
+        "negotiated_median": np.median(rates, axis=1),
+        "negotiated_max": rates.max(axis=1),
+        "payer_count": rng.integers(0, 12, rows),
+        "hospital_name": [hospitals[i][1] for i in picked],
+        "ccn": [hospitals[i][0] for i in picked]
+    })
+    df.to_parquet(path, index=False)
+    return path
+
+
+def write_store(root):
+    frames = [
+        pd.DataFrame({"code": ["99283", "99284", "99285", "12345"], "medicare_rate": [450.0, 750.0, 1200.0, 1.0],
+                      "source": "OPPS", "year": 2023, "state": ["VA", "VA", "MD", "VA"]}),
+        pd.DataFrame({"code": ["99283", "99283", "99285"], "medicare_rate": [80.0, 95.0, 170.0],
+                      "source": "PFS", "year": 2023, "state": ["VA", "DC", "VA"],
+                      "locality": ["12302-00", "12201-01", "12302-00"]}),
+        pd.DataFrame({"code": ["85025", "80053"], "medicare_rate": [7.77, 10.56], "source": "CLFS", "year": 2024}),
+        pd.DataFrame({"code": ["99283"], "medicare_rate": [440.0], "source": "OPPS", "year": 2022, "state": [None]})
+    ]
+    benchmark_store.write_benchmarks(pd.concat(frames, ignore_index=True), root=root)
+
+
+def read_fact(output):
+    """Rows of a fact file or partitioned folder, without partition inference"""
+    files = sorted(output.rglob("*.parquet")) if output.is_dir() else [output]
+    return pd.concat([pq.read_table(f).to_pandas() for f in files], ignore_index=True)
+
+
+def by_key(df, key):
+    return df.sort_values(key, ignore_index=True)
+
+
+@pytest.fixture
+def star(build_star_schema, tmp_path, monkeypatch):
+    store = tmp_path / "store"
+    write_prices(tmp_path / "hospital_prices.parquet")
+    write_store(store)
+    monkeypatch.setattr(build_star_schema, "PROCESSED_DATA_DIR", tmp_path)
+    monkeypatch.setattr(build_star_schema, "read_benchmarks", functools.partial(benchmark_store.read_benchmarks, root=store))
+    monkeypatch.setattr(build_star_schema, "list_partitions", functools.partial(benchmark_store.list_partitions, root=store))
+    monkeypatch.setattr(duckdb_session, "DUCKDB_TEMP_DIR", tmp_path / "duckdb_tmp")
+    return build_star_schema
+
+
+@pytest.mark.parametrize("partitions", [
+    {},
+    {"fact_prices": "provider_id", "fact_benchmarks": "source"},
+    {"fact_prices": "state", "fact_benchmarks": "state"}
+])
+def test_duckdb_facts_match_pandas_facts(star, tmp_path, monkeypatch, partitions):
+    monkeypatch.setattr(star, "STAR_SCHEMA_PARTITIONS", partitions)
+    dim_service = star.build_dim_service()
+    dim_provider = star.build_dim_provider()
+    con = duckdb_session.connect_duckdb()
+    (tmp_path / "duckdb").mkdir()
+    
+    prices = star.build_fact_prices(dim_service, dim_provider)
+    benchmarks = star.build_fact_benchmarks(dim_service)
+    prices_duckdb = star.build_fact_prices_duckdb(
+        con, dim_service, dim_provider, star._table_path(tmp_path / "duckdb", "fact_prices")
+    )
+    benchmarks_duckdb = star.build_fact_benchmarks_duckdb(
+        con, dim_service, star._table_path(tmp_path / "duckdb", "fact_benchmarks")
+    )
+    
+    # Unknown codes and unlisted hospitals are dropped by both engines
+    assert 0 < len(prices) < 3000
+    assert set(prices["provider_id"]) == {1, 2}
+    assert prices["price_id"].is_unique
+    pd.testing.assert_frame_equal(by_key(read_fact(prices_duckdb), "price_id"), by_key(prices, "price_id"))
+    
+    assert set(benchmarks["source"]) == {"OPPS", "PFS", "CLFS"}
+    assert benchmarks["benchmark_id"].is_unique
+    pd.testing.assert_frame_equal(
+        by_key(read_fact(benchmarks_duckdb), "benchmark_id"), by_key(benchmarks, "benchmark_id")
+    )
+
+
+def test_price_ids_survive_shuffled_input(star, tmp_path):
+    dim_service = star.build_dim_service()
+    dim_provider = star.build_dim_provider()
+    prices = star.build_fact_prices(dim_service, dim_provider)
+    
+    prices_file = tmp_path / "hospital_prices.parquet"
+    pd.read_parquet(prices_file).sample(frac=1, random_state=7).to_parquet(prices_file, index=False)
+    shuffled = star.build_fact_prices(dim_service, dim_provider)
+    
+    pd.testing.assert_frame_equal(by_key(shuffled, "price_id"), by_key(prices, "price_id"))
+
+
+def test_duplicate_line_items_get_distinct_price_ids(star, tmp_path):
+    prices_file = tmp_path / "hospital_prices.parquet"
+    line = pd.read_parquet(prices_file).query("ccn == '490089' and code == '99283'").head(1)
+    pd.concat([line] * 3 + [line.assign(hospital_name="Inova Fairfax Hospital", ccn="490007")]).to_parquet(
+        prices_file, index=False
+    )
+    dim_service = star.build_dim_service()
+    dim_provider = star.build_dim_provider()
+    con = duckdb_session.connect_duckdb()
+    
+    prices = star.build_fact_prices(dim_service, dim_provider)
+    prices_duckdb = read_fact(star.build_fact_prices_duckdb(con, dim_service, dim_provider, tmp_path / "fact_prices"))
+    
+    assert len(prices) == 4 and prices["price_id"].is_unique
+    assert set(prices_duckdb["price_id"]) == set(prices["price_id"])
@@ -0,0 +1,49 @@
+"""
+Tests for the fact table surrogate keys in surrogate_keys.py
+"""
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from surrogate_keys import surrogate_key, surrogate_key_sql
+
+
+def natural_keys(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "provider": rng.choice(["490089", "490007", "Inova Fairfax Hospital", ""], rows),
+        "code": pd.array(rng.choice(["99283", "J1885", "70450", None], rows), dtype="string"),
+        # Separator characters and non-ASCII text inside the values
+        "description": rng.choice(["ER VISIT", "CT|HEAD", "café", "multi\nline", ""], rows),
+        "line": rng.integers(0, 5, rows)
+    })
+
+
+def test_pandas_and_sql_keys_agree():
+    df = natural_keys()
+    columns = list(df.columns)
+    
+    keys = surrogate_key([df[col] for col in columns])
+    sql_keys = duckdb.sql(f"SELECT {surrogate_key_sql(columns)} AS key FROM df").df()["key"]
+    
+    assert keys.dtype == np.int64 and (keys > 0).all()
+    np.testing.assert_array_equal(keys.to_numpy(), sql_keys.to_numpy())
+
+
+def test_keys_depend_only_on_the_row():
+    df = natural_keys()
+    shuffled = df.sample(frac=1, random_state=1)
+    
+    keys = surrogate_key([df[col] for col in df.columns])
+    shuffled_keys = surrogate_key([shuffled[col] for col in shuffled.columns])
+    
+    pd.testing.assert_series_equal(shuffled_keys.sort_index(), keys)
+    # Same natural key, same surrogate key; a different row, a different key
+    assert keys.nunique() == len(df.drop_duplicates())
+
+
+def test_nulls_hash_as_empty_strings():
+    with_null = surrogate_key([pd.Series(["490089", "490089"]), pd.Series([None, ""], dtype=object)])
+    
+    assert with_null.iloc[0] == with_null.iloc[1]
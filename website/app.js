@@ -1,7 +1,12 @@
 // ER Bill Explainer — Consumer Healthcare Pricing Intelligence Platform
 // app.js — Main application logic
 
-const { services, planPresets, defaultThresholds, hospital, stateBenchmarks, nationalPercentiles } = ER_DATA;
+const { services, planPresets, defaultThresholds, hospital } = ER_DATA;
+
+// Benchmarks and markup bands, replaced by the precomputed marts when marts.json is available
+let { stateBenchmarks, nationalPercentiles } = ER_DATA;
+let markupThresholds = { critical: 15, high: 8, moderate: 4 };
+let markupBucketEdges = [3, 5, 10, 15];
 
 // ===== Utility Functions =====
 const fmt = n => '$' + n.toLocaleString('en-US', { maximumFractionDigits: 0 });
@@ -110,6 +115,30 @@ function setupTabs() {
   });
 }
 
+// ===== Analytics Marts =====
+// marts.json is written by scripts/etl/05_build_marts.py; the embedded ER_DATA values stay when it is missing
+async function loadMarts() {
+  try {
+    const response = await fetch('marts.json');
+    if (!response.ok) return;
+    const marts = await response.json();
+    const stateMart = marts.stateBenchmarks?.[hospital.state];
+    // Categories the state has no markup for keep their embedded averages
+    if (stateMart) {
+      stateBenchmarks = {
+        ...stateMart,
+        state: stateBenchmarks.state,
+        byCategory: { ...stateBenchmarks.byCategory, ...stateMart.byCategory }
+      };
+    }
+    if (marts.nationalPercentiles?.p50 != null) nationalPercentiles = marts.nationalPercentiles;
+    if (marts.severityThresholds) markupThresholds = marts.severityThresholds;
+    if (marts.markupBucketEdges?.length === 4) markupBucketEdges = marts.markupBucketEdges;
+  } catch (err) {
+    console.warn('Analytics marts unavailable, using embedded benchmarks', err);
+  }
+}
+
 // ===== Computed Analytics =====
 function computeAnalytics() {
   const analyzed = services.map(s => {
@@ -117,9 +146,9 @@ function computeAnalytics() {
     const stateMarkup = stateBenchmarks.byCpt[s.cpt] || markup;
     const savings = s.gross_charge - s.medicare_rate;
     let severity;
-    if (markup >= 15) severity = 'critical';
-    else if (markup >= 8) severity = 'high';
-    else if (markup >= 4) severity = 'moderate';
+    if (markup >= markupThresholds.critical) severity = 'critical';
+    else if (markup >= markupThresholds.high) severity = 'high';
+    else if (markup >= markupThresholds.moderate) severity = 'moderate';
     else severity = 'fair';
     return { ...s, markup, stateMarkup, savings, severity };
   }).sort((a, b) => b.markup - a.markup);
@@ -127,7 +156,7 @@ function computeAnalytics() {
   const totalCharged = analyzed.reduce((s, i) => s + i.gross_charge, 0);
   const totalMedicare = analyzed.reduce((s, i) => s + i.medicare_rate, 0);
   const avgMarkup = (totalCharged / totalMedicare).toFixed(1);
-  const overchargeCount = analyzed.filter(s => s.markup >= 8).length;
+  const overchargeCount = analyzed.filter(s => s.markup >= markupThresholds.high).length;
   const negotiationScore = overchargeCount >= 5 ? 'strong' : overchargeCount >= 2 ? 'moderate' : 'low';
 
   // Category breakdown
@@ -140,13 +169,12 @@ function computeAnalytics() {
   });
 
   // Markup distribution buckets
-  const buckets = { '1-3x': 0, '3-5x': 0, '5-10x': 0, '10-15x': 0, '15x+': 0 };
+  const [e1, e2, e3, e4] = markupBucketEdges;
+  const bucketNames = [`1-${e1}x`, `${e1}-${e2}x`, `${e2}-${e3}x`, `${e3}-${e4}x`, `${e4}x+`];
+  const buckets = Object.fromEntries(bucketNames.map(name => [name, 0]));
   analyzed.forEach(s => {
-    if (s.markup >= 15) buckets['15x+']++;
-    else if (s.markup >= 10) buckets['10-15x']++;
-    else if (s.markup >= 5) buckets['5-10x']++;
-    else if (s.markup >= 3) buckets['3-5x']++;
-    else buckets['1-3x']++;
+    const index = markupBucketEdges.filter(edge => s.markup >= edge).length;
+    buckets[bucketNames[index]]++;
   });
 
   return { analyzed, analyzedByCost: [...analyzed].sort((a, b) => b.gross_charge - a.gross_charge), totalCharged, totalMedicare, avgMarkup, overchargeCount, negotiationScore, categories, buckets };
@@ -163,33 +191,33 @@ function renderNegotiationScore(data) {
   const icons = { strong: '🔴', moderate: '🟡', low: '🟢' };
   const color = colors[negotiationScore];
 
-  const severeCount = analyzed.filter(s => s.markup >= 15).length;
-  const highCount = analyzed.filter(s => s.markup >= 8 && s.markup < 15).length;
+  const severeCount = analyzed.filter(s => s.markup >= markupThresholds.critical).length;
+  const highCount = analyzed.filter(s => s.markup >= markupThresholds.high && s.markup < markupThresholds.critical).length;
 
   document.getElementById('negotiation-score').innerHTML = `
     <div class="neg-score-header" style="border-left:4px solid ${color}">
       <div class="neg-score-icon">${icons[negotiationScore]}</div>
       <div class="neg-score-info">
         <h3> "Can I Negotiate This?" — <span style="color:${color}">${labels[negotiationScore]}</span></h3>
-        <p>${overchargeCount} of ${analyzed.length} services exceed 8x Medicare rate</p>
+        <p>${overchargeCount} of ${analyzed.length} services exceed ${markupThresholds.high}x Medicare rate</p>
       </div>
     </div>
     <div class="neg-score-details">
       <div class="neg-detail ${severeCount > 0 ? 'critical' : ''}">
         <span class="neg-count">${severeCount}</span>
-        <span class="neg-label">Critical (15x+)</span>
+        <span class="neg-label">Critical (${markupThresholds.critical}x+)</span>
       </div>
       <div class="neg-detail ${highCount > 0 ? 'high' : ''}">
         <span class="neg-count">${highCount}</span>
-        <span class="neg-label">High (8-15x)</span>
+        <span class="neg-label">High (${markupThresholds.high}-${markupThresholds.critical}x)</span>
       </div>
       <div class="neg-detail">
-        <span class="neg-count">${analyzed.filter(s => s.markup >= 4 && s.markup < 8).length}</span>
-        <span class="neg-label">Moderate (4-8x)</span>
+        <span class="neg-count">${analyzed.filter(s => s.markup >= markupThresholds.moderate && s.markup < markupThresholds.high).length}</span>
+        <span class="neg-label">Moderate (${markupThresholds.moderate}-${markupThresholds.high}x)</span>
       </div>
       <div class="neg-detail">
-        <span class="neg-count">${analyzed.filter(s => s.markup < 4).length}</span>
-        <span class="neg-label">Fair (< 4x)</span>
+        <span class="neg-count">${analyzed.filter(s => s.markup < markupThresholds.moderate).length}</span>
+        <span class="neg-label">Fair (< ${markupThresholds.moderate}x)</span>
       </div>
     </div>
     <div class="neg-savings">
@@ -308,12 +336,12 @@ function renderTopCostServices(data) {
 function renderMarkupDistribution(data) {
   const { buckets, analyzed, avgMarkup } = data;
   const maxBucket = Math.max(...Object.values(buckets));
-  const bucketColors = {
-    '1-3x': '#22c55e', '3-5x': '#84cc16', '5-10x': '#f59e0b', '10-15x': '#f97316', '15x+': '#ef4444'
-  };
-  const bucketLabels = {
-    '1-3x': 'Reasonable', '3-5x': 'Elevated', '5-10x': 'High', '10-15x': 'Very High', '15x+': 'Extreme'
-  };
+  // Colors and labels follow bucket order, whatever edges the marts set
+  const bucketNames = Object.keys(buckets);
+  const bucketColors = Object.fromEntries(bucketNames.map((name, i) =>
+    [name, ['#22c55e', '#84cc16', '#f59e0b', '#f97316', '#ef4444'][i]]));
+  const bucketLabels = Object.fromEntries(bucketNames.map((name, i) =>
+    [name, ['Reasonable', 'Elevated', 'High', 'Very High', 'Extreme'][i]]));
   const above5x = analyzed.filter(s => s.markup >= 5).length;
   const above5xPct = (above5x / analyzed.length * 100).toFixed(0);
 
@@ -1078,7 +1106,8 @@ function setupUpload() {
 }
 
 // ===== Initialize =====
-function init() {
+async function init() {
+  await loadMarts();
   setupTheme();
   setupTabs();
   setupUpload();